@@ -1,12 +1,19 @@
 from flask import Flask, render_template, request, jsonify
 from models import Location, WeatherData, TidalData # Ensure TidalData is imported
-from datetime import date
+from datetime import date, timedelta
 import logging
 import os
 import sqlite3
 from pathlib import Path
 from services.weather_service import WeatherService
 from services.tidal_api import TidalAPIService # Ensure TidalAPIService is imported
+from services.autocomplete import CityAutocomplete
+from services.spatial_index import CitySpatialIndex
+from services.single_flight import get_single_flight
+from services.prewarm import ViewCounter
+from services.retry_policy import RetryPolicy
+from services.revalidate import BackgroundRefresher, age_seconds, format_age, is_stale
+import config
 import logging_config
 
 # Configure logging
@@ -28,7 +35,118 @@ app.config['DB_FILE'] = os.path.join(app.config['DATA_DIR'], 'cities.db')
 
 # Initialize services
 weather_service = WeatherService(app.config['DB_FILE'])
-tidal_service = TidalAPIService() # Ensure tidal_service is initialized
+city_spatial_index = CitySpatialIndex(app.config['DB_FILE'])
+city_spatial_index.load()
+tidal_service = TidalAPIService(city_spatial_index) # Ensure tidal_service is initialized
+city_autocomplete = CityAutocomplete(app.config['DB_FILE'])
+city_autocomplete.load()
+single_flight = get_single_flight()
+background_refresher = BackgroundRefresher(single_flight=single_flight)
+view_counter = ViewCounter(app.config['DB_FILE'])
+
+# Data access
+def _fetch_weather_for_day(location, day, max_age=None, policy=None):
+    """
+    Fetch and store the weather of a location unless another caller already did.
+    
+    With max_age, a stored row older than max_age seconds is fetched again and updated;
+    a failed refresh leaves it as it is instead of storing mock data.
+    """
+    weather_data = WeatherData.query().filter_by(location_id=location.id, date=day).first()
+    if weather_data and (max_age is None or not is_stale(weather_data, day, max_age)):
+        return weather_data
+    
+    # Use the weather service to fetch weather data
+    city_data = weather_service.get_city_by_id(location.id)
+    if not city_data:
+        return weather_data
+    weather_data_dict = weather_service.fetch_weather_data(location.id, policy=policy, fallback=max_age is None)
+    if not weather_data_dict:
+        return weather_data
+    
+    # Save to database, updating today's row if there is one
+    weather_data = weather_data or WeatherData(location_id=location.id, date=day)
+    weather_data.temperature = weather_data_dict.get('temperature_value', 0)
+    weather_data.condition = weather_data_dict.get('description', 'Unknown')
+    weather_data.wind_speed = weather_data_dict.get('wind_speed', 0)
+    weather_data.sunrise = weather_data_dict.get('sunrise', '')
+    weather_data.sunset = weather_data_dict.get('sunset', '')
+    weather_data.save()
+    return weather_data
+
+def get_weather_for_day(location, day):
+    """
+    Get the weather of a location for a day, fetching it upstream if it is not stored.
+    
+    Concurrent requests for the same location and day share a single upstream fetch.
+    """
+    weather_data = WeatherData.query().filter_by(location_id=location.id, date=day).first()
+    if weather_data:
+        return weather_data
+    return single_flight.do('weather', location.id, day, lambda: _fetch_weather_for_day(location, day))
+
+def _fetch_tidal_for_day(location, day, max_age=None):
+    """
+    Fetch and store the tides of a location unless another caller already did.
+    
+    With max_age, a stored row older than max_age seconds is fetched again and updated;
+    a failed refresh leaves it as it is instead of storing mock data.
+    """
+    tidal_data = TidalData.get_by_location_and_date(location.id, day)
+    if tidal_data and (max_age is None or not is_stale(tidal_data, day, max_age)):
+        return tidal_data
+    
+    tidal_data_dict = tidal_service.get_tidal_data(
+        location.latitude,
+        location.longitude,
+        location.id,
+        location.name, # Pass city_name for scraper fallback
+        day=day,
+        fallback=max_age is None
+    )
+    if not tidal_data_dict:
+        return tidal_data
+    
+    # Save to database, updating today's row if there is one
+    tidal_data = tidal_data or TidalData(location_id=location.id, date=day)
+    tidal_data.coefficient = tidal_data_dict.get('coefficient')
+    tidal_data.high_tide_time = tidal_data_dict.get('high_tide_time')
+    tidal_data.low_tide_time = tidal_data_dict.get('low_tide_time')
+    tidal_data.save()
+    return tidal_data
+
+def get_tidal_for_day(location, day):
+    """
+    Get the tides of a location for a day, fetching them if they are not stored.
+    
+    Concurrent requests for the same location and day share a single fetch.
+    """
+    tidal_data = TidalData.get_by_location_and_date(location.id, day)
+    if tidal_data:
+        return tidal_data
+    return single_flight.do('tidal', location.id, day, lambda: _fetch_tidal_for_day(location, day))
+
+def get_latest_with_refresh(source, location, day):
+    """
+    Get the most recent stored row of a location without waiting for upstream.
+    
+    A missing or stale row is refreshed in the background for the next request; nobody
+    waits for the refresh, so upstream calls use the batch retry policy.
+    
+    Returns:
+        tuple: (row or None, age of the row in seconds or None)
+    """
+    if source == 'weather':
+        model, max_age = WeatherData, config.WEATHER_FRESH_FOR
+        refresh = lambda: _fetch_weather_for_day(location, day, max_age, RetryPolicy.batch())
+    else:
+        model, max_age = TidalData, config.TIDAL_FRESH_FOR
+        refresh = lambda: _fetch_tidal_for_day(location, day, max_age)
+    
+    row = model.get_latest_by_location(location.id)
+    if is_stale(row, day, max_age):
+        background_refresher.schedule(source, location.id, day, refresh)
+    return row, age_seconds(row.updated_at) if row else None
 
 # Routes
 @app.route('/')
@@ -37,96 +155,151 @@ def index():
     location_id = request.args.get('location_id', 1, type=int)
     search_query = request.args.get('search', '')
     
-    # Get location data
+    # The selector gets a first page of lightweight rows and pages through the rest
+    next_after = None
+    locations = []
     if search_query:
-        # Search for locations matching the query
-        locations = Location.query().filter_by(name=search_query).all()
-        if not locations:
-            # If no results, get all locations
-            locations = Location.query().all()
-    else:
-        locations = Location.query().all()
+        locations = Location.query().filter_by(name=search_query).order_by('id').rows('id', 'name')
+    if not locations:
+        locations, next_after = Location.list_page(limit=config.LOCATION_PAGE_SIZE)
     
-    selected_location = Location.get_by_id(location_id) or (locations[0] if locations else None)
+    selected_location = Location.get_by_id(location_id)
+    if not selected_location and locations:
+        selected_location = Location.get_by_id(locations[0]['id'])
     
     if not selected_location:
         return render_template(
             'index.html',
             locations=[],
+            next_after=None,
             selected_location=None,
             weather_data=None,
             tidal_data=None, # Add tidal_data here for the None case
             search_query=search_query
         )
     
-    # Get today's weather data for the selected location
-    weather_data = WeatherData.query().filter_by(
-        location_id=selected_location.id,
-        date=date.today()
-    ).first()
-    
-    # If no weather data exists in the database, fetch from API
-    if not weather_data:
-        # Use the weather service to fetch weather data
-        city_data = weather_service.get_city_by_id(selected_location.id)
-        if city_data:
-            weather_data_dict = weather_service.fetch_weather_data(selected_location.id)
-            
-            if weather_data_dict:
-                # Save to database
-                weather_data = WeatherData(
-                    location_id=selected_location.id,
-                    date=date.today(),
-                    temperature=weather_data_dict.get('temperature_value', 0),
-                    condition=weather_data_dict.get('description', 'Unknown'),
-                    wind_speed=weather_data_dict.get('wind_speed', 0),
-                    sunrise=weather_data_dict.get('sunrise', ''),
-                    sunset=weather_data_dict.get('sunset', '')
-                )
-                weather_data.save()
-    
-    # Get today's tidal data for the selected location
-    tidal_data = TidalData.get_by_location_and_date(selected_location.id, date.today())
-    
-    # If no tidal data exists in the database, fetch using the service
-    if not tidal_data and selected_location:
-        tidal_data_dict = tidal_service.get_tidal_data(
-            selected_location.latitude,
-            selected_location.longitude,
-            selected_location.id,
-            selected_location.name # Pass city_name for scraper fallback
-        )
-        if tidal_data_dict:
-            tidal_data = TidalData(
-                location_id=selected_location.id,
-                date=date.today(),
-                coefficient=tidal_data_dict.get('coefficient'),
-                high_tide_time=tidal_data_dict.get('high_tide_time'),
-                low_tide_time=tidal_data_dict.get('low_tide_time')
-            )
-            tidal_data.save()
-            # Re-fetch from DB to have a consistent object type if needed, or use the dict directly
-            # For simplicity, we'll assume the object created is sufficient for the template
+    # Most-viewed locations are pre-warmed first
+    view_counter.record(selected_location.id)
+    
+    today = date.today()
+    weather_age = tidal_age = None
+    if config.STALE_WHILE_REVALIDATE:
+        # Serve the latest stored data at once; stale data is refreshed in the background
+        weather_data, weather_age = get_latest_with_refresh('weather', selected_location, today)
+        tidal_data, tidal_age = get_latest_with_refresh('tidal', selected_location, today)
+    else:
+        # Get today's weather and tidal data, fetching them upstream if missing
+        weather_data = get_weather_for_day(selected_location, today)
+        tidal_data = get_tidal_for_day(selected_location, today)
 
     return render_template(
         'index.html',
         locations=locations,
+        next_after=next_after,
         selected_location=selected_location,
         weather_data=weather_data,
         tidal_data=tidal_data,  # Pass tidal_data to the template
+        weather_age=format_age(weather_age),
+        tidal_age=format_age(tidal_age),
         search_query=search_query
     )
 
 @app.route('/api/search')
 def search_cities():
-    """API endpoint to search for cities."""
+    """API endpoint to search for cities (type-ahead prefix search)."""
     query = request.args.get('q', '')
+    country = request.args.get('country') or None
+    limit = max(1, min(request.args.get('limit', 10, type=int), config.SEARCH_MAX_LIMIT))
     if not query or len(query) < 2:
         return jsonify([])
     
-    cities = weather_service.search_cities(query)
+    # Prefix matches come from the in-memory index, SQLite is only used if it failed to load
+    if city_autocomplete.loaded:
+        cities = city_autocomplete.search(query, country, limit)
+    else:
+        cities = weather_service.search_cities(query, country, limit)
     return jsonify(cities)
 
+@app.route('/api/nearest')
+def nearest_cities():
+    """API endpoint to find the cities closest to a coordinate."""
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    k = max(1, min(request.args.get('k', 1, type=int), config.NEAREST_MAX_K))
+    
+    if lat is None or lon is None or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        return jsonify({'status': 'error', 'message': 'Valid lat and lon are required'}), 400
+    
+    if not city_spatial_index.loaded:
+        return jsonify({'status': 'error', 'message': 'Spatial index is not available'}), 503
+    
+    return jsonify(city_spatial_index.nearest(lat, lon, k))
+
+@app.route('/api/locations')
+def list_locations():
+    """API endpoint paging through the locations for the selector."""
+    after = request.args.get('after', type=int)
+    limit = max(1, min(request.args.get('limit', config.LOCATION_PAGE_SIZE, type=int), config.LOCATION_PAGE_MAX))
+    locations, next_after = Location.list_page(after, limit)
+    return jsonify({'locations': locations, 'next_after': next_after})
+
+@app.route('/api/conditions')
+def location_conditions():
+    """API endpoint returning the stored weather and tides of many locations for a day."""
+    try:
+        location_ids = [int(value) for value in request.args.get('ids', '').split(',') if value]
+        day = date.fromisoformat(request.args['date']) if request.args.get('date') else date.today()
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'ids must be integers and date YYYY-MM-DD'}), 400
+    if not location_ids or len(location_ids) > config.CONDITIONS_MAX_LOCATIONS:
+        return jsonify({'status': 'error',
+                        'message': f'Between 1 and {config.CONDITIONS_MAX_LOCATIONS} ids are required'}), 400
+    
+    # One query per table for the whole page of locations
+    locations = Location.get_many(location_ids)
+    weather = WeatherData.get_many(locations, day)
+    tides = TidalData.get_many(locations, day)
+    return jsonify([
+        {
+            'location': locations[location_id].to_dict(),
+            'weather': weather[location_id].to_dict() if location_id in weather else None,
+            'tidal': tides[location_id].to_dict() if location_id in tides else None,
+        }
+        for location_id in dict.fromkeys(location_ids) if location_id in locations
+    ])
+
+def _series_json(values):
+    """Round a series for JSON, missing (NaN) values becoming null."""
+    if isinstance(values, dict):
+        return {key: _series_json(series) for key, series in values.items()}
+    return [None if value != value else round(value, 2) for value in values.tolist()]
+
+@app.route('/api/marine/<int:location_id>')
+def marine_series(location_id):
+    """API endpoint returning the hourly, 3-hourly or daily marine series of a location."""
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else date.today()
+        days = max(1, min(request.args.get('days', 7, type=int), config.MARINE_MAX_DAYS))
+        resolution = request.args.get('resolution', '1h')
+        variables = [value for value in request.args.get('variables', '').split(',') if value] or None
+        end = start + timedelta(days=days - 1)
+        location = Location.get_by_id(location_id)
+        if location is None:
+            return jsonify({'status': 'error', 'message': 'Unknown location'}), 404
+        series = tidal_service.get_marine_series(
+            location_id, start, end, variables, resolution, location.latitude, location.longitude
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    times = series.pop('time')
+    return jsonify({
+        'location_id': location_id,
+        'resolution': resolution,
+        'time': [int(value) for value in times.tolist()],
+        'series': {variable: _series_json(values) for variable, values in series.items()},
+    })
+
 @app.route('/api/import_city/<int:city_id>', methods=['POST'])
 def import_city(city_id):
     """API endpoint to import a city from cities to locations."""
@@ -139,19 +312,23 @@ def import_city(city_id):
 
 @app.route('/api/import_cities_by_country', methods=['POST'])
 def import_cities_by_country():
-    """API endpoint to import cities from a specific country."""
+    """API endpoint to import cities from one or more countries."""
     data = request.get_json(silent=True) or {}
-    country_code = data.get('country_code', '')
+    country_codes = data.get('country_codes') or data.get('country_code', '')
     limit = data.get('limit', 10)
     
-    if not country_code:
+    if not country_codes:
         return jsonify({'status': 'error', 'message': 'Country code is required'}), 400
+    if isinstance(country_codes, str):
+        country_codes = [country_codes]
     
-    count = weather_service.import_cities_by_country(country_code, limit)
+    result = weather_service.import_cities_by_country(country_codes, limit)
     
     return jsonify({
         'status': 'success', 
-        'message': f'Imported {count} cities from {country_code}'
+        'message': f"Imported {result['imported']} cities from {', '.join(country_codes)}",
+        'imported': result['imported'],
+        'skipped': result['skipped']
     })
 
 if __name__ == '__main__':
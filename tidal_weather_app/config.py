@@ -10,15 +10,134 @@ BASE_DIR = Path(__file__).resolve().parent
 
 # Database settings
 DB_PATH = BASE_DIR / 'data' / 'cities.db'
+DB_CACHED_STATEMENTS = 256
+DB_BUSY_TIMEOUT = 10
+DB_CACHE_SIZE_KB = 64 * 1024
+DB_MMAP_SIZE = 256 * 1024 * 1024
+
+# Search settings
+SEARCH_PREFERRED_COUNTRIES = ('FR',)
+AUTOCOMPLETE_REFRESH_INTERVAL = 30
+SEARCH_MAX_LIMIT = 50
+SPATIAL_CELL_DEGREES = 0.5
+NEAREST_MAX_K = 50
+# Maximum number of locations per /api/conditions request
+CONDITIONS_MAX_LOCATIONS = 200
+# Locations per page of the location selector
+LOCATION_PAGE_SIZE = 100
+LOCATION_PAGE_MAX = 500
+
+# Import settings
+IMPORT_CHUNK_SIZE = 5000
 
 # API settings
 USE_API_FIRST = False
+OWM_API_URL = os.environ.get('OWM_API_URL', 'https://api.openweathermap.org/data/2.5')
+OPEN_METEO_URL = os.environ.get('OPEN_METEO_URL', 'https://api.open-meteo.com/v1/forecast')
+
+# Batched weather fetches: city ids per OpenWeatherMap group query (its maximum),
+# coordinates per Open-Meteo request, and groups fetched concurrently
+OWM_GROUP_SIZE = 20
+OPEN_METEO_BATCH_SIZE = 100
+WEATHER_BATCH_WORKERS = int(os.environ.get('WEATHER_BATCH_WORKERS', 8))
 
 # Request settings
 MAX_RETRIES = 3
 BACKOFF_FACTOR = 1.5
 REQUEST_TIMEOUT = 10
 
+# Retry policies: overall deadline of a call (attempts and waits) for web requests
+# and for batch jobs, attempts of batch calls, and the longest wait between attempts
+RETRY_DEADLINE_INTERACTIVE = float(os.environ.get('RETRY_DEADLINE_INTERACTIVE', 1.5))
+RETRY_DEADLINE_BATCH = float(os.environ.get('RETRY_DEADLINE_BATCH', 60))
+RETRY_BATCH_MAX_RETRIES = 6
+RETRY_MAX_BACKOFF = 20
+# Retry budget of a process: retries per call, plus a floor per second for quiet periods
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MIN_PER_SECOND = 1
+RETRY_BUDGET_BURST = 20
+
+# HTTP connection pool settings
+HTTP_POOL_CONNECTIONS = 16
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 16))
+HTTP_POOL_BLOCK = True
+HTTP_HOST_POOL_LIMITS = {
+    'openweathermap.org': 8,
+    'api.openweathermap.org': 8,
+    'www.worldtides.info': 4,
+}
+
+# Circuit breaker per upstream host: open after this many consecutive failures,
+# then let probes through after CIRCUIT_OPEN_SECONDS
+CIRCUIT_BREAKER_ENABLED = os.environ.get('CIRCUIT_BREAKER_ENABLED', '1') == '1'
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_OPEN_SECONDS = 30
+CIRCUIT_HALF_OPEN_PROBES = 1
+# Failed fetches of a page or location are not repeated for this many seconds
+NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 60))
+NEGATIVE_CACHE_MAX_ENTRIES = 10000
+
+# Bulk loader settings
+LOADER_WORKERS = int(os.environ.get('LOADER_WORKERS', 16))
+LOADER_PER_HOST_LIMIT = int(os.environ.get('LOADER_PER_HOST_LIMIT', 4))
+LOADER_BATCH_SIZE = 500
+
+# Async fetch settings
+ASYNC_CONCURRENCY = int(os.environ.get('ASYNC_CONCURRENCY', 100))
+ASYNC_PER_HOST_LIMIT = int(os.environ.get('ASYNC_PER_HOST_LIMIT', 8))
+# Threads of the fallback transport when aiohttp is not installed; the pooled
+# HTTP client blocks beyond HTTP_POOL_MAXSIZE connections per host anyway
+ASYNC_THREAD_WORKERS = int(os.environ.get('ASYNC_THREAD_WORKERS', 16))
+
+# Cache settings
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 32 * 1024 * 1024))
+CACHE_SWEEP_INTERVAL = 60
+CACHE_L2_ENABLED = os.environ.get('CACHE_L2_ENABLED', '1') == '1'
+CACHE_DB_PATH = BASE_DIR / 'data' / 'cache.db'
+CACHE_L2_MAX_ENTRIES = 200000
+CACHE_L2_MAX_BYTES = 256 * 1024 * 1024
+
+# Hourly marine series (kept apart from cities.db, which create_cities_db.py replaces)
+MARINE_DB_PATH = BASE_DIR / 'data' / 'marine.db'
+MARINE_MAX_DAYS = 31  # days per /api/marine request
+
+# Single-flight settings (the database lock also coalesces fetches across processes)
+SINGLE_FLIGHT_DB_LOCK = os.environ.get('SINGLE_FLIGHT_DB_LOCK', '0') == '1'
+SINGLE_FLIGHT_LOCK_TTL = 60
+SINGLE_FLIGHT_WAIT_TIMEOUT = 30
+
+# Stale-while-revalidate settings (freshness windows in seconds)
+STALE_WHILE_REVALIDATE = os.environ.get('STALE_WHILE_REVALIDATE', '1') == '1'
+WEATHER_FRESH_FOR = int(os.environ.get('WEATHER_FRESH_FOR', 30 * 60))
+TIDAL_FRESH_FOR = int(os.environ.get('TIDAL_FRESH_FOR', 6 * 3600))
+SWR_REFRESH_WORKERS = 4
+
+# Pre-warm settings (window in seconds)
+PREWARM_WINDOW = int(os.environ.get('PREWARM_WINDOW', 2 * 3600))
+PREWARM_WORKERS = 4
+PREWARM_MAX_ATTEMPTS = 3
+PREWARM_REPORT_EVERY = 50
+VIEW_COUNT_FLUSH_INTERVAL = 30
+
+# HTML parsing settings ('auto' picks selectolax, then lxml, then bs4)
+HTML_PARSER_BACKEND = os.environ.get('HTML_PARSER_BACKEND', 'auto')
+HTML_WIDGET_MAX_CHARS = 64 * 1024
+
+# Tide tables (a station page lists about a week of tides, cached per station)
+TIDE_TABLE_CACHE_TTL = 7 * 24 * 3600
+
+# Offline tide prediction from the harmonic constituents of nearby stations
+TIDE_PREDICTION_ENABLED = os.environ.get('TIDE_PREDICTION_ENABLED', '1') == '1'
+TIDE_STATION_MAX_KM = 50
+# Stations and constituents are kept apart from cities.db, which create_cities_db.py rebuilds
+TIDE_DB_PATH = BASE_DIR / 'data' / 'tides.db'
+TIDE_PREDICTION_STEP = 360  # seconds between predicted levels
+
+# Astronomical tidal coefficients, referenced like the French coefficient to Brest
+TIDE_COEFFICIENT_LONGITUDE = -4.495
+TIDE_COEFFICIENT_LAG_HOURS = 36  # age of the tide, delay between the forcing and the tides
+
 # Logging settings
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
 LOG_FILE = BASE_DIR / 'logs' / 'app.log'
@@ -1,69 +1,215 @@
-import sqlite3
+"""
+SQLite connection management.
+
+Each thread gets one long-lived connection per database file, opened in WAL
+mode with tuned PRAGMAs and a larger prepared statement cache, instead of a
+connection being opened and closed around every query. Connections run in
+autocommit mode; writes that belong together go through transaction().
+"""
+
+import logging
 import os
-from pathlib import Path
+import sqlite3
+import threading
+from contextlib import contextmanager
 
-class Connection:
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """Per-thread, long-lived connections to one SQLite database."""
+
+    def __init__(self, db_path=None, cached_statements=None, timeout=None, row_factory=sqlite3.Row):
+        """
+        Initialize the connection manager.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database file
+            cached_statements (int, optional): Prepared statements kept per connection
+            timeout (float, optional): Seconds to wait for a lock held by another connection
+            row_factory (callable, optional): Row factory of the connections
+        """
+        self.db_path = str(db_path or config.DB_PATH)
+        self.cached_statements = cached_statements or config.DB_CACHED_STATEMENTS
+        self.timeout = timeout or config.DB_BUSY_TIMEOUT
+        self.row_factory = row_factory
+
+        self._local = threading.local()
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._generation = 0
+        self.opened = 0
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = self.row_factory
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{config.DB_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={config.DB_MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA foreign_keys=ON')
+        with self._lock:
+            self._connections.add(conn)
+            self.opened += 1
+        return conn
+
+    def connection(self):
+        """
+        Get the connection of the current thread, opening it on first use.
+
+        Returns:
+            sqlite3.Connection: Connection in autocommit mode
+        """
+        if os.getpid() != self._pid:
+            # Connections must not cross a fork: start over in the child process
+            self._local = threading.local()
+            self._connections = set()
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.generation != self._generation and not self._local.depth:
+            # The file was replaced (see reopen): drop the connection to the old one
+            self.close()
+            conn = None
+        if conn is None:
+            conn = self._local.conn = self._open()
+            self._local.depth = 0
+            self._local.generation = self._generation
+        return conn
+
+    def execute(self, sql, params=()):
+        """Execute a statement on the current thread's connection."""
+        return self.connection().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        """Execute a statement for each parameter set on the current thread's connection."""
+        return self.connection().executemany(sql, seq_of_params)
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """
+        Run a block in a transaction, committed on success and rolled back on error.
+
+        Nested blocks become savepoints of the enclosing transaction.
+
+        Args:
+            immediate (bool): Take the write lock at the start (BEGIN IMMEDIATE)
+
+        Yields:
+            sqlite3.Connection: The current thread's connection
+        """
+        conn = self.connection()
+        depth = self._local.depth
+        savepoint = f"sp_{depth}"
+        if depth == 0:
+            conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        else:
+            conn.execute(f'SAVEPOINT {savepoint}')
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if depth == 0:
+                conn.execute('ROLLBACK')
+            else:
+                conn.execute(f'ROLLBACK TO {savepoint}')
+                conn.execute(f'RELEASE {savepoint}')
+            raise
+        else:
+            conn.execute('COMMIT' if depth == 0 else f'RELEASE {savepoint}')
+        finally:
+            self._local.depth = depth
+
+    def reopen(self):
+        """
+        Make every thread open a new connection on its next query.
+
+        Call it when the database file was replaced, e.g. after the cities
+        catalog was rebuilt; connections in a transaction are reopened after it.
+        """
+        with self._lock:
+            self._generation += 1
+
+    def close(self):
+        """Close the current thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    def close_all(self):
+        """Close the connections of every thread."""
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not close connection to {self.db_path}: {e}")
+        self._local = threading.local()
+
+    def stats(self):
+        """
+        Get connection statistics.
+
+        Returns:
+            dict: Connections opened so far and currently open
+        """
+        with self._lock:
+            return {'opened': self.opened, 'open': len(self._connections)}
+
+
+_managers = {}
+_managers_lock = threading.Lock()
 
-     # Create a connection to the SQLite database using the singleton pattern
-    _db_connection = None
+def get_connection_manager(db_path=None):
+    """Get or create the connection manager of a database file (default: config.DB_PATH)."""
+    key = os.path.abspath(str(db_path or config.DB_PATH))
+    manager = _managers.get(key)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.get(key)
+            if manager is None:
+                manager = _managers[key] = ConnectionManager(key)
+    return manager
 
-    def __init__(self, db_name='cities.db'):
-        """Initialize the Connection class with a database name."""
-        self.db_name = db_name
-        self.connected = False
+def get_db_connection(db_path=None):
+    """Get the current thread's connection to the application database."""
+    return get_connection_manager(db_path).connection()
+
+def transaction(db_path=None, immediate=False):
+    """Run a block in a transaction on the application database (see ConnectionManager.transaction)."""
+    return get_connection_manager(db_path).transaction(immediate)
+
+def close_db_connections():
+    """Close every managed connection, e.g. at shutdown."""
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close_all()
+
+
+class Connection:
+    """Static access to the application database connection."""
 
     @staticmethod
     def get_db_connection():
-        """Get a singleton connection to the SQLite database."""
-        global _db_connection
-        if _db_connection is None:
-            app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            db_path = os.path.join(app_dir, 'data', 'cities.db')
-            os.makedirs(os.path.dirname(db_path), exist_ok=True)
-            _db_connection = sqlite3.connect(db_path)
-            _db_connection.row_factory = sqlite3.Row
-        return _db_connection
+        """Get the current thread's connection to the application database."""
+        return get_db_connection()
 
     @staticmethod
     def close_db_connection():
-        """Close the singleton connection to the SQLite database."""
-        global _db_connection
-        if _db_connection is not None:
-            _db_connection.close()
-            _db_connection = None
-
-    def connect(self):
-        if not self.connected:
-            print(f"Connecting to database: {self.db_name}")
-            self.connected = True
-        else:
-            print("Already connected.")
-
-    def disconnect(self):
-        if self.connected:
-            print(f"Disconnecting from database: {self.db_name}")
-            self.connected = False
-        else:
-            print("Already disconnected.")
-    def execute_query(self, query):
-        if not self.connected:
-            raise Exception("Not connected to the database.")
-        print(f"Executing query: {query}")
-        # Here you would normally execute the query against the database
-        # For this example, we'll just simulate it
-        
-        return f"Results for query: {query}"
-    def fetch_results(self, query):
-        if not self.connected:
-            raise Exception("Not connected to the database.")
-        print(f"Fetching results for query: {query}")
-        # Simulate fetching results
-        return f"Fetched results for query: {query}"
-    def close(self):
-        if self.connected:
-            print(f"Closing connection to database: {self.db_name}")
-            self.connected = False
-        else:
-            print("Connection already closed.")
-        # Check if the request was successful
-        return True
+        """Close the current thread's connection to the application database."""
+        get_connection_manager().close()
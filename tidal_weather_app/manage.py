@@ -1,7 +1,40 @@
+from datetime import date
+
+import click
 from flask.cli import FlaskGroup
-from app import app
+from app import app, weather_service, tidal_service, view_counter
+from services.prewarm import PrewarmScheduler
+from services.retry_policy import RetryPolicy
 
 cli = FlaskGroup(create_app=lambda: app)
 
+@cli.command('prewarm')
+@click.option('--date', 'run_date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Day whose rollover is prepared (default: today)')
+@click.option('--window', type=int, default=None, help='Seconds to spread the run over (0 for no pacing)')
+@click.option('--limit', type=int, default=None, help='Maximum number of tasks to run')
+@click.option('--workers', type=int, default=None, help='Number of fetch threads')
+@click.option('--per-host', type=int, default=None, help='Maximum concurrent requests per upstream host')
+@click.option('--status', is_flag=True, help='Only show the progress of the run')
+@click.option('--reset', is_flag=True, help='Forget the progress of the run and start over')
+def prewarm(run_date, window, limit, workers, per_host, status, reset):
+    """Pre-compute tomorrow's tides and refresh today's weather for all locations."""
+    run_date = run_date.date() if run_date else date.today()
+    # Nobody is waiting on this run, so fetches retry patiently instead of failing fast
+    weather_service.retry_policy = RetryPolicy.batch()
+    scheduler = PrewarmScheduler(weather_service, tidal_service, app.config['DB_FILE'],
+                                 workers=workers, per_host=per_host)
+    if status:
+        click.echo(f"Pre-warm {run_date}: {scheduler.progress(run_date)}")
+        return
+    if reset:
+        scheduler.reset(run_date)
+    
+    # Views counted by this process so far are used for the priorities
+    view_counter.flush()
+    progress = scheduler.run(run_date, window=window, limit=limit, report=click.echo)
+    click.echo(f"Pre-warm {run_date} finished: {progress['done']}/{progress['total']} done, "
+               f"{progress['failed']} failed, {progress['pending']} pending")
+
 if __name__ == '__main__':
     cli()
@@ -4,6 +4,9 @@ from pathlib import Path
 
 __all__ = ['Location', 'WeatherData', 'TidalData']
 
+# Models share the per-thread connections of the connection manager
+from database.connection import get_db_connection, transaction
+
 # Import models after defining connection function
 from models.location import Location
 from models.weather_data import WeatherData
@@ -1,20 +1,29 @@
-from datetime import datetime, timezone, date as dt_date
-from ..database.connection import Connection
+from datetime import datetime, timezone as dt_timezone
+from database.connection import transaction
+from models.query import Query
+from models.record import Record, format_timestamp, lazy_column, parse_timestamp
 
-class Location:
+class Location(Record):
     """Model for storing location information."""
     
+    columns = ('id', 'name', 'latitude', 'longitude', 'description', 'timezone', 'created_at', 'updated_at')
+    __slots__ = ('id', 'name', 'latitude', 'longitude', 'description', 'timezone', '_created_at', '_updated_at')
+    shared = ('timezone',)
+    
+    created_at = lazy_column(parse_timestamp)
+    updated_at = lazy_column(parse_timestamp)
+    
     def __init__(self, id=None, name=None, latitude=None, longitude=None, 
-                 description=None, created_at=None, updated_at=None):
+                 description=None, timezone='UTC', created_at=None, updated_at=None):
         self.id = id
         self.name = name
         self.latitude = latitude
         self.longitude = longitude
         self.description = description
-        self.timezone = timezone.utc
-        self.created_at = created_at or datetime.now(timezone.utc)
-        self.updated_at = updated_at or datetime.now(timezone.utc)
-        self.conn = Connection.get_db_connection()
+        self.timezone = timezone
+        now = datetime.now(dt_timezone.utc) if created_at is None or updated_at is None else None
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
 
     def __repr__(self):
         return f'<Location {self.name}>'
@@ -38,150 +47,71 @@ class Location:
     @classmethod
     def get_all(cls):
         """Get all locations from the database."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM locations")
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [cls(**dict(row)) for row in rows]
+        return cls.query().all()
     
     @classmethod
     def get_by_id(cls, location_id):
         """Get a location by ID."""
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM locations WHERE id = ?", (location_id,))
-        row = cursor.fetchone()
-        conn.close()
+        return cls.query().filter_by(id=location_id).first()
+    
+    @classmethod
+    def list_page(cls, after=None, limit=100):
+        """
+        Get a page of locations as lightweight (id, name) rows, in ID order.
         
-        if row:
-            return cls(**dict(row))
-        return None
+        Args:
+            after (int, optional): Last location ID of the previous page
+            limit (int): Maximum number of rows
+            
+        Returns:
+            tuple: (rows, next_after), next_after being None on the last page
+        """
+        # One extra row tells whether there is a next page without a COUNT
+        rows = cls.query().after(after).limit(limit + 1).rows('id', 'name')
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1]['id']
+        return rows, None
+    
+    @classmethod
+    def get_many(cls, location_ids):
+        """Get many locations by ID with one query per chunk of IDs, keyed by ID."""
+        return cls.query().all_by('id', location_ids)
     
     def save(self):
         """Save the location to the database."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        now = datetime.now(timezone.utc)
+        now = datetime.now(dt_timezone.utc)
         self.updated_at = now
+        stored_now = format_timestamp(now)
         
-        if self.id:
-            # Update existing location
-            cursor.execute(
-                """UPDATE locations 
-                   SET name = ?, latitude = ?, longitude = ?, description = ?, 
-                       timezone = ?, updated_at = ? 
-                   WHERE id = ?""",
-                (self.name, self.latitude, self.longitude, self.description, 
-                 self.timezone, now, self.id)
-            )
-        else:
-            # Insert new location
-            self.created_at = now
-            cursor.execute(
-                """INSERT INTO locations 
-                   (name, latitude, longitude, description, timezone, created_at, updated_at) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (self.name, self.latitude, self.longitude, self.description, 
-                 self.timezone, now, now)
-            )
-            self.id = cursor.lastrowid
+        with transaction() as conn:
+            cursor = conn.cursor()
+            
+            if self.id:
+                # Update existing location
+                cursor.execute(
+                    """UPDATE locations 
+                       SET name = ?, latitude = ?, longitude = ?, description = ?, 
+                           timezone = ?, updated_at = ? 
+                       WHERE id = ?""",
+                    (self.name, self.latitude, self.longitude, self.description, 
+                     self.timezone, stored_now, self.id)
+                )
+            else:
+                # Insert new location
+                self.created_at = now
+                cursor.execute(
+                    """INSERT INTO locations 
+                       (name, latitude, longitude, description, timezone, created_at, updated_at) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (self.name, self.latitude, self.longitude, self.description, 
+                     self.timezone, stored_now, stored_now)
+                )
+                self.id = cursor.lastrowid
         
-        conn.commit()
-        conn.close()
         return self
 
 
-class LocationQuery:
+class LocationQuery(Query):
     """Query builder for Location model."""
-    
-    def __init__(self, model_class):
-        self.model_class = model_class
-        self.filters = []
-    
-    def filter(self, *args):
-        """Add a filter to the query."""
-        self.filters.append(args)
-        return self
-    
-    def filter_by(self, **kwargs):
-        """Add a filter by keyword arguments."""
-        for key, value in kwargs.items():
-            self.filters.append((f"{key} = ?", value))
-        return self
-    
-    def all(self):
-        """Execute the query and return all results."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM locations"
-        params = []
-        
-        if self.filters:
-            conditions = []
-            for filter_args in self.filters:
-                if isinstance(filter_args[0], str):
-                    conditions.append(filter_args[0])
-                    if len(filter_args) > 1:
-                        params.append(filter_args[1])
-                else:
-                    # Handle SQLAlchemy-style filter expressions
-                    field_name = filter_args[0].key
-                    op = filter_args[1]
-                    value = filter_args[2]
-                    
-                    if op == 'ilike':
-                        conditions.append(f"{field_name} LIKE ?")
-                        params.append(value)
-                    else:
-                        conditions.append(f"{field_name} = ?")
-                        params.append(value)
-            
-            query += " WHERE " + " AND ".join(conditions)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [self.model_class(**dict(row)) for row in rows]
-    
-    def first(self):
-        """Execute the query and return the first result."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM locations"
-        params = []
-        
-        if self.filters:
-            conditions = []
-            for filter_args in self.filters:
-                if isinstance(filter_args[0], str):
-                    conditions.append(filter_args[0])
-                    if len(filter_args) > 1:
-                        params.append(filter_args[1])
-                else:
-                    # Handle SQLAlchemy-style filter expressions
-                    field_name = filter_args[0].key
-                    op = filter_args[1]
-                    value = filter_args[2]
-                    
-                    if op == 'ilike':
-                        conditions.append(f"{field_name} LIKE ?")
-                        params.append(value)
-                    else:
-                        conditions.append(f"{field_name} = ?")
-                        params.append(value)
-            
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " LIMIT 1"
-        cursor.execute(query, params)
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return self.model_class(**dict(row))
-        return None
+
+    table = 'locations'
@@ -0,0 +1,205 @@
+import re
+from datetime import date as dt_date, datetime
+
+from database.connection import get_db_connection
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Values bound per IN list, below SQLite's limit on host parameters
+IN_CHUNK_SIZE = 512
+
+# Query shapes whose SQL is kept; raw fragments passed to filter() can vary freely
+MAX_COMPILED = 512
+
+
+def _column(name):
+    """Check that a column name is a plain identifier before it goes into SQL."""
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return name
+
+
+def _sql_value(value):
+    if isinstance(value, (dt_date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _padded(values):
+    """
+    Pad a list to the next power of two by repeating its last value.
+
+    IN lists of 3, 5 or 7 values then share the SQL of an 8-value list, so a
+    handful of statements cover every list length.
+    """
+    size = 1
+    while size < len(values):
+        size *= 2
+    return values + [values[-1]] * (size - len(values))
+
+
+class Query:
+    """
+    Query builder shared by the models.
+
+    Filters are kept as SQL fragments with their parameters. The SQL of a
+    query only depends on its shape (fragments, order and whether it has a
+    limit), so it is built once per shape and the same string is reused,
+    which also lets SQLite reuse the prepared statement.
+    """
+
+    table = None
+
+    _compiled = {}
+
+    def __init__(self, model_class):
+        self.model_class = model_class
+        self.filters = []
+        self.ordering = ()
+        self.limit_count = None
+        self.columns = ('*',)
+
+    def filter(self, *args):
+        """
+        Add a filter to the query.
+
+        Accepts an SQL fragment with its optional value, e.g. ("name LIKE ?", "Br%"),
+        or a (field, op, value) expression whose field has a key attribute.
+        """
+        if isinstance(args[0], str):
+            self.filters.append((args[0], tuple(_sql_value(value) for value in args[1:])))
+        else:
+            field_name = _column(args[0].key)
+            op = args[1]
+            operator = 'LIKE' if op == 'ilike' else '='
+            self.filters.append((f"{field_name} {operator} ?", (_sql_value(args[2]),)))
+        return self
+
+    def filter_by(self, **kwargs):
+        """Add equality filters by keyword arguments."""
+        for key, value in kwargs.items():
+            self.filters.append((f"{_column(key)} = ?", (_sql_value(value),)))
+        return self
+
+    def filter_in(self, field, values):
+        """Keep rows whose field is one of values."""
+        values = [_sql_value(value) for value in values]
+        if not values:
+            self.filters.append(("0", ()))
+            return self
+        values = _padded(values)
+        placeholders = ', '.join('?' * len(values))
+        self.filters.append((f"{_column(field)} IN ({placeholders})", tuple(values)))
+        return self
+
+    def filter_range(self, field, start=None, end=None):
+        """Keep rows whose field is between start and end, both inclusive and optional."""
+        if start is not None:
+            self.filters.append((f"{_column(field)} >= ?", (_sql_value(start),)))
+        if end is not None:
+            self.filters.append((f"{_column(field)} <= ?", (_sql_value(end),)))
+        return self
+
+    def order_by(self, *fields):
+        """Order the results by fields, a leading '-' meaning descending order (e.g. '-date')."""
+        self.ordering = tuple(
+            f"{_column(field[1:])} DESC" if field.startswith('-') else _column(field)
+            for field in fields
+        )
+        return self
+
+    def after(self, value, field='id'):
+        """
+        Keep rows after value in field order, for keyset pagination.
+
+        Unlike an OFFSET, the next page starts from the index entry of the last
+        row seen, so every page costs the same. The query is ordered by field
+        unless it already has an order.
+        """
+        if value is not None:
+            self.filters.append((f"{_column(field)} > ?", (_sql_value(value),)))
+        if not self.ordering:
+            self.ordering = (_column(field),)
+        return self
+
+    def limit(self, count):
+        """Return at most count rows."""
+        self.limit_count = count
+        return self
+
+    def _sql(self, limit):
+        key = (self.table, self.columns, tuple(fragment for fragment, _ in self.filters),
+               self.ordering, limit is not None)
+        sql = self._compiled.get(key)
+        if sql is None:
+            sql = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+            if self.filters:
+                sql += " WHERE " + " AND ".join(fragment for fragment, _ in self.filters)
+            if self.ordering:
+                sql += " ORDER BY " + ", ".join(self.ordering)
+            if limit is not None:
+                sql += " LIMIT ?"
+            if len(self._compiled) >= MAX_COMPILED:
+                self._compiled.clear()
+            self._compiled[key] = sql
+        return sql
+
+    def _execute(self, limit):
+        params = [value for _, values in self.filters for value in values]
+        if limit is not None:
+            params.append(limit)
+        return get_db_connection().execute(self._sql(limit), params)
+
+    def all(self):
+        """Execute the query and return all results."""
+        return self.model_class.hydrate(self._execute(self.limit_count))
+
+    def first(self):
+        """Execute the query and return the first result."""
+        cursor = self._execute(1)
+        row = cursor.fetchone()
+        if row:
+            return self.model_class.hydrate(cursor, [row])[0]
+        return None
+
+    def rows(self, *fields):
+        """
+        Execute the query and return plain rows instead of model instances.
+
+        Only the given columns are read (all of them by default) and no model
+        is constructed, which is much cheaper for listings.
+
+        Args:
+            *fields (str): Columns to return
+
+        Returns:
+            list: One dict per row
+        """
+        if fields:
+            self.columns = tuple(_column(field) for field in fields)
+        return [dict(row) for row in self._execute(self.limit_count)]
+
+    def all_by(self, field, values):
+        """
+        Execute the query for many values of a field and key the results by that field.
+
+        Runs one query per IN_CHUNK_SIZE values. When several rows share a value
+        the last one in the query order is kept.
+
+        Args:
+            field (str): Column to match, e.g. 'location_id'
+            values (iterable): Values of the column
+
+        Returns:
+            dict: Model instances keyed by their value of field
+        """
+        values = list(dict.fromkeys(values))
+        results = {}
+        for start in range(0, len(values), IN_CHUNK_SIZE):
+            query = self.__class__(self.model_class)
+            query.filters = self.filters.copy()
+            query.ordering = self.ordering
+            query.filter_in(field, values[start:start + IN_CHUNK_SIZE])
+            for instance in self.model_class.hydrate(query._execute(None)):
+                results[getattr(instance, field)] = instance
+        return results
@@ -0,0 +1,129 @@
+from datetime import date as dt_date, datetime, timezone
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def _date_from_string(value):
+    return dt_date.fromisoformat(value)
+
+
+def parse_date(value):
+    """Parse a stored date ('YYYY-MM-DD'); dates and None are returned as is."""
+    if isinstance(value, str):
+        # Rows of the same day share one date object
+        return _date_from_string(value)
+    return value
+
+
+def format_timestamp(value=None):
+    """
+    Format a timestamp the way every table stores it (default: now).
+
+    Timestamps are stored as naive UTC text with a space separator, like SQLite's
+    CURRENT_TIMESTAMP, so ordering a column as text orders it by time.
+    """
+    value = value or datetime.now(timezone.utc)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(' ', timespec='microseconds')
+
+
+def parse_timestamp(value):
+    """Parse a stored timestamp into an aware datetime, naive values being UTC."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class lazy_column:
+    """
+    Column kept as stored and parsed on first access.
+
+    The raw value lives in the '_<name>' slot; reading the attribute parses it
+    once and keeps the result, assigning it stores the value as given.
+    """
+
+    def __init__(self, parse):
+        self.parse = parse
+
+    def __set_name__(self, owner, name):
+        self.slot = f'_{name}'
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        slot = self.slot
+        value = getattr(instance, slot)
+        if isinstance(value, str):
+            value = self.parse(value)
+            setattr(instance, slot, value)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value)
+
+
+class Record:
+    """
+    Base of the models: one slot per column and no instance __dict__.
+
+    Subclasses list their table columns in `columns` and the matching slots in
+    `__slots__`, in the same order; a column declared with lazy_column is kept
+    in the '_<name>' slot. Rows loaded from the database go through hydrate(),
+    which fills the slots directly instead of running __init__.
+
+    Text columns listed in `shared` repeat across rows (dates, conditions,
+    tide times); the instances of one load share a single string per value.
+    """
+
+    __slots__ = ()
+    columns = ()
+    shared = ()
+
+    _hydration_plans = {}
+
+    @classmethod
+    def _hydration_plan(cls, names):
+        key = (cls, names)
+        plan = cls._hydration_plans.get(key)
+        if plan is None:
+            slots = dict(zip(cls.columns, cls.__slots__))
+            assigned = [(index, slots[name]) for index, name in enumerate(names)
+                        if name in slots and name not in cls.shared]
+            shared = [(index, slots[name]) for index, name in enumerate(names) if name in cls.shared]
+            missing = [slot for name, slot in slots.items() if name not in names]
+            plan = cls._hydration_plans[key] = (assigned, shared, missing)
+        return plan
+
+    @classmethod
+    def hydrate(cls, cursor, rows=None):
+        """
+        Build instances from the rows of a cursor without calling __init__.
+
+        Args:
+            cursor (sqlite3.Cursor): Executed cursor, read for its column names
+            rows (iterable, optional): Rows to hydrate (default: the remaining rows of the cursor)
+
+        Returns:
+            list: Model instances
+        """
+        assigned, shared, missing = cls._hydration_plan(tuple(column[0] for column in cursor.description))
+        new = cls.__new__
+        values = {}
+        instances = []
+        for row in (cursor if rows is None else rows):
+            instance = new(cls)
+            for index, slot in assigned:
+                setattr(instance, slot, row[index])
+            for index, slot in shared:
+                value = row[index]
+                setattr(instance, slot, values.setdefault(value, value))
+            for slot in missing:
+                setattr(instance, slot, None)
+            instances.append(instance)
+        return instances
@@ -1,20 +1,31 @@
-from datetime import datetime, timezone, date as dt_date
-from models import get_db_connection
+from datetime import datetime, timezone
+from database.connection import transaction
+from models.query import Query
+from models.record import Record, format_timestamp, lazy_column, parse_timestamp, parse_date
 
-class TidalData:
+class TidalData(Record):
     """Model for storing tidal data information."""
     
+    columns = ('id', 'location_id', 'date', 'coefficient', 'high_tide_time', 'low_tide_time', 'created_at', 'updated_at')
+    __slots__ = ('id', 'location_id', '_date', 'coefficient', 'high_tide_time', 'low_tide_time', '_created_at', '_updated_at')
+    shared = ('date', 'high_tide_time', 'low_tide_time')
+    
+    date = lazy_column(parse_date)
+    created_at = lazy_column(parse_timestamp)
+    updated_at = lazy_column(parse_timestamp)
+    
     def __init__(self, id=None, location_id=None, date=None, coefficient=None, 
                  high_tide_time=None, low_tide_time=None, created_at=None, updated_at=None):
         self.id = id
         self.location_id = location_id
-        self.date = date if isinstance(date, dt_date) else dt_date.fromisoformat(date) if date else None
+        self.date = date
         self.coefficient = coefficient
         self.high_tide_time = high_tide_time
         self.low_tide_time = low_tide_time
-        self.created_at = created_at or datetime.now(timezone.utc)
-        self.updated_at = updated_at or datetime.now(timezone.utc)
-    
+        now = datetime.now(timezone.utc) if created_at is None or updated_at is None else None
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
+
     def __repr__(self):
         return f'<TidalData {self.date} for location {self.location_id}>'
     
@@ -37,96 +48,62 @@ class TidalData:
     @classmethod
     def get_by_location_and_date(cls, location_id, date):
         """Get tidal data for a specific location and date."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        return cls.query().filter_by(location_id=location_id, date=date).first()
+    
+    @classmethod
+    def get_many(cls, location_ids, date):
+        """
+        Get the tidal data of many locations for one date with one query per chunk of IDs.
         
-        if isinstance(date, dt_date):
-            date_str = date.isoformat()
-        else:
-            date_str = date
+        Args:
+            location_ids (iterable): Location IDs
+            date (date): Date of the data
             
-        cursor.execute(
-            "SELECT * FROM tidal_data WHERE location_id = ? AND date = ?", 
-            (location_id, date_str)
-        )
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return cls(**dict(row))
-        return None
+        Returns:
+            dict: TidalData keyed by location ID, for the locations that have data
+        """
+        return cls.query().filter_by(date=date).order_by('updated_at').all_by('location_id', location_ids)
+    
+    @classmethod
+    def get_latest_by_location(cls, location_id):
+        """Get the most recent tidal data stored for a location, whatever its date."""
+        return cls.query().filter_by(location_id=location_id).order_by('-date', '-updated_at').first()
     
     def save(self):
         """Save the tidal data to the database."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         now = datetime.now(timezone.utc)
         self.updated_at = now
+        stored_now = format_timestamp(now)
         
-        if self.id:
-            # Update existing tidal data
-            cursor.execute(
-                """UPDATE tidal_data 
-                   SET location_id = ?, date = ?, coefficient = ?, 
-                       high_tide_time = ?, low_tide_time = ?, updated_at = ? 
-                   WHERE id = ?""",
-                (self.location_id, self.date.isoformat(), self.coefficient, 
-                 self.high_tide_time, self.low_tide_time, now, self.id)
-            )
-        else:
-            # Insert new tidal data
-            self.created_at = now
-            cursor.execute(
-                """INSERT INTO tidal_data 
-                   (location_id, date, coefficient, high_tide_time, low_tide_time, created_at, updated_at) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (self.location_id, self.date.isoformat(), self.coefficient, 
-                 self.high_tide_time, self.low_tide_time, now, now)
-            )
-            self.id = cursor.lastrowid
+        with transaction() as conn:
+            cursor = conn.cursor()
+            
+            if self.id:
+                # Update existing tidal data
+                cursor.execute(
+                    """UPDATE tidal_data 
+                       SET location_id = ?, date = ?, coefficient = ?, 
+                           high_tide_time = ?, low_tide_time = ?, updated_at = ? 
+                       WHERE id = ?""",
+                    (self.location_id, self.date.isoformat(), self.coefficient, 
+                     self.high_tide_time, self.low_tide_time, stored_now, self.id)
+                )
+            else:
+                # Insert new tidal data
+                self.created_at = now
+                cursor.execute(
+                    """INSERT INTO tidal_data 
+                       (location_id, date, coefficient, high_tide_time, low_tide_time, created_at, updated_at) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (self.location_id, self.date.isoformat(), self.coefficient, 
+                     self.high_tide_time, self.low_tide_time, stored_now, stored_now)
+                )
+                self.id = cursor.lastrowid
         
-        conn.commit()
-        conn.close()
         return self
 
 
-class TidalDataQuery:
+class TidalDataQuery(Query):
     """Query builder for TidalData model."""
-    
-    def __init__(self, model_class):
-        self.model_class = model_class
-        self.filters = []
-    
-    def filter_by(self, **kwargs):
-        """Add a filter by keyword arguments."""
-        for key, value in kwargs.items():
-            if key == 'date' and isinstance(value, dt_date):
-                value = value.isoformat()
-            self.filters.append((f"{key} = ?", value))
-        return self
-    
-    def first(self):
-        """Execute the query and return the first result."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM tidal_data"
-        params = []
-        
-        if self.filters:
-            conditions = []
-            for filter_args in self.filters:
-                conditions.append(filter_args[0])
-                params.append(filter_args[1])
-            
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " LIMIT 1"
-        cursor.execute(query, params)
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return self.model_class(**dict(row))
-        return None
\ No newline at end of file
+
+    table = 'tidal_data'
@@ -1,23 +1,34 @@
-from datetime import datetime, timezone, date as dt_date
-from models import get_db_connection
+from datetime import datetime, timezone
+from database.connection import transaction
+from models.query import Query
+from models.record import Record, format_timestamp, lazy_column, parse_timestamp, parse_date
 
-class WeatherData:
+class WeatherData(Record):
     """Model for storing weather data information."""
     
+    columns = ('id', 'location_id', 'date', 'temperature', 'condition', 'wind_speed', 'sunrise', 'sunset', 'created_at', 'updated_at')
+    __slots__ = ('id', 'location_id', '_date', 'temperature', 'condition', 'wind_speed', 'sunrise', 'sunset', '_created_at', '_updated_at')
+    shared = ('date', 'condition', 'sunrise', 'sunset')
+    
+    date = lazy_column(parse_date)
+    created_at = lazy_column(parse_timestamp)
+    updated_at = lazy_column(parse_timestamp)
+    
     def __init__(self, id=None, location_id=None, date=None, temperature=None, 
                  condition=None, wind_speed=None, sunrise=None, sunset=None, 
                  created_at=None, updated_at=None):
         self.id = id
         self.location_id = location_id
-        self.date = date if isinstance(date, dt_date) else dt_date.fromisoformat(date) if date else None
+        self.date = date
         self.temperature = temperature
         self.condition = condition
         self.wind_speed = wind_speed
         self.sunrise = sunrise
         self.sunset = sunset
-        self.created_at = created_at or datetime.now(timezone.utc)
-        self.updated_at = updated_at or datetime.now(timezone.utc)
-    
+        now = datetime.now(timezone.utc) if created_at is None or updated_at is None else None
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
+
     def __repr__(self):
         return f'<WeatherData {self.date} for location {self.location_id}>'
     
@@ -42,96 +53,62 @@ class WeatherData:
     @classmethod
     def get_by_location_and_date(cls, location_id, date):
         """Get weather data for a specific location and date."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        return cls.query().filter_by(location_id=location_id, date=date).first()
+    
+    @classmethod
+    def get_many(cls, location_ids, date):
+        """
+        Get the weather data of many locations for one date with one query per chunk of IDs.
         
-        if isinstance(date, dt_date):
-            date_str = date.isoformat()
-        else:
-            date_str = date
+        Args:
+            location_ids (iterable): Location IDs
+            date (date): Date of the data
             
-        cursor.execute(
-            "SELECT * FROM weather_data WHERE location_id = ? AND date = ?", 
-            (location_id, date_str)
-        )
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return cls(**dict(row))
-        return None
+        Returns:
+            dict: WeatherData keyed by location ID, for the locations that have data
+        """
+        return cls.query().filter_by(date=date).order_by('updated_at').all_by('location_id', location_ids)
+    
+    @classmethod
+    def get_latest_by_location(cls, location_id):
+        """Get the most recent weather data stored for a location, whatever its date."""
+        return cls.query().filter_by(location_id=location_id).order_by('-date', '-updated_at').first()
     
     def save(self):
         """Save the weather data to the database."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         now = datetime.now(timezone.utc)
         self.updated_at = now
+        stored_now = format_timestamp(now)
         
-        if self.id:
-            # Update existing weather data
-            cursor.execute(
-                """UPDATE weather_data 
-                   SET location_id = ?, date = ?, temperature = ?, condition = ?, 
-                       wind_speed = ?, sunrise = ?, sunset = ?, updated_at = ? 
-                   WHERE id = ?""",
-                (self.location_id, self.date.isoformat(), self.temperature, self.condition, 
-                 self.wind_speed, self.sunrise, self.sunset, now, self.id)
-            )
-        else:
-            # Insert new weather data
-            self.created_at = now
-            cursor.execute(
-                """INSERT INTO weather_data 
-                   (location_id, date, temperature, condition, wind_speed, sunrise, sunset, created_at, updated_at) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (self.location_id, self.date.isoformat(), self.temperature, self.condition, 
-                 self.wind_speed, self.sunrise, self.sunset, now, now)
-            )
-            self.id = cursor.lastrowid
+        with transaction() as conn:
+            cursor = conn.cursor()
+            
+            if self.id:
+                # Update existing weather data
+                cursor.execute(
+                    """UPDATE weather_data 
+                       SET location_id = ?, date = ?, temperature = ?, condition = ?, 
+                           wind_speed = ?, sunrise = ?, sunset = ?, updated_at = ? 
+                       WHERE id = ?""",
+                    (self.location_id, self.date.isoformat(), self.temperature, self.condition, 
+                     self.wind_speed, self.sunrise, self.sunset, stored_now, self.id)
+                )
+            else:
+                # Insert new weather data
+                self.created_at = now
+                cursor.execute(
+                    """INSERT INTO weather_data 
+                       (location_id, date, temperature, condition, wind_speed, sunrise, sunset, created_at, updated_at) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (self.location_id, self.date.isoformat(), self.temperature, self.condition, 
+                     self.wind_speed, self.sunrise, self.sunset, stored_now, stored_now)
+                )
+                self.id = cursor.lastrowid
         
-        conn.commit()
-        conn.close()
         return self
 
 
-class WeatherDataQuery:
+class WeatherDataQuery(Query):
     """Query builder for WeatherData model."""
-    
-    def __init__(self, model_class):
-        self.model_class = model_class
-        self.filters = []
-    
-    def filter_by(self, **kwargs):
-        """Add a filter by keyword arguments."""
-        for key, value in kwargs.items():
-            if key == 'date' and isinstance(value, dt_date):
-                value = value.isoformat()
-            self.filters.append((f"{key} = ?", value))
-        return self
-    
-    def first(self):
-        """Execute the query and return the first result."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM weather_data"
-        params = []
-        
-        if self.filters:
-            conditions = []
-            for filter_args in self.filters:
-                conditions.append(filter_args[0])
-                params.append(filter_args[1])
-            
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " LIMIT 1"
-        cursor.execute(query, params)
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return self.model_class(**dict(row))
-        return None
\ No newline at end of file
+
+    table = 'weather_data'
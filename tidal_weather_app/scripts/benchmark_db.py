@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark database access: a connection opened and closed around every query
+against the long-lived per-thread connections of the connection manager.
+Reports throughput of point lookups and small inserts on a synthetic database.
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Define paths
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from database.connection import ConnectionManager
+
+
+def build_synthetic_db(path, rows):
+    """Create a locations table with rows locations and an empty weather_data table."""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''
+    CREATE TABLE locations (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        latitude REAL NOT NULL,
+        longitude REAL NOT NULL,
+        description TEXT,
+        timezone TEXT DEFAULT 'UTC',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE weather_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        location_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        temperature REAL NOT NULL,
+        condition TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    rng = random.Random(42)
+    conn.executemany(
+        'INSERT INTO locations (id, name, latitude, longitude) VALUES (?, ?, ?, ?)',
+        ((i, f"Location {i}", rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(1, rows + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+def lookup_per_call(db_path, location_id):
+    """Point lookup the way the models did it: connect, query, close."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute('SELECT * FROM locations WHERE id = ?', (location_id,)).fetchone()
+    finally:
+        conn.close()
+
+
+def insert_per_call(db_path, location_id):
+    """Small insert the way the models did it: connect, insert, commit, close."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO weather_data (location_id, date, temperature, condition) VALUES (?, date('now'), 20.5, 'Clear')",
+            (location_id,)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def lookup_managed(manager, location_id):
+    return manager.execute('SELECT * FROM locations WHERE id = ?', (location_id,)).fetchone()
+
+
+def insert_managed(manager, location_id):
+    with manager.transaction() as conn:
+        conn.execute(
+            "INSERT INTO weather_data (location_id, date, temperature, condition) VALUES (?, date('now'), 20.5, 'Clear')",
+            (location_id,)
+        )
+
+
+def run(operation, target, rows, operations, threads):
+    """Run operations calls of operation over threads threads and return the calls per second."""
+    per_thread = operations // threads
+
+    def work(seed):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            operation(target, rng.randint(1, rows))
+
+    workers = [threading.Thread(target=work, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark per-query connections against managed connections')
+    parser.add_argument('--rows', type=int, default=10000, help='Locations in the synthetic database')
+    parser.add_argument('-n', '--operations', type=int, default=20000, help='Lookups per run (inserts are a tenth)')
+    parser.add_argument('-t', '--threads', type=int, default=1, help='Threads sharing the work')
+    args = parser.parse_args()
+
+    db_path = str(Path(tempfile.mkdtemp()) / 'benchmark.db')
+    print(f"Building synthetic database of {args.rows} locations...")
+    build_synthetic_db(db_path, args.rows)
+    manager = ConnectionManager(db_path)
+
+    inserts = max(args.operations // 10, args.threads)
+    print(f"{args.operations} lookups and {inserts} inserts over {args.threads} thread(s)")
+    for label, operation, target, count in (
+        ('lookup per-call', lookup_per_call, db_path, args.operations),
+        ('lookup managed', lookup_managed, manager, args.operations),
+        ('insert per-call', insert_per_call, db_path, inserts),
+        ('insert managed', insert_managed, manager, inserts),
+    ):
+        rate = run(operation, target, args.rows, count, args.threads)
+        print(f"{label:<16} {rate:10.0f} ops/s")
+    manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark model hydration: dict-backed models built with cls(**dict(row)), as
+the models used to be, against the slotted models hydrated from the rows.
+Reports the time to load the rows and the memory the instances hold.
+"""
+
+import argparse
+import gc
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date as dt_date, datetime, timedelta, timezone
+from pathlib import Path
+
+# Define paths
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from database.connection import ConnectionManager
+from models import WeatherData
+from models.record import parse_timestamp
+
+
+class LegacyWeatherData:
+    """WeatherData as it was implemented before slotted records."""
+
+    def __init__(self, id=None, location_id=None, date=None, temperature=None,
+                 condition=None, wind_speed=None, sunrise=None, sunset=None,
+                 created_at=None, updated_at=None):
+        self.id = id
+        self.location_id = location_id
+        self.date = date if isinstance(date, dt_date) else dt_date.fromisoformat(date) if date else None
+        self.temperature = temperature
+        self.condition = condition
+        self.wind_speed = wind_speed
+        self.sunrise = sunrise
+        self.sunset = sunset
+        self.created_at = created_at or datetime.now(timezone.utc)
+        self.updated_at = updated_at or datetime.now(timezone.utc)
+
+
+def build_synthetic_db(path, rows):
+    """Create a weather_data table with rows rows."""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE weather_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        location_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        temperature REAL NOT NULL,
+        condition TEXT NOT NULL,
+        wind_speed REAL,
+        sunrise TEXT,
+        sunset TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    start = dt_date.today()
+    now = datetime.now(timezone.utc)
+    conn.executemany(
+        """INSERT INTO weather_data
+           (location_id, date, temperature, condition, wind_speed, sunrise, sunset, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (
+            (i % 1000, (start - timedelta(days=i // 1000)).isoformat(), 15.5, 'Clear', 4.2,
+             '07:12', '19:48', now, now)
+            for i in range(rows)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+
+def load_legacy(manager):
+    rows = manager.execute('SELECT * FROM weather_data').fetchall()
+    return [LegacyWeatherData(**dict(row)) for row in rows]
+
+
+def load_slotted(manager):
+    return WeatherData.hydrate(manager.execute('SELECT * FROM weather_data'))
+
+
+def measure(label, load, manager, touch):
+    """Time a load, then measure the memory held by its instances."""
+    gc.collect()
+    start = time.perf_counter()
+    instances = load(manager)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for instance in instances:
+        touch(instance)
+    touch_time = time.perf_counter() - start
+    del instances
+
+    gc.collect()
+    tracemalloc.start()
+    instances = load(manager)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_row = current / len(instances)
+    print(f"{label:<8} load {load_time * 1000:8.1f} ms | read dates {touch_time * 1000:7.1f} ms | "
+          f"{current / (1024 * 1024):7.1f} MB ({per_row:.0f} B/row)")
+
+
+def main():
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark model hydration time and memory')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows in the synthetic table')
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.mkdtemp()) / 'benchmark.db'
+    print(f"Building synthetic table of {args.rows} weather rows...")
+    build_synthetic_db(db_path, args.rows)
+    manager = ConnectionManager(db_path)
+
+    # Pages read the date and the age of each row; legacy rows kept timestamps as strings
+    touch = lambda instance: (instance.date, parse_timestamp(instance.updated_at))
+    measure('legacy', load_legacy, manager, touch)
+    measure('slotted', load_slotted, manager, touch)
+    manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
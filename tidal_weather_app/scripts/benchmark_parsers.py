@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the HTML extraction backends over saved OpenWeatherMap pages.
+Reports pages/s and the Python heap allocated per parse for each backend.
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Define paths
+BASE_DIR = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = BASE_DIR / 'data' / 'fixtures' / 'weather'
+sys.path.insert(0, str(BASE_DIR))
+
+from services import html_extract
+from services.http_client import get_http_client
+
+
+def save_fixtures(city_ids, fixtures_dir):
+    """Download the city pages of the given ids into the fixtures directory."""
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    client = get_http_client()
+    for city_id in city_ids:
+        response = client.get(f"https://openweathermap.org/city/{city_id}")
+        response.raise_for_status()
+        path = fixtures_dir / f"{city_id}.html"
+        path.write_text(response.text, encoding='utf-8')
+        print(f"Saved {path} ({len(response.text)} characters)")
+
+
+def load_fixtures(paths):
+    pages = []
+    for path in paths:
+        path = Path(path)
+        files = sorted(path.glob('*.html')) if path.is_dir() else [path]
+        pages.extend(f.read_text(encoding='utf-8') for f in files)
+    return pages
+
+
+def benchmark(backend, pages, repeat):
+    """Return (pages per second, mean peak Python heap per parse in KB, pages with a widget)."""
+    # Warm up so selector compilation is not part of the measurement
+    for page in pages:
+        html_extract.parse_weather_html(page, 0, backend)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            html_extract.parse_weather_html(page, 0, backend)
+    elapsed = time.perf_counter() - start
+
+    peaks = []
+    found = 0
+    for page in pages:
+        tracemalloc.start()
+        result = html_extract.parse_weather_html(page, 0, backend)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        found += result is not None
+
+    return len(pages) * repeat / elapsed, sum(peaks) / len(peaks) / 1024, found
+
+
+def main():
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark weather page parsing backends')
+    parser.add_argument('paths', nargs='*', default=[str(FIXTURES_DIR)], help='HTML files or directories of fixtures')
+    parser.add_argument('-r', '--repeat', type=int, default=20, help='Number of passes over the fixtures')
+    parser.add_argument('--save', type=int, nargs='+', metavar='CITY_ID', help='Download city pages as fixtures first')
+    args = parser.parse_args()
+
+    if args.save:
+        save_fixtures(args.save, FIXTURES_DIR)
+
+    pages = load_fixtures(args.paths)
+    if not pages:
+        print(f"Error: no HTML fixtures found in {', '.join(args.paths)}")
+        print("Save some with --save CITY_ID [CITY_ID ...]")
+        sys.exit(1)
+
+    print(f"{len(pages)} pages x {args.repeat} passes")
+    print("Memory is the Python heap peak per parse; native parser allocations are not traced.")
+    for backend in html_extract.available_backends():
+        pages_per_s, heap_kb, found = benchmark(backend, pages, args.repeat)
+        print(f"{backend:<11} {pages_per_s:10.1f} pages/s | {heap_kb:9.1f} KB/parse | "
+              f"widget found in {found}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark city search: the legacy LIKE '%q%' scan against the FTS5 trigram index.
+Reports per-query latency for both strategies over the same set of queries.
+"""
+
+import argparse
+import random
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Define paths
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_FILE = BASE_DIR / 'data' / 'cities.db'
+sys.path.insert(0, str(BASE_DIR))
+
+from services import search_index
+
+DEFAULT_QUERIES = ['Paris', 'par', 'Saint', 'sur-Mer', 'Brest', 'ville', 'Lisbon', 'an', 'Marseille', 'xyz']
+
+
+def legacy_search(conn, name, country=None, limit=10):
+    """The search as it was implemented before the FTS index."""
+    query = "SELECT * FROM cities WHERE name LIKE ?"
+    params = [f"%{name}%"]
+    if country:
+        query += " AND country = ?"
+        params.append(country.upper())
+    query += " ORDER BY name LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+
+def build_synthetic_db(path, rows):
+    """Create a cities table filled with random names, plus its search index."""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE cities (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        state TEXT,
+        country TEXT NOT NULL,
+        latitude REAL NOT NULL,
+        longitude REAL NOT NULL
+    )
+    ''')
+    rng = random.Random(42)
+    countries = ['FR', 'PT', 'ES', 'GB', 'US', 'DE', 'IT']
+    words = DEFAULT_QUERIES + [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(2000)]
+    conn.executemany(
+        'INSERT INTO cities VALUES (?, ?, ?, ?, ?, ?)',
+        (
+            (i, ' '.join(rng.choice(words) for _ in range(rng.randint(1, 3))).title(), '',
+             rng.choice(countries), rng.uniform(-90, 90), rng.uniform(-180, 180))
+            for i in range(1, rows + 1)
+        )
+    )
+    conn.execute('CREATE INDEX idx_city_name ON cities (name)')
+    conn.execute('CREATE INDEX idx_city_country ON cities (country)')
+    search_index.build_search_index(conn)
+    conn.commit()
+    conn.close()
+
+
+def time_queries(search, conn, queries, repeat):
+    """Return the per-query latencies in milliseconds."""
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            search(conn, query)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def report(label, latencies):
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+    mean = sum(latencies) / len(latencies)
+    print(f"{label:<10} mean {mean:8.3f} ms | p50 {p50:8.3f} ms | p95 {p95:8.3f} ms")
+
+
+def main():
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark city search latency')
+    parser.add_argument('-q', '--query', action='append', help='Query to run (repeatable)')
+    parser.add_argument('-r', '--repeat', type=int, default=20, help='Number of passes over the queries')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help='Benchmark a synthetic catalog of ROWS cities')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        db_path = Path(tempfile.mkdtemp()) / 'cities.db'
+        print(f"Building synthetic catalog of {args.synthetic} cities...")
+        build_synthetic_db(db_path, args.synthetic)
+    else:
+        db_path = DB_FILE
+        if not db_path.exists():
+            print(f"Error: Database file not found at {db_path}")
+            print("Please run create_cities_db.py first or pass --synthetic ROWS.")
+            sys.exit(1)
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    if not search_index.has_search_index(conn):
+        print("Error: the database has no search index, rebuild it with create_cities_db.py")
+        sys.exit(1)
+
+    queries = args.query or DEFAULT_QUERIES
+    rows = conn.execute('SELECT COUNT(*) FROM cities').fetchone()[0]
+    print(f"{len(queries)} queries x {args.repeat} passes over {rows} cities")
+    report('LIKE', time_queries(legacy_search, conn, queries, args.repeat))
+    report('FTS5', time_queries(search_index.search_cities, conn, queries, args.repeat))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
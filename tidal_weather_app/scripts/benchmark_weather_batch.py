@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark batched weather fetches against a local stand-in for the weather APIs.
+
+A threaded HTTP server on localhost answers the OpenWeatherMap /weather and
+/group endpoints and the Open-Meteo forecast endpoint with synthetic data
+after a configurable latency. The script fetches every city of a synthetic
+cities table one request at a time, then with fetch_weather_batch, checks
+that both return the same weather for every city and reports the number of
+upstream requests and the wall time of each.
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Define paths
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import config
+from services.weather_service import WeatherService
+
+
+def synthetic_weather(key):
+    """Deterministic conditions for a city ID or a coordinate pair."""
+    seed = abs(hash(key)) % 1000
+    return {
+        'temp': round(5 + seed % 25 + 0.5, 1),
+        'humidity': 40 + seed % 60,
+        'pressure': 990 + seed % 40,
+        'wind': round((seed % 150) / 10, 1),
+        'visibility': 10000,
+        'code': (0, 2, 3, 61)[seed % 4],
+    }
+
+
+def owm_item(city_id):
+    weather = synthetic_weather(city_id)
+    description = {0: 'clear sky', 2: 'partly cloudy', 3: 'overcast clouds', 61: 'light rain'}[weather['code']]
+    return {
+        'id': city_id,
+        'main': {'temp': weather['temp'], 'humidity': weather['humidity'], 'pressure': weather['pressure']},
+        'weather': [{'description': description}],
+        'wind': {'speed': weather['wind']},
+        'visibility': weather['visibility'],
+    }
+
+
+def meteo_item(latitude, longitude):
+    weather = synthetic_weather((latitude, longitude))
+    return {
+        'latitude': float(latitude),
+        'longitude': float(longitude),
+        'current': {
+            'temperature_2m': weather['temp'],
+            'relative_humidity_2m': weather['humidity'],
+            'dew_point_2m': round(weather['temp'] - 4, 1),
+            'weather_code': weather['code'],
+            'pressure_msl': weather['pressure'],
+            'wind_speed_10m': weather['wind'],
+            'visibility': weather['visibility'],
+        },
+    }
+
+
+class StandInAPI(BaseHTTPRequestHandler):
+    """Answers the weather API endpoints used by WeatherService."""
+
+    latency = 0.05
+    requests = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.lock:
+            self.requests[url.path] = self.requests.get(url.path, 0) + 1
+        time.sleep(self.latency)
+
+        if url.path == '/data/2.5/weather':
+            body = owm_item(int(query['id']))
+        elif url.path == '/data/2.5/group':
+            ids = [int(value) for value in query['id'].split(',')]
+            if len(ids) > 20:
+                return self._send(400, {'cod': '400', 'message': 'Max 20 ids allowed'})
+            body = {'cnt': len(ids), 'list': [owm_item(city_id) for city_id in ids]}
+        elif url.path == '/v1/forecast':
+            pairs = list(zip(query['latitude'].split(','), query['longitude'].split(',')))
+            items = [meteo_item(latitude, longitude) for latitude, longitude in pairs]
+            body = items if len(items) > 1 else items[0]
+        else:
+            return self._send(404, {'message': 'Not found'})
+        self._send(200, body)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def build_cities_db(path, count):
+    """Create a cities table with count synthetic cities."""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE cities (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        state TEXT,
+        country TEXT NOT NULL,
+        latitude REAL NOT NULL,
+        longitude REAL NOT NULL
+    )
+    ''')
+    conn.executemany(
+        "INSERT INTO cities (id, name, state, country, latitude, longitude) VALUES (?, ?, '', 'FR', ?, ?)",
+        ((1000 + i, f"City {i}", 42 + (i % 900) / 100, -4 + (i // 900) / 10) for i in range(count))
+    )
+    conn.commit()
+    conn.close()
+    return list(range(1000, 1000 + count))
+
+
+def comparable(weather):
+    """The fields of a weather dict that do not depend on the time of the fetch."""
+    return {key: value for key, value in weather.items() if key not in ('date_time', 'fetched_at')}
+
+
+def run(label, fetch):
+    StandInAPI.requests.clear()
+    start = time.perf_counter()
+    results = fetch()
+    elapsed = time.perf_counter() - start
+    calls = sum(StandInAPI.requests.values())
+    print(f"{label:<28} {len(results):6d} cities | {calls:6d} requests | {elapsed:7.2f} s")
+    return results
+
+
+def main():
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark batched weather fetches against a local stand-in API')
+    parser.add_argument('--cities', type=int, default=1000, help='Cities to fetch')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stand-in response latency in seconds')
+    parser.add_argument('-w', '--workers', type=int, default=config.WEATHER_BATCH_WORKERS,
+                        help='Concurrent requests, for both the per-city and the batched runs')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInAPI)
+    StandInAPI.latency = args.latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    config.OWM_API_URL = f"{base}/data/2.5"
+    config.OPEN_METEO_URL = f"{base}/v1/forecast"
+
+    db_path = Path(tempfile.mkdtemp()) / 'cities.db'
+    city_ids = build_cities_db(db_path, args.cities)
+    service = WeatherService(db_path)
+    print(f"{args.cities} cities, {args.latency * 1000:.0f} ms stand-in latency, {args.workers} concurrent requests")
+
+    def per_city():
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            results = pool.map(lambda city_id: service.fetch_weather_data_api(city_id, api_key='stand-in'), city_ids)
+            return dict(zip(city_ids, results))
+
+    single = run('OpenWeatherMap per city', per_city)
+    grouped = run('OpenWeatherMap groups of 20',
+                  lambda: service.fetch_weather_batch(city_ids, api_key='stand-in', workers=args.workers))
+    meteo = run(f'Open-Meteo batches of {config.OPEN_METEO_BATCH_SIZE}',
+                lambda: service.fetch_weather_batch(city_ids, workers=args.workers))
+
+    mismatches = [city_id for city_id in city_ids
+                  if city_id not in grouped or comparable(grouped[city_id]) != comparable(single[city_id])]
+    incomplete = [city_id for city_id in city_ids if city_id not in meteo]
+    server.shutdown()
+    if mismatches or incomplete:
+        print(f"FAILED: {len(mismatches)} group results differ from per-city results, "
+              f"{len(incomplete)} cities missing from Open-Meteo batches")
+        sys.exit(1)
+    print("Batched results match the per-city results")
+
+
+if __name__ == "__main__":
+    main()
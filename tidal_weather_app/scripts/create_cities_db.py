@@ -2,93 +2,258 @@
 """
 Script to convert city.list.min.json to a SQLite database.
 This creates a cities table with all the city information.
+
+The JSON array is parsed incrementally and inserted in large executemany
+batches into a staging database, with bulk-load PRAGMAs. The staged rows then
+replace the cities and cities_fts tables of the existing database in one
+transaction, so the app tables stored next to them are left untouched.
 """
 
+import argparse
 import json
 import sqlite3
 import os
+import resource
 import sys
+import time
 from pathlib import Path
 
 # Define paths
 BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from services.search_index import FTS_TABLE, build_search_index
+
 JSON_FILE = BASE_DIR / 'data' / 'city.list.min.json'
 DB_FILE = BASE_DIR / 'data' / 'cities.db'
 
-def create_database():
+CITIES_SCHEMA = '''
+CREATE TABLE {table} (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    state TEXT,
+    country TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL
+)
+'''
+
+BATCH_SIZE = 20000
+CHUNK_SIZE = 1024 * 1024
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """
+    Yield the objects of a top-level JSON array without loading the whole file.
+
+    Args:
+        f (file): Text file positioned at the start of the array
+        chunk_size (int): Number of characters read at a time
+
+    Yields:
+        The decoded array elements, one at a time
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        # Drop what was already consumed so the buffer stays about one chunk long
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    skip(' \t\r\n')
+    if pos >= len(buffer) or buffer[pos] != '[':
+        raise ValueError("Expected a JSON array")
+    pos += 1
+
+    while True:
+        skip(' \t\r\n,')
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of JSON array")
+        if buffer[pos] == ']':
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+        pos = end
+        yield item
+
+def iter_city_rows(cities, stats):
+    """Convert JSON city records into cities table rows, skipping incomplete records."""
+    for city in cities:
+        try:
+            yield (
+                city['id'],
+                city['name'],
+                city.get('state', ''),
+                city['country'],
+                city['coord']['lat'],
+                city['coord']['lon']
+            )
+        except (KeyError, TypeError) as e:
+            stats['skipped'] += 1
+            print(f"Warning: Missing key {e} in city data, skipping record")
+
+def peak_rss_mb():
+    """Peak resident set size of this process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def create_database(json_file=JSON_FILE, db_file=DB_FILE, batch_size=BATCH_SIZE):
     """Create SQLite database from JSON file."""
-    print(f"Converting {JSON_FILE} to SQLite database...")
-    
+    json_file = Path(json_file)
+    db_file = Path(db_file)
+    print(f"Converting {json_file} to SQLite database...")
+
     # Check if JSON file exists
-    if not JSON_FILE.exists():
-        print(f"Error: JSON file not found at {JSON_FILE}")
+    if not json_file.exists():
+        print(f"Error: JSON file not found at {json_file}")
         sys.exit(1)
-    
+
     # Create data directory if it doesn't exist
-    os.makedirs(BASE_DIR / 'data', exist_ok=True)
-    
-    # Remove existing database if it exists
-    if DB_FILE.exists():
-        os.remove(DB_FILE)
-    
-    # Connect to database
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
+    os.makedirs(db_file.parent, exist_ok=True)
+
+    # Load into a staging file first so the catalog is only locked for the final swap
+    tmp_file = db_file.with_name(db_file.name + '.tmp')
+    if tmp_file.exists():
+        os.remove(tmp_file)
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(tmp_file, isolation_level=None)
+
+    # Bulk-load settings: the staging file is discarded either way, so durability is not needed
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA locking_mode=EXCLUSIVE')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-262144')
+
     # Create cities table
-    cursor.execute('''
-    CREATE TABLE cities (
-        id INTEGER PRIMARY KEY,
-        name TEXT NOT NULL,
-        state TEXT,
-        country TEXT NOT NULL,
-        latitude REAL NOT NULL,
-        longitude REAL NOT NULL
-    )
-    ''')
-    
-    # Create index on name and country for faster searches
-    cursor.execute('CREATE INDEX idx_city_name ON cities (name)')
-    cursor.execute('CREATE INDEX idx_city_country ON cities (country)')
-    
-    # Load JSON data
+    conn.execute(CITIES_SCHEMA.format(table='cities'))
+
+    stats = {'inserted': 0, 'skipped': 0, 'duplicates': 0}
     try:
-        with open(JSON_FILE, 'r', encoding='utf-8') as f:
-            cities = json.load(f)
-    except json.JSONDecodeError:
-        print("Error: Invalid JSON format in the input file")
+        conn.execute('BEGIN')
+        with open(json_file, 'r', encoding='utf-8') as f:
+            rows = iter_city_rows(iter_json_array(f), stats)
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    _insert_batch(conn, batch, stats)
+                    print(f"Processed {stats['inserted']} cities...")
+                    batch = []
+            _insert_batch(conn, batch, stats)
+        conn.execute('COMMIT')
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error: could not import {json_file}: {e}")
         conn.close()
+        os.remove(tmp_file)
         sys.exit(1)
-    
-    # Insert data into database
-    count = 0
-    for city in cities:
-        try:
-            cursor.execute(
-                'INSERT INTO cities VALUES (?, ?, ?, ?, ?, ?)',
-                (
-                    city['id'],
-                    city['name'],
-                    city.get('state', ''),
-                    city['country'],
-                    city['coord']['lat'],
-                    city['coord']['lon']
-                )
-            )
-            count += 1
-            if count % 1000 == 0:
-                print(f"Processed {count} cities...")
-        except KeyError as e:
-            print(f"Warning: Missing key {e} in city data, skipping record")
-        except sqlite3.Error as e:
-            print(f"Error inserting city {city.get('name', 'unknown')}: {e}")
-    
-    # Commit changes and close connection
-    conn.commit()
     conn.close()
-    
-    print(f"Conversion complete! {count} cities added to database.")
-    print(f"Database saved to {DB_FILE}")
+    load_time = time.perf_counter() - start
+
+    try:
+        swap_cities(tmp_file, db_file)
+    except sqlite3.Error as e:
+        print(f"Error: could not update {db_file}: {e}")
+        sys.exit(1)
+    finally:
+        os.remove(tmp_file)
+
+    total_time = time.perf_counter() - start
+    print(f"Conversion complete! {stats['inserted']} cities added to database, "
+          f"{stats['skipped']} skipped, {stats['duplicates']} duplicate ids ignored.")
+    print(f"Loaded at {stats['inserted'] / load_time:,.0f} rows/s, "
+          f"{total_time:.1f}s total including indexes, peak RSS {peak_rss_mb():.1f} MB")
+    print(f"Database saved to {db_file}")
+    return stats
+
+def swap_cities(staging_file, db_file):
+    """
+    Replace the cities and cities_fts tables of db_file with the staged cities.
+
+    The other tables of the database are kept, and the swap is a single
+    transaction on the live database, so readers see either catalog.
+
+    Args:
+        staging_file (Path): Database holding the freshly loaded cities table
+        db_file (Path): Catalog database to update, created if missing
+    """
+    conn = sqlite3.connect(db_file, isolation_level=None, timeout=60)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-262144')
+        conn.execute('ATTACH DATABASE ? AS staging', (str(staging_file),))
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(f'DROP TABLE IF EXISTS main.{FTS_TABLE}')
+            conn.execute('DROP TABLE IF EXISTS main.cities')
+            conn.execute(CITIES_SCHEMA.format(table='main.cities'))
+            conn.execute('INSERT INTO main.cities SELECT * FROM staging.cities ORDER BY id')
+
+            # Indexes are built once, after the load, instead of being maintained per row
+            print("Creating indexes...")
+            conn.execute('CREATE INDEX idx_city_name ON cities (name)')
+            conn.execute('CREATE INDEX idx_city_country ON cities (country)')
+
+            # Build the trigram full-text index used by city search
+            print("Building search index...")
+            build_search_index(conn)
+
+            # Stamp the catalog version so running apps reload their autocomplete index
+            conn.execute(f'PRAGMA user_version = {int(time.time())}')
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+
+        conn.execute('DETACH DATABASE staging')
+        conn.execute('ANALYZE main')
+    finally:
+        conn.close()
+
+def _insert_batch(conn, batch, stats):
+    """Insert a batch of rows, counting inserted rows and ignored duplicate ids."""
+    if not batch:
+        return
+    before = conn.total_changes
+    conn.executemany('INSERT OR IGNORE INTO cities VALUES (?, ?, ?, ?, ?, ?)', batch)
+    inserted = conn.total_changes - before
+    stats['inserted'] += inserted
+    stats['duplicates'] += len(batch) - inserted
+
+def main():
+    """Main function to run the script."""
+    parser = argparse.ArgumentParser(description='Import the OpenWeatherMap city list into SQLite')
+    parser.add_argument('-j', '--json', default=str(JSON_FILE), help='Path to city.list.min.json')
+    parser.add_argument('-d', '--db', default=str(DB_FILE), help='Path of the SQLite database to create or update')
+    parser.add_argument('-b', '--batch-size', type=int, default=BATCH_SIZE, help='Rows per executemany batch')
+    args = parser.parse_args()
+    create_database(args.json, args.db, args.batch_size)
 
 if __name__ == "__main__":
-    create_database()
\ No newline at end of file
+    main()
@@ -19,7 +19,7 @@ def create_tables():
     # Check if database file exists
     if not DB_FILE.exists():
         print(f"Error: Database file not found at {DB_FILE}")
-        print("Please run json_to_sqlite.py first to create the database.")
+        print("Please run create_cities_db.py first to create the database.")
         return
     
     # Connect to database
@@ -9,13 +9,15 @@ import requests
 import json
 import sys
 from pathlib import Path
-from bs4 import BeautifulSoup
-import re
-from datetime import datetime
 
 # Define paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_FILE = BASE_DIR / 'data' / 'cities.db'
+sys.path.insert(0, str(BASE_DIR))
+
+from services import search_index
+from services import html_extract
+from services.async_weather import fetch_weather_many
 
 def search_city(name, country=None, limit=10):
     """
@@ -36,21 +38,7 @@ def search_city(name, country=None, limit=10):
     
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row  # This enables column access by name
-    cursor = conn.cursor()
-    
-    # Build the query based on whether country is provided
-    query = "SELECT * FROM cities WHERE name LIKE ?"
-    params = [f"%{name}%"]
-    
-    if country:
-        query += " AND country = ?"
-        params.append(country.upper())
-    
-    query += " ORDER BY name LIMIT ?"
-    params.append(str(limit))
-    
-    cursor.execute(query, params)
-    cities = [dict(row) for row in cursor.fetchall()]
+    cities = search_index.search_cities(conn, name, country, limit)
     
     conn.close()
     return cities
@@ -89,85 +77,12 @@ def parse_weather_html(html_content, city_id):
     Returns:
         dict: Structured weather data
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
+    weather_data = html_extract.parse_weather_html(html_content, city_id)
     
-    # Find the weather widget section
-    weather_widget = soup.select_one("#weather-widget > div.section-content")
-    
-    if not weather_widget:
+    if not weather_data:
         print("Error: Could not find weather widget in HTML content")
         return None
     
-    # Extract city name and country
-    city_heading = weather_widget.select_one("h2")
-    city_country = city_heading.text.strip() if city_heading else "Unknown"
-    
-    # Extract current date and time
-    date_time_elem = weather_widget.select_one("span.orange-text")
-    date_time = date_time_elem.text.strip() if date_time_elem else "Unknown"
-    
-    # Extract temperature
-    temp_elem = weather_widget.select_one("div.current-temp span.heading")
-    temperature = temp_elem.text.strip() if temp_elem else "Unknown"
-    
-    # Extract weather description
-    weather_desc_elem = weather_widget.select_one("div.bold")
-    weather_desc = weather_desc_elem.text.strip() if weather_desc_elem else "Unknown"
-    
-    # Extract additional weather details
-    weather_items = weather_widget.select("ul.weather-items li")
-    
-    # Initialize weather details with default values
-    weather_details = {
-        'wind': 'Unknown',
-        'pressure': 'Unknown',
-        'humidity': 'Unknown',
-        'uv': 'Unknown',
-        'dew_point': 'Unknown',
-        'visibility': 'Unknown'
-    }
-    
-    # Parse each weather item
-    for item in weather_items:
-        item_text = item.text.strip()
-        
-        if 'm/s' in item_text:
-            weather_details['wind'] = item_text.strip()
-        elif 'hPa' in item_text:
-            weather_details['pressure'] = item_text.strip()
-        elif 'Humidity:' in item_text:
-            weather_details['humidity'] = item_text.replace('Humidity:', '').strip()
-        elif 'UV:' in item_text:
-            weather_details['uv'] = item_text.replace('UV:', '').strip()
-        elif 'Dew point:' in item_text:
-            weather_details['dew_point'] = item_text.replace('Dew point:', '').strip()
-        elif 'Visibility:' in item_text:
-            weather_details['visibility'] = item_text.replace('Visibility:', '').strip()
-    
-    # Extract temperature value
-    temp_value = None
-    if temperature != "Unknown":
-        temp_match = re.search(r'(-?\d+)°C', temperature)
-        if temp_match:
-            temp_value = int(temp_match.group(1))
-    
-    # Create structured weather data
-    weather_data = {
-        'city_id': city_id,
-        'city_country': city_country,
-        'date_time': date_time,
-        'temperature': temperature,
-        'temperature_value': temp_value,
-        'description': weather_desc,
-        'wind': weather_details['wind'],
-        'pressure': weather_details['pressure'],
-        'humidity': weather_details['humidity'],
-        'uv': weather_details['uv'],
-        'dew_point': weather_details['dew_point'],
-        'visibility': weather_details['visibility'],
-        'fetched_at': datetime.now().isoformat()
-    }
-    
     return weather_data
 
 def display_weather(weather_data):
@@ -199,6 +114,7 @@ def main():
     parser.add_argument('-l', '--limit', type=int, default=10, help='Maximum number of search results')
     parser.add_argument('-i', '--id', type=int, help='Directly use city ID instead of searching')
     parser.add_argument('-j', '--json', action='store_true', help='Output in JSON format')
+    parser.add_argument('-a', '--all', action='store_true', help='Fetch weather for every matching city concurrently')
     
     args = parser.parse_args()
     
@@ -220,7 +136,17 @@ def main():
             print(f"No cities found matching '{args.city}'")
             return
         
-        if len(cities) == 1 or args.limit == 1:
+        if args.all:
+            # Fetch every match at once from a single event loop
+            print(f"Fetching weather for {len(cities)} cities matching '{args.city}'...")
+            results = fetch_weather_many([city['id'] for city in cities])
+            if args.json:
+                print(json.dumps([weather for weather in results if weather], indent=2))
+            else:
+                for weather_data in results:
+                    if weather_data:
+                        display_weather(weather_data)
+        elif len(cities) == 1 or args.limit == 1:
             # If only one city found or limit is 1, fetch weather directly
             city = cities[0]
             print(f"Found city: {city['name']}, {city['country']} (ID: {city['id']})")
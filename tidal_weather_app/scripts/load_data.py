@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """
 Script to load data into locations, tidal_data, and weather_data tables.
-This script imports cities from cities.db and fetches tidal and weather data for each location.
+This script imports cities from cities.db and fetches tidal and weather data for each location
+concurrently, writing the results through a single batched database writer.
 """
 
+import argparse
 import os
 import sys
 from datetime import date
@@ -12,9 +14,13 @@ import logging
 # Add parent directory to path to import modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models import Location, TidalData, WeatherData
+import config
+from models import Location
 from services.weather_service import WeatherService
 from services.tidal_api import TidalAPIService
+from services.bulk_loader import BulkLoader
+from services.http_client import get_http_client
+from services.retry_policy import RetryPolicy, get_retry_budget
 
 # Configure logging
 logging.basicConfig(
@@ -38,8 +44,8 @@ def import_locations(weather_service, country_code='FR', limit=1000):
     logger.info(f"Importing up to {limit} locations from country {country_code}")
     
     # Import cities from the specified country
-    imported_count = weather_service.import_cities_by_country(country_code, limit)
-    logger.info(f"Imported {imported_count} new locations")
+    result = weather_service.import_cities_by_country(country_code, limit)
+    logger.info(f"Imported {result['imported']} new locations, {result['skipped']} already present")
     
     # Get all locations
     locations = Location.get_all()
@@ -47,124 +53,99 @@ def import_locations(weather_service, country_code='FR', limit=1000):
     
     return locations
 
-def fetch_tidal_data(tidal_service, locations):
+def fetch_tidal_data(loader, locations):
     """
-    Fetch and store tidal data for each location.
+    Fetch and store tidal data for each location concurrently.
     
     Args:
-        tidal_service (TidalAPIService): Instance of TidalAPIService
+        loader (BulkLoader): Bulk loader wrapping TidalAPIService
         locations (list): List of Location objects
         
     Returns:
-        int: Number of locations with tidal data fetched
+        LoadStats: Statistics of the tidal run
     """
     logger.info(f"Fetching tidal data for {len(locations)} locations")
-    today = date.today()
-    count = 0
-    
-    for location in locations:
-        # Check if tidal data already exists for this location and date
-        existing_data = TidalData.get_by_location_and_date(location.id, today)
-        if existing_data:
-            logger.info(f"Tidal data already exists for location {location.name} on {today}")
-            count += 1
-            continue
-        
-        # Fetch tidal data
-        logger.info(f"Fetching tidal data for {location.name} ({location.id})")
-        tidal_data_dict = tidal_service.get_tidal_data(
-            location.latitude, 
-            location.longitude, 
-            location.id
-        )
-        
-        if tidal_data_dict:
-            # Save to database
-            tidal_data = TidalData(
-                location_id=location.id,
-                date=today,
-                coefficient=tidal_data_dict.get('coefficient', 0),
-                high_tide_time=tidal_data_dict.get('high_tide_time', 'N/A'),
-                low_tide_time=tidal_data_dict.get('low_tide_time', 'N/A')
-            )
-            tidal_data.save()
-            logger.info(f"Saved tidal data for {location.name}")
-            count += 1
-        else:
-            logger.error(f"Failed to fetch tidal data for {location.name}")
-    
-    return count
+    return loader.load_tidal(locations, date.today())
 
-def fetch_weather_data(weather_service, locations):
+def fetch_weather_data(loader, locations, batch=False, api_key=None):
     """
-    Fetch and store weather data for each location.
+    Fetch and store weather data for each location concurrently.
     
     Args:
-        weather_service (WeatherService): Instance of WeatherService
+        loader (BulkLoader): Bulk loader wrapping WeatherService
         locations (list): List of Location objects
+        batch (bool): Fetch groups of locations per request from the weather APIs
+        api_key (str, optional): OpenWeatherMap API key for batched fetches (default: Open-Meteo)
         
     Returns:
-        int: Number of locations with weather data fetched
+        LoadStats: Statistics of the weather run
     """
     logger.info(f"Fetching weather data for {len(locations)} locations")
-    today = date.today()
-    count = 0
-    
-    for location in locations:
-        # Check if weather data already exists for this location and date
-        existing_data = WeatherData.get_by_location_and_date(location.id, today)
-        if existing_data:
-            logger.info(f"Weather data already exists for location {location.name} on {today}")
-            count += 1
-            continue
-        
-        # Fetch weather data
-        logger.info(f"Fetching weather data for {location.name} ({location.id})")
-        weather_data_dict = weather_service.fetch_weather_data(location.id)
-        
-        if weather_data_dict:
-            # Save to database
-            weather_data = WeatherData(
-                location_id=location.id,
-                date=today,
-                temperature=weather_data_dict.get('temperature_value', 0),
-                condition=weather_data_dict.get('description', 'Unknown'),
-                wind_speed=weather_data_dict.get('wind_speed', 0),
-                sunrise=weather_data_dict.get('sunrise', ''),
-                sunset=weather_data_dict.get('sunset', '')
-            )
-            weather_data.save()
-            logger.info(f"Saved weather data for {location.name}")
-            count += 1
-        else:
-            logger.error(f"Failed to fetch weather data for {location.name}")
-    
-    return count
+    if batch:
+        return loader.load_weather_batch(locations, date.today(), api_key)
+    return loader.load_weather(locations, date.today())
+
+def print_summary(stats_list):
+    """Print the throughput summary of each bulk load run."""
+    print("\n" + "="*50)
+    print("Load summary")
+    print("="*50)
+    for stats in stats_list:
+        print(stats.format_summary())
+    http_stats = get_http_client().stats()
+    print(f"HTTP connections: {http_stats['opened']} opened, {http_stats['reused']} reused "
+          f"over {http_stats['requests']} requests")
+    for host, circuit in http_stats['circuits'].items():
+        if circuit['trips']:
+            print(f"Circuit {host}: opened {circuit['trips']} times, {circuit['rejected']} requests skipped")
+    budget = get_retry_budget().stats()
+    print(f"Retries: {budget['retries']} over {budget['calls']} calls, {budget['denied']} denied by the retry budget")
+    print("="*50 + "\n")
 
 def main():
     """Main function to load data into tables."""
+    parser = argparse.ArgumentParser(description='Load locations, tidal and weather data')
+    parser.add_argument('-c', '--country', default='FR', help='Two-letter country code to import')
+    parser.add_argument('-l', '--limit', type=int, default=None, help='Maximum number of cities to import (default: all)')
+    parser.add_argument('-w', '--workers', type=int, default=config.LOADER_WORKERS, help='Number of concurrent fetch workers (requests in flight with --async)')
+    parser.add_argument('--per-host', type=int, default=config.LOADER_PER_HOST_LIMIT, help='Maximum concurrent requests per upstream host')
+    parser.add_argument('-b', '--batch-size', type=int, default=config.LOADER_BATCH_SIZE, help='Rows written per database transaction')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Fetch from one asyncio event loop instead of a thread pool')
+    parser.add_argument('--batch', action='store_true', help='Fetch weather for groups of cities per API request')
+    parser.add_argument('--api-key', default=os.environ.get('OWM_API_KEY'), help='OpenWeatherMap API key for --batch (default: Open-Meteo, keyless)')
+    args = parser.parse_args()
+    
     logger.info("Starting data loading process")
     
     # Initialize services
-    weather_service = WeatherService()
+    weather_service = WeatherService(retry_policy=RetryPolicy.batch())
     tidal_service = TidalAPIService()
-    
-    # Import locations - Set limit to None to import all locations for the country_code
-    locations = import_locations(weather_service, country_code='FR', limit=None)
+    loader = BulkLoader(
+        weather_service,
+        tidal_service,
+        workers=args.workers,
+        per_host=args.per_host,
+        batch_size=args.batch_size,
+        engine='async' if args.use_async else 'threads'
+    )
+    
+    # Import locations - limit None imports all locations for the country_code
+    locations = import_locations(weather_service, country_code=args.country, limit=args.limit)
     
     if not locations:
         logger.error("No locations found or imported. Exiting.")
         return
     
     # Fetch and store tidal data
-    tidal_count = fetch_tidal_data(tidal_service, locations)
-    logger.info(f"Tidal data fetched for {tidal_count}/{len(locations)} locations")
+    tidal_stats = fetch_tidal_data(loader, locations)
+    logger.info(f"Tidal data fetched for {tidal_stats.fetched + tidal_stats.skipped}/{len(locations)} locations")
     
     # Fetch and store weather data
-    weather_count = fetch_weather_data(weather_service, locations)
-    logger.info(f"Weather data fetched for {weather_count}/{len(locations)} locations")
+    weather_stats = fetch_weather_data(loader, locations, args.batch, args.api_key)
+    logger.info(f"Weather data fetched for {weather_stats.fetched + weather_stats.skipped}/{len(locations)} locations")
     
+    print_summary([tidal_stats, weather_stats])
     logger.info("Data loading process completed")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Manage tide stations and generate tide tables offline from their harmonic constituents.
+
+    tide_tables.py import stations.json        # or a CSV with one constituent per row
+    tide_tables.py reference 3 levels.csv      # reference series of station 3 (time,height)
+    tide_tables.py generate --days 365 -o tides.csv --store
+    tide_tables.py validate
+    tide_tables.py coefficients                # astronomical coefficients of tidal_data rows
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Define paths
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import config
+from database.connection import get_connection_manager
+from models import Location
+from models.record import format_timestamp
+from services import astronomy
+from services.bulk_loader import TIDAL_INSERT_SQL, _tidal_row
+from services.prewarm import TIDAL_UPDATE_SQL
+from services.tide_prediction import TidePredictor, TideStations
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def read_stations(path):
+    """
+    Read stations from a JSON list or a CSV file.
+
+    JSON entries have name, latitude, longitude, optional mean_level, timezone and
+    coefficient_unit, and constituents mapping names to [amplitude, phase]. CSV rows
+    have name, latitude, longitude, constituent, amplitude and phase columns, plus the
+    optional station columns, one row per constituent.
+
+    Returns:
+        list: Station dicts in the JSON layout
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.json':
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    stations = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            station = stations.setdefault(row['name'], {
+                'name': row['name'],
+                'latitude': float(row['latitude']),
+                'longitude': float(row['longitude']),
+                'mean_level': float(row.get('mean_level') or 0),
+                'timezone': row.get('timezone') or 'UTC',
+                'coefficient_unit': float(row['coefficient_unit']) if row.get('coefficient_unit') else None,
+                'constituents': {},
+            })
+            station['constituents'][row['constituent'].upper()] = (float(row['amplitude']), float(row['phase']))
+    return list(stations.values())
+
+
+def import_stations(stations, path):
+    """Create the stations of a file; returns the number imported."""
+    entries = read_stations(path)
+    for entry in entries:
+        station_id = stations.save_station(
+            entry['name'], entry['latitude'], entry['longitude'],
+            {name.upper(): tuple(values) for name, values in entry['constituents'].items()},
+            mean_level=entry.get('mean_level', 0.0),
+            timezone_name=entry.get('timezone') or 'UTC',
+            coefficient_unit=entry.get('coefficient_unit'),
+            station_id=entry.get('id'),
+        )
+        logger.info(f"Imported station {station_id} {entry['name']} "
+                    f"({len(entry['constituents'])} constituents)")
+    return len(entries)
+
+
+def import_reference(stations, station_id, path):
+    """Store the reference series of a station from a CSV with time (ISO or POSIX) and height columns."""
+    timestamps, heights = [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            value = row['time']
+            try:
+                timestamps.append(float(value))
+            except ValueError:
+                timestamps.append(datetime.fromisoformat(value))
+            heights.append(float(row['height']))
+    stations.save_reference(station_id, timestamps, heights)
+    return len(heights)
+
+
+def select_stations(stations, ids=None, bbox=None):
+    """IDs of the stations to process, optionally within a min_lat,min_lon,max_lat,max_lon box."""
+    if ids:
+        return ids
+    if not bbox:
+        return stations.station_ids()
+    min_lat, min_lon, max_lat, max_lon = bbox
+    rows = get_connection_manager(stations.db_path).execute(
+        """SELECT id FROM tide_stations
+           WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ? ORDER BY id""",
+        (min_lat, max_lat, min_lon, max_lon)
+    )
+    return [row[0] for row in rows]
+
+
+def write_tables(tables, path):
+    """Write tide tables as CSV rows of station, UTC time, type, height and coefficient."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['station_id', 'time', 'type', 'height', 'coefficient'])
+        for station_id, tides in tables.items():
+            for tide in tides:
+                writer.writerow([station_id, tide['time'].isoformat(), tide['type'],
+                                 tide['height'], tide.get('coefficient', '')])
+
+
+def store_tidal_data(predictor, first_day, days, max_km):
+    """
+    Fill tidal_data for every location with a station within max_km.
+
+    Each station is predicted once and its days are upserted for every location using it.
+
+    Returns:
+        int: Number of rows written
+    """
+    db = get_connection_manager(config.DB_PATH)
+    locations = Location.get_all()
+    by_station = {}
+    for location in locations:
+        station = predictor.stations.nearest(location.latitude, location.longitude, max_km)
+        if station:
+            by_station.setdefault(station[0], []).append(location)
+    logger.info(f"{sum(len(group) for group in by_station.values())} of {len(locations)} locations "
+                f"have a station within {max_km} km")
+
+    written = 0
+    now = format_timestamp()
+    for station_id, group in by_station.items():
+        summaries = predictor.daily_tides(station_id, first_day, days)
+        with db.transaction() as conn:
+            for location in group:
+                for day, summary in summaries.items():
+                    row = _tidal_row(location, date.fromisoformat(day), summary, now)
+                    cursor = conn.execute(TIDAL_UPDATE_SQL, (*row[2:5], now, location.id, day))
+                    if cursor.rowcount == 0:
+                        conn.execute(TIDAL_INSERT_SQL, row)
+                    written += 1
+    return written
+
+
+def fill_coefficients(start=None, end=None, overwrite=False):
+    """
+    Set the astronomical coefficient of tidal_data rows, computed in one call for all of them.
+
+    Args:
+        start (date, optional): First day of the rows to fill
+        end (date, optional): Last day of the rows to fill
+        overwrite (bool): Replace existing coefficients, not only missing ones
+
+    Returns:
+        int: Number of rows updated
+    """
+    db = get_connection_manager(config.DB_PATH)
+    query = """SELECT t.id, t.date, l.longitude FROM tidal_data t
+               JOIN locations l ON l.id = t.location_id WHERE 1"""
+    params = []
+    if not overwrite:
+        query += " AND (t.coefficient IS NULL OR t.coefficient = 0)"
+    if start:
+        query += " AND t.date >= ?"
+        params.append(start.isoformat())
+    if end:
+        query += " AND t.date <= ?"
+        params.append(end.isoformat())
+    rows = db.execute(query, params).fetchall()
+    if not rows:
+        return 0
+
+    ids, days, longitudes = zip(*rows)
+    coefficients = astronomy.daily_coefficients(list(days), list(longitudes))
+    with db.transaction() as conn:
+        conn.executemany(
+            "UPDATE tidal_data SET coefficient = ?, updated_at = ? WHERE id = ?",
+            zip(coefficients.tolist(), [format_timestamp()] * len(ids), ids)
+        )
+    return len(ids)
+
+
+def main():
+    """Main function to manage stations and tide tables."""
+    parser = argparse.ArgumentParser(description='Predict tide tables offline from harmonic constituents')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Import stations and their constituents')
+    import_parser.add_argument('file', help='JSON or CSV file of stations')
+
+    reference_parser = subparsers.add_parser('reference', help='Import the reference series of a station')
+    reference_parser.add_argument('station_id', type=int, help='Station ID')
+    reference_parser.add_argument('file', help='CSV file with time and height columns')
+
+    generate_parser = subparsers.add_parser('generate', help='Generate tide tables')
+    generate_parser.add_argument('--stations', type=int, nargs='+', help='Station IDs (default: all)')
+    generate_parser.add_argument('--bbox', type=float, nargs=4, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                                 help='Only the stations within this box')
+    generate_parser.add_argument('--start', type=date.fromisoformat, default=date.today(), help='First day (YYYY-MM-DD)')
+    generate_parser.add_argument('--days', type=int, default=365, help='Number of days')
+    generate_parser.add_argument('-o', '--output', help='CSV file for the tide tables')
+    generate_parser.add_argument('--store', action='store_true', help='Fill tidal_data for the locations near a station')
+    generate_parser.add_argument('--max-km', type=float, default=config.TIDE_STATION_MAX_KM,
+                                 help='Maximum distance from a location to its station')
+
+    validate_parser = subparsers.add_parser('validate', help='Compare predictions with the reference series')
+    validate_parser.add_argument('--stations', type=int, nargs='+', help='Station IDs (default: all)')
+
+    coefficients_parser = subparsers.add_parser('coefficients', help='Fill tidal_data coefficients from the sun and moon')
+    coefficients_parser.add_argument('--start', type=date.fromisoformat, help='First day (YYYY-MM-DD)')
+    coefficients_parser.add_argument('--end', type=date.fromisoformat, help='Last day (YYYY-MM-DD)')
+    coefficients_parser.add_argument('--all', action='store_true', help='Replace existing coefficients too')
+
+    args = parser.parse_args()
+    if args.command == 'coefficients':
+        began = time.perf_counter()
+        updated = fill_coefficients(args.start, args.end, args.all)
+        print(f"Set {updated} coefficients in {time.perf_counter() - began:.2f} s")
+        return
+
+    stations = TideStations()
+    predictor = TidePredictor(stations)
+
+    if args.command == 'import':
+        print(f"Imported {import_stations(stations, args.file)} stations")
+
+    elif args.command == 'reference':
+        print(f"Stored {import_reference(stations, args.station_id, args.file)} reference levels")
+
+    elif args.command == 'generate':
+        station_ids = select_stations(stations, args.stations, args.bbox)
+        start = datetime.combine(args.start, datetime.min.time())
+        began = time.perf_counter()
+        tables = predictor.tide_tables(station_ids, start, start + timedelta(days=args.days))
+        elapsed = time.perf_counter() - began
+        tides = sum(len(station_tides) for station_tides in tables.values())
+        print(f"Predicted {tides} tides at {len(station_ids)} stations over {args.days} days "
+              f"in {elapsed:.2f} s")
+        if args.output:
+            write_tables(tables, args.output)
+            print(f"Wrote {args.output}")
+        if args.store:
+            print(f"Stored {store_tidal_data(predictor, args.start, args.days, args.max_km)} tidal_data rows")
+
+    elif args.command == 'validate':
+        for station_id in args.stations or stations.station_ids():
+            report = predictor.validate(station_id)
+            if report is None:
+                print(f"Station {station_id}: no reference series")
+                continue
+            print(f"Station {station_id}: {report['points']} points, RMSE {report['rmse']:.3f} m, "
+                  f"max error {report['max_error']:.3f} m, bias {report['bias']:+.3f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Low-precision sun and moon ephemeris and astronomical tidal coefficients.
+
+Positions follow the low-precision formulas of the Astronomical Almanac
+(about 0.01 degree for the sun, 0.3 degree and 0.2% in distance for the
+moon), which is plenty for tide-raising forces. Every function takes
+arrays of POSIX timestamps, so years of dates for many locations are one
+NumPy call.
+
+The tidal coefficient is the semi-diurnal equilibrium tide: the moon and
+sun each raise a bulge proportional to mass / distance^3 * cos^2(dec), and
+the two add with a phase twice their difference in right ascension. It is
+expressed in hundredths of its value at a mean equinoctial spring tide
+(both bodies at mean distance, on the equator, in syzygy), as the French
+coefficient is, and read a few days' "age of the tide" earlier since the
+ocean answers the forcing with a delay (about 36 hours at Brest).
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+
+import config
+
+EARTH_RADIUS_KM = 6378.14
+AU_KM = 149597870.7
+MOON_MEAN_DISTANCE_KM = 384400.0
+
+# Tide-raising strength of each body, mass / distance^3 at mean distance, relative to the moon
+SUN_MOON_FORCE_RATIO = (1.98892e30 / 7.3477e22) * (MOON_MEAN_DISTANCE_KM / AU_KM) ** 3
+
+SECONDS_PER_DAY = 86400.0
+_J2000 = 946728000.0  # 2000-01-01T12:00:00Z as a POSIX timestamp
+
+# Times of the local day at which the coefficient is sampled, in hours; the daily
+# coefficient is the largest, as a tide table lists the larger of the day's two
+DAILY_SAMPLE_HOURS = (0, 3, 6, 9, 12, 15, 18, 21, 24)
+
+# Spacing of the forcing evaluated for daily coefficients; it changes over days, not hours
+FORCING_GRID_STEP = 3600.0
+
+
+def _days_since_j2000(timestamps):
+    return (np.asarray(timestamps, dtype=np.float64) - _J2000) / SECONDS_PER_DAY
+
+
+def _equatorial(longitude, latitude, obliquity):
+    """Convert ecliptic longitude and latitude (radians) to right ascension and declination."""
+    x = np.cos(latitude) * np.cos(longitude)
+    y = np.cos(obliquity) * np.cos(latitude) * np.sin(longitude) - np.sin(obliquity) * np.sin(latitude)
+    z = np.sin(obliquity) * np.cos(latitude) * np.sin(longitude) + np.cos(obliquity) * np.sin(latitude)
+    return np.arctan2(y, x), np.arcsin(np.clip(z, -1.0, 1.0))
+
+
+def obliquity(timestamps):
+    """Obliquity of the ecliptic in radians."""
+    return np.radians(23.439 - 3.6e-7 * _days_since_j2000(timestamps))
+
+
+def sun_position(timestamps):
+    """
+    Apparent position of the sun.
+
+    Args:
+        timestamps (np.ndarray): POSIX seconds
+
+    Returns:
+        tuple: (right ascension, declination) in radians and distance in kilometers, as arrays
+    """
+    d = _days_since_j2000(timestamps)
+    anomaly = np.radians(357.529 + 0.98560028 * d)
+    mean_longitude = 280.459 + 0.98564736 * d
+    longitude = np.radians(mean_longitude + 1.915 * np.sin(anomaly) + 0.020 * np.sin(2 * anomaly))
+    distance = AU_KM * (1.00014 - 0.01671 * np.cos(anomaly) - 0.00014 * np.cos(2 * anomaly))
+    right_ascension, declination = _equatorial(longitude, np.zeros_like(longitude), obliquity(timestamps))
+    return right_ascension, declination, distance
+
+
+def moon_position(timestamps):
+    """
+    Geocentric position of the moon.
+
+    Args:
+        timestamps (np.ndarray): POSIX seconds
+
+    Returns:
+        tuple: (right ascension, declination) in radians and distance in kilometers, as arrays
+    """
+    t = _days_since_j2000(timestamps) / 36525.0
+
+    def sin(base, rate):
+        return np.sin(np.radians(base + rate * t))
+
+    def cos(base, rate):
+        return np.cos(np.radians(base + rate * t))
+
+    longitude = (218.32 + 481267.881 * t
+                 + 6.29 * sin(135.0, 477198.87) - 1.27 * sin(259.3, -413335.36)
+                 + 0.66 * sin(235.7, 890534.22) + 0.21 * sin(269.9, 954397.74)
+                 - 0.19 * sin(357.5, 35999.05) - 0.11 * sin(186.5, 966404.03))
+    latitude = (5.13 * sin(93.3, 483202.02) + 0.28 * sin(228.2, 960400.89)
+                - 0.28 * sin(318.3, 6003.15) - 0.17 * sin(217.6, -407332.21))
+    parallax = (0.9508 + 0.0518 * cos(135.0, 477198.87) + 0.0095 * cos(259.3, -413335.36)
+                + 0.0078 * cos(235.7, 890534.22) + 0.0028 * cos(269.9, 954397.74))
+    distance = EARTH_RADIUS_KM / np.sin(np.radians(parallax))
+    right_ascension, declination = _equatorial(
+        np.radians(longitude), np.radians(latitude), obliquity(timestamps)
+    )
+    return right_ascension, declination, distance
+
+
+def semidiurnal_forcing(timestamps):
+    """
+    Semi-diurnal equilibrium tide relative to a mean equinoctial spring tide.
+
+    Args:
+        timestamps (np.ndarray): POSIX seconds
+
+    Returns:
+        np.ndarray: 1.0 at a mean equinoctial spring tide, about 0.26 to 1.2 in practice
+    """
+    moon_ra, moon_dec, moon_distance = moon_position(timestamps)
+    sun_ra, sun_dec, sun_distance = sun_position(timestamps)
+    moon = (MOON_MEAN_DISTANCE_KM / moon_distance) ** 3 * np.cos(moon_dec) ** 2
+    sun = SUN_MOON_FORCE_RATIO * (AU_KM / sun_distance) ** 3 * np.cos(sun_dec) ** 2
+    # The two bulges add like vectors 2 * (RA difference) apart
+    combined = np.sqrt(moon ** 2 + sun ** 2 + 2 * moon * sun * np.cos(2 * (moon_ra - sun_ra)))
+    return combined / (1.0 + SUN_MOON_FORCE_RATIO)
+
+
+def tidal_coefficients(timestamps, lag_hours=None):
+    """
+    Tidal coefficients at given times.
+
+    Args:
+        timestamps (np.ndarray): POSIX seconds
+        lag_hours (float or np.ndarray, optional): Age of the tide, broadcast against
+            timestamps (default: config.TIDE_COEFFICIENT_LAG_HOURS)
+
+    Returns:
+        np.ndarray: Coefficients between 20 and 120, as integers
+    """
+    lag = config.TIDE_COEFFICIENT_LAG_HOURS if lag_hours is None else lag_hours
+    forcing = semidiurnal_forcing(np.asarray(timestamps, dtype=np.float64) - np.asarray(lag) * 3600.0)
+    return np.clip(np.round(100.0 * forcing), 20, 120).astype(np.int64)
+
+
+def _day_timestamps(days):
+    """POSIX seconds of the UTC midnight of dates, ISO strings or datetime64 values."""
+    values = [
+        value.date() if isinstance(value, datetime) else
+        date.fromisoformat(value) if isinstance(value, str) else value
+        for value in np.atleast_1d(np.asarray(days, dtype=object))
+    ]
+    return np.asarray(values, dtype='datetime64[D]').astype('datetime64[s]').astype(np.float64)
+
+
+def daily_coefficients(days, longitudes=None, lag_hours=None):
+    """
+    Tidal coefficient of days at many locations.
+
+    Each day is taken in local solar time (the longitude shifts it from UTC) and its
+    coefficient is the largest over the day. days and longitudes broadcast against
+    each other, so days of shape (n,) and longitudes of shape (m, 1) give an (m, n)
+    table, and matching shapes give one coefficient per (location, day) pair.
+
+    The forcing does not depend on the location, only on time, so it is evaluated
+    once on a FORCING_GRID_STEP grid covering every sample and interpolated.
+
+    Args:
+        days (iterable): Dates, ISO date strings or datetime64 days
+        longitudes (float or np.ndarray, optional): Longitudes in degrees
+            (default: config.TIDE_COEFFICIENT_LONGITUDE, the reference port)
+        lag_hours (float or np.ndarray, optional): Age of the tide, broadcast like longitudes
+
+    Returns:
+        np.ndarray: Integer coefficients between 20 and 120
+    """
+    midnights = _day_timestamps(days)
+    if longitudes is None:
+        longitudes = config.TIDE_COEFFICIENT_LONGITUDE
+    lag = config.TIDE_COEFFICIENT_LAG_HOURS if lag_hours is None else lag_hours
+    starts = (midnights - np.asarray(longitudes, dtype=np.float64) / 15.0 * 3600.0
+              - np.asarray(lag, dtype=np.float64) * 3600.0)
+    samples = starts[..., None] + np.asarray(DAILY_SAMPLE_HOURS, dtype=np.float64) * 3600.0
+
+    grid = np.arange(samples.min(), samples.max() + FORCING_GRID_STEP, FORCING_GRID_STEP)
+    forcing = np.interp(samples, grid, semidiurnal_forcing(grid)).max(axis=-1)
+    return np.clip(np.round(100.0 * forcing), 20, 120).astype(np.int64)
+
+
+def coefficient_for_day(day=None, longitude=None):
+    """Tidal coefficient of one day (default: today), as an int."""
+    return int(daily_coefficients([day or date.today()], longitude)[0])
@@ -0,0 +1,382 @@
+"""
+Asyncio counterpart of the weather and tide services.
+
+AsyncWeatherService exposes the same fetch methods as WeatherService and
+TidalScraperService as coroutines, so one process can keep thousands of
+requests in flight. Concurrency is capped globally and per upstream host
+with semaphores, and failed requests are retried with jittered backoff.
+
+Requests go through aiohttp when it is installed (it is optional, see
+requirements-optional.txt). Otherwise they run on a pool of at most
+ASYNC_THREAD_WORKERS threads over the shared pooled HTTP client, which keeps
+the same interface without the extra dependency. Both share the circuit breakers of
+the HTTP client, so a host found down by one is skipped by the other.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import urlsplit
+
+import requests
+
+import config
+from services import html_extract
+from services.circuit_breaker import CircuitOpenError, get_circuit_breakers
+from services.http_client import DEFAULT_USER_AGENT, get_http_client
+from services.retry_policy import RetryPolicy, parse_retry_after
+from services.tidal_scraper import TidalScraperService
+from services.weather_service import WeatherService
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+WEATHER_PAGE_URL = "https://openweathermap.org/city/{city_id}"
+WEATHER_API_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+
+class AsyncResponse:
+    """Status, body and headers of a completed request."""
+
+    def __init__(self, status_code, text, headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class _AiohttpTransport:
+    name = 'aiohttp'
+
+    def __init__(self, concurrency, per_host, timeout):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            headers={'User-Agent': DEFAULT_USER_AGENT}
+        )
+        self.errors = (aiohttp.ClientError, asyncio.TimeoutError)
+        self.breakers = get_circuit_breakers()
+
+    async def get(self, url, params=None):
+        breaker = self.breakers.for_url(url)
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(breaker.host)
+        try:
+            async with self.session.get(url, params=params) as response:
+                result = AsyncResponse(response.status, await response.text(), response.headers)
+        except self.errors:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            breaker.record_status(result.status_code)
+        return result
+
+    async def close(self):
+        await self.session.close()
+
+
+class _ThreadTransport:
+    name = 'threads'
+
+    def __init__(self, concurrency, per_host, timeout):
+        self.http = get_http_client()
+        self.timeout = timeout
+        # More threads than pooled connections would only wait for one
+        workers = min(concurrency, config.ASYNC_THREAD_WORKERS)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='async-http')
+        self.errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def _get(self, url, params):
+        response = self.http.get(url, params=params, timeout=self.timeout)
+        return AsyncResponse(response.status_code, response.text, response.headers)
+
+    async def get(self, url, params=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._get, url, params)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class AsyncWeatherService:
+    """Asyncio service fetching weather pages, weather API data and tide pages."""
+
+    def __init__(self, weather_service=None, tidal_scraper=None, concurrency=None, per_host=None,
+                 max_retries=None, backoff_factor=None, timeout=None):
+        """
+        Initialize the async service.
+
+        Args:
+            weather_service (WeatherService, optional): Used for city lookups, mock data and API formatting
+            tidal_scraper (TidalScraperService, optional): Used to parse tide station pages
+            concurrency (int, optional): Maximum requests in flight overall
+            per_host (int, optional): Maximum requests in flight per upstream host
+            max_retries (int, optional): Attempts per request (default: the batch retry policy's)
+            backoff_factor (float, optional): Base of the exponential backoff in seconds
+            timeout (float, optional): Request timeout in seconds
+        """
+        self.weather_service = weather_service or WeatherService()
+        self.tidal_scraper = tidal_scraper or TidalScraperService()
+        self.concurrency = concurrency or config.ASYNC_CONCURRENCY
+        self.per_host = per_host or config.ASYNC_PER_HOST_LIMIT
+        self.retry_policy = RetryPolicy.batch(max_attempts=max_retries, backoff_factor=backoff_factor)
+        self.max_retries = self.retry_policy.max_attempts
+        self.backoff_factor = self.retry_policy.backoff_factor
+        self.timeout = timeout or config.REQUEST_TIMEOUT
+
+        self._transport = None
+        self._semaphore = None
+        self._host_semaphores = {}
+
+        self.request_count = 0
+        self.error_count = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _ensure_transport(self):
+        # Created lazily so the semaphores belong to the running event loop
+        if self._transport is None:
+            transport = _AiohttpTransport if aiohttp is not None else _ThreadTransport
+            self._transport = transport(self.concurrency, self.per_host, self.timeout)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            logger.info(f"Async weather service using {self._transport.name} transport")
+        return self._transport
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).hostname
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._host_semaphores[host]
+
+    async def close(self):
+        """Close the underlying transport."""
+        if self._transport is not None:
+            await self._transport.close()
+            self._transport = None
+
+    async def fetch_with_retry(self, url, params=None):
+        """
+        Fetch a URL with retries and jittered exponential backoff.
+
+        Server errors (5xx), rate limiting (429), connection errors and timeouts
+        are retried within the deadline and budget of the batch retry policy; the
+        wait before attempt n is uniform in [0, backoff_factor * 2**(n-1)], or the
+        server's Retry-After if longer.
+
+        Args:
+            url (str): URL to fetch
+            params (dict, optional): Query parameters
+
+        Returns:
+            AsyncResponse: Response or None if all attempts failed
+        """
+        transport = self._ensure_transport()
+        host_semaphore = self._host_semaphore(url)
+
+        deadline = self.retry_policy.start()
+        for attempt in range(1, self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore, host_semaphore:
+                    self.request_count += 1
+                    response = await transport.get(url, params)
+                if response.status_code < 500 and response.status_code != 429:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                logger.warning(f"Server error {response.status_code} on attempt {attempt} for {url}")
+            except CircuitOpenError as e:
+                logger.info(f"Skipping {url}: {e}")
+                return None
+            except transport.errors as e:
+                logger.warning(f"Request failed on attempt {attempt} for {url}: {e}")
+
+            self.error_count += 1
+            delay = self.retry_policy.next_delay(attempt, deadline, retry_after)
+            if delay is None:
+                break
+            # Sleeping outside the semaphores leaves the slots to other requests
+            await asyncio.sleep(delay)
+
+        logger.error(f"All retry attempts failed for {url}")
+        return None
+
+    async def fetch_weather_data(self, city_id, fallback=True):
+        """
+        Fetch weather data from the OpenWeatherMap website.
+
+        Args:
+            city_id (int): OpenWeatherMap city ID
+            fallback (bool): Return mock data when the fetch fails, instead of None
+
+        Returns:
+            dict: Weather data, mock data (flagged 'mock') if the page could not be fetched
+                  or parsed and fallback is set, or None
+        """
+        url = WEATHER_PAGE_URL.format(city_id=city_id)
+        start_time = time.perf_counter()
+        response = await self.fetch_with_retry(url)
+
+        if response is None or not response.text or len(response.text) < 100:
+            logger.error(f"No usable response for city ID {city_id}")
+            return self.weather_service._fallback_weather_data(city_id, fallback)
+
+        duration = int((time.perf_counter() - start_time) * 1000)
+        self.weather_service.log_request_details(url, status_code=response.status_code, duration=duration)
+
+        weather_data = html_extract.parse_weather_html(response.text, city_id)
+        if weather_data is None:
+            logger.error(f"Could not find weather widget for city ID {city_id}")
+            return self.weather_service._fallback_weather_data(city_id, fallback)
+        return weather_data
+
+    async def fetch_weather_data_api(self, city_id, api_key=None):
+        """
+        Fetch weather data using the official OpenWeatherMap API.
+
+        Args:
+            city_id (int): OpenWeatherMap city ID
+            api_key (str, optional): OpenWeatherMap API key
+
+        Returns:
+            dict: Weather data or None if the city is unknown
+        """
+        if not api_key:
+            logger.warning("No API key provided for OpenWeatherMap API")
+            return await self.fetch_weather_data(city_id)
+
+        city = self.weather_service.get_city_by_id(city_id)
+        if not city:
+            logger.error(f"City with ID {city_id} not found in database")
+            return None
+
+        params = {'id': city_id, 'appid': api_key, 'units': 'metric'}
+        response = await self.fetch_with_retry(WEATHER_API_URL, params)
+        if response is None or response.status_code != 200:
+            logger.info(f"Falling back to web scraping for city {city_id}")
+            return await self.fetch_weather_data(city_id)
+
+        try:
+            return self.weather_service.format_api_weather(city_id, city, response.json())
+        except (ValueError, KeyError, IndexError) as e:
+            logger.error(f"Unexpected API response for city {city_id}: {e}")
+            return await self.fetch_weather_data(city_id)
+
+    async def get_tidal_data_by_city(self, city_name, location_id, day=None):
+        """
+        Fetch tidal data for a specific city by scraping the website.
+
+        Args:
+            city_name (str): City name
+            location_id (int): Location ID
+            day (date, optional): Day of the tides (default: today)
+
+        Returns:
+            dict: Tidal data or None if failed
+        """
+        day = day or date.today()
+        week = self.tidal_scraper.get_cached_week(city_name, day)
+        if week is None:
+            url = self.tidal_scraper.station_url(city_name)
+            response = await self.fetch_with_retry(url)
+            if response is None or response.status_code != 200:
+                logger.error(f"Could not fetch tide page for {city_name}")
+                return None
+            # One page holds the week: cached per station for the following days
+            week = self.tidal_scraper.store_week(city_name, response.text)
+        return week.get(day.isoformat()) if week else None
+
+    def stats(self):
+        """
+        Get request statistics.
+
+        Returns:
+            dict: Transport, requests sent and failed attempts
+        """
+        return {
+            'transport': self._transport.name if self._transport else None,
+            'requests': self.request_count,
+            'errors': self.error_count,
+        }
+
+
+def run_async(func, **options):
+    """
+    Run a coroutine function with an AsyncWeatherService from synchronous code.
+
+    Args:
+        func (callable): Coroutine function taking the service
+        **options: AsyncWeatherService arguments
+
+    Returns:
+        The result of func
+    """
+    async def main():
+        async with AsyncWeatherService(**options) as service:
+            return await func(service)
+    return asyncio.run(main())
+
+
+def _gather_results(results, keys, what):
+    """Replace the exceptions returned by gather with None, logging each one."""
+    for key, result in zip(keys, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Fetching {what} failed for {key}: {result!r}")
+    return [None if isinstance(result, BaseException) else result for result in results]
+
+
+def fetch_weather_many(city_ids, api_key=None, **options):
+    """
+    Fetch the weather of many cities concurrently from synchronous code.
+
+    Args:
+        city_ids (list): OpenWeatherMap city IDs
+        api_key (str, optional): Use the OpenWeatherMap API with this key
+        **options: AsyncWeatherService arguments
+
+    Returns:
+        list: Weather data (or None) for each city, in the order of city_ids; a city
+              whose fetch raised gets None without cancelling the others
+    """
+    async def fetch_all(service):
+        if api_key:
+            coroutines = [service.fetch_weather_data_api(city_id, api_key) for city_id in city_ids]
+        else:
+            coroutines = [service.fetch_weather_data(city_id) for city_id in city_ids]
+        results = await asyncio.gather(*coroutines, return_exceptions=True)
+        return _gather_results(results, city_ids, 'weather')
+    return run_async(fetch_all, **options)
+
+
+def fetch_tidal_many(cities, day=None, **options):
+    """
+    Fetch the tides of many cities concurrently from synchronous code.
+
+    Args:
+        cities (list): (city_name, location_id) pairs
+        day (date, optional): Day of the tides (default: today)
+        **options: AsyncWeatherService arguments
+
+    Returns:
+        list: Tidal data (or None) for each city, in the order of cities; a city
+              whose fetch raised gets None without cancelling the others
+    """
+    async def fetch_all(service):
+        results = await asyncio.gather(*(
+            service.get_tidal_data_by_city(city_name, location_id, day) for city_name, location_id in cities
+        ), return_exceptions=True)
+        return _gather_results(results, [city_name for city_name, _ in cities], 'tides')
+    return run_async(fetch_all, **options)
@@ -0,0 +1,238 @@
+"""
+In-process prefix autocomplete over the cities catalog.
+
+The catalog is loaded once into sorted arrays of normalized names so
+type-ahead prefix queries are answered with bisect, without touching SQLite.
+"""
+
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+import config
+from database.connection import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+_SEPARATORS = re.compile(r"[\s\-'’.]+")
+
+
+def normalize_name(name):
+    """Casefold, strip accents and collapse separators so 'Saint-Étienne' matches 'saint eti'."""
+    if name.isascii():
+        return _SEPARATORS.sub(' ', name.lower()).strip()
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _SEPARATORS.sub(' ', stripped.casefold()).strip()
+
+
+class _Index:
+    """Immutable snapshot of the catalog, swapped atomically on refresh."""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.ids = array('q')
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.names = []
+        self.states = []
+        self.countries = []
+
+        interned = {}
+        keys = []
+        for city_id, name, state, country, latitude, longitude in rows:
+            self.ids.append(city_id)
+            self.latitudes.append(latitude)
+            self.longitudes.append(longitude)
+            self.names.append(name)
+            # States and countries repeat a lot, share a single string object per value
+            self.states.append(interned.setdefault(state or '', state or ''))
+            self.countries.append(interned.setdefault(country, country))
+            keys.append(normalize_name(name))
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[i] for i in order]
+        self.order = array('i', order)
+
+        # Per-country views reuse the same key strings, only the pointers are duplicated
+        self.by_country = {}
+        for position, row in enumerate(order):
+            country_keys, country_order = self.by_country.setdefault(
+                self.countries[row], ([], array('i'))
+            )
+            country_keys.append(self.keys[position])
+            country_order.append(row)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def city(self, row):
+        return {
+            'id': self.ids[row],
+            'name': self.names[row],
+            'state': self.states[row],
+            'country': self.countries[row],
+            'latitude': self.latitudes[row],
+            'longitude': self.longitudes[row],
+        }
+
+
+class CityAutocomplete:
+    """Sorted-array prefix index over the cities table, refreshed when the catalog is rebuilt."""
+
+    def __init__(self, db_path=None, refresh_interval=None):
+        """
+        Initialize the autocomplete index.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database file
+            refresh_interval (int, optional): Seconds between two checks for a rebuilt catalog
+        """
+        self.db_path = db_path or config.DB_PATH
+        self.refresh_interval = (config.AUTOCOMPLETE_REFRESH_INTERVAL
+                                 if refresh_interval is None else refresh_interval)
+        self._index = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_check = 0.0
+
+    @property
+    def loaded(self):
+        return self._index is not None
+
+    def _catalog_version(self, conn):
+        # create_cities_db.py stamps user_version on every rebuild
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def load(self):
+        """
+        Load (or reload) the catalog from the cities table.
+
+        Returns:
+            bool: True if the index is loaded
+        """
+        start = time.perf_counter()
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                version = self._catalog_version(conn)
+                rows = conn.execute(
+                    "SELECT id, name, state, country, latitude, longitude FROM cities"
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not load autocomplete index: {e}")
+            return self.loaded
+
+        index = _Index(rows, version)
+        with self._lock:
+            self._index = index
+            self._last_check = time.monotonic()
+        duration = int((time.perf_counter() - start) * 1000)
+        report = self.memory_report()
+        logger.info(f"Loaded autocomplete index: {len(index)} cities in {duration} ms, "
+                    f"~{report['total_bytes'] / (1024 * 1024):.1f} MB")
+        return True
+
+    def refresh_if_stale(self):
+        """Reload the index in the background if the catalog was rebuilt since it was loaded."""
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return False
+        # Only one request thread checks, the others keep serving the current snapshot
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_check = now
+            try:
+                conn = sqlite3.connect(self.db_path)
+                try:
+                    version = self._catalog_version(conn)
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not check the catalog version: {e}")
+                return False
+
+            if self._index is not None and version == self._index.version:
+                return False
+            # Rebuilds update the catalog in place, but a cities.db copied over by hand
+            # would leave long-lived connections on the old file
+            get_connection_manager(self.db_path).reopen()
+        finally:
+            self._refresh_lock.release()
+
+        # Requests keep being served from the current snapshot while the new one is built
+        logger.info("Cities catalog changed, reloading autocomplete index")
+        threading.Thread(target=self.load, name='autocomplete-reload', daemon=True).start()
+        return True
+
+    def search(self, prefix, country=None, limit=10):
+        """
+        Find cities whose normalized name starts with prefix.
+
+        Args:
+            prefix (str): Typed prefix
+            country (str, optional): Two-letter country code
+            limit (int): Maximum number of results to return
+
+        Returns:
+            list: List of matching cities in normalized name order, exact match first
+        """
+        self.refresh_if_stale()
+        index = self._index
+        key = normalize_name(prefix)
+        if index is None or not key or limit <= 0:
+            return []
+
+        if country:
+            view = index.by_country.get(country.upper())
+            if view is None:
+                return []
+            keys, order = view
+        else:
+            keys, order = index.keys, index.order
+
+        results = []
+        position = bisect_left(keys, key)
+        while position < len(keys) and len(results) < limit and keys[position].startswith(key):
+            results.append(index.city(order[position]))
+            position += 1
+        return results
+
+    def memory_report(self):
+        """
+        Approximate the memory held by the index.
+
+        Returns:
+            dict: Entry count and byte sizes of the main structures
+        """
+        index = self._index
+        if index is None:
+            return {'entries': 0, 'total_bytes': 0}
+
+        keys_bytes = sys.getsizeof(index.keys) + sum(sys.getsizeof(k) for k in index.keys)
+        names_bytes = sys.getsizeof(index.names) + sum(sys.getsizeof(n) for n in index.names)
+        attributes_bytes = (sys.getsizeof(index.states) + sys.getsizeof(index.countries)
+                            + sum(sys.getsizeof(v) for v in set(index.states) | set(index.countries)))
+        arrays_bytes = sum(sys.getsizeof(a) for a in (index.ids, index.latitudes, index.longitudes, index.order))
+        countries_bytes = sum(sys.getsizeof(keys) + sys.getsizeof(order)
+                              for keys, order in index.by_country.values())
+        report = {
+            'entries': len(index),
+            'countries': len(index.by_country),
+            'keys_bytes': keys_bytes,
+            'names_bytes': names_bytes,
+            'attributes_bytes': attributes_bytes,
+            'arrays_bytes': arrays_bytes,
+            'country_views_bytes': countries_bytes,
+        }
+        report['total_bytes'] = sum(v for k, v in report.items() if k.endswith('_bytes'))
+        return report
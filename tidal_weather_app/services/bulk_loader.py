@@ -0,0 +1,456 @@
+"""
+Concurrent bulk loading engine for weather and tidal data.
+
+Upstream fetches run on a thread pool and are capped per upstream host,
+while every row is written by a single writer thread in batched
+transactions so SQLite never sees competing writers.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from urllib.parse import urlparse
+
+import config
+from database.connection import get_connection_manager
+from models.record import format_timestamp
+from services.async_weather import run_async
+
+logger = logging.getLogger(__name__)
+
+WEATHER_HOST = 'openweathermap.org'
+TIDAL_HOST = 'www.worldtides.info'
+
+WEATHER_INSERT_SQL = """INSERT INTO weather_data
+    (location_id, date, temperature, condition, wind_speed, sunrise, sunset, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+TIDAL_INSERT_SQL = """INSERT INTO tidal_data
+    (location_id, date, coefficient, high_tide_time, low_tide_time, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+
+def _percentile(sorted_values, pct):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class HostLimiter:
+    """Caps the number of concurrent requests sent to each upstream host."""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, host):
+        """Hold one of the host's request slots for the duration of the block."""
+        semaphore = self._semaphore(host)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class LoadStats:
+    """Throughput and latency figures for one bulk load run."""
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0
+        self.fetched = 0
+        self.skipped = 0
+        self.failed = 0
+        self.written = 0
+        self.write_errors = 0
+        self.latencies = []
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def record_fetch(self, duration, ok):
+        with self._lock:
+            self.latencies.append(duration)
+            if ok:
+                self.fetched += 1
+            else:
+                self.failed += 1
+
+    def record_write(self, written=0, errors=0):
+        with self._lock:
+            self.written += written
+            self.write_errors += errors
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def summary(self):
+        """
+        Summarize the run.
+
+        Returns:
+            dict: Counts, locations per second and p50/p95 fetch latency in ms
+        """
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        latencies = sorted(self.latencies)
+        processed = self.fetched + self.failed
+        return {
+            'name': self.name,
+            'total': self.total,
+            'fetched': self.fetched,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'written': self.written,
+            'write_errors': self.write_errors,
+            'elapsed_s': round(elapsed, 2),
+            'locations_per_s': round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+        }
+
+    def format_summary(self):
+        s = self.summary()
+        return (f"{s['name']}: {s['fetched']}/{s['total']} fetched, {s['skipped']} skipped, "
+                f"{s['failed']} failed, {s['written']} written in {s['elapsed_s']}s | "
+                f"{s['locations_per_s']} locations/s | "
+                f"p50 {s['p50_ms']} ms | p95 {s['p95_ms']} ms")
+
+
+class WriterStoppedError(RuntimeError):
+    """Raised to producers when the writer thread is no longer draining its queue."""
+
+
+class BatchWriter(threading.Thread):
+    """Single writer thread that drains queued rows into SQLite in batches."""
+
+    _STOP = object()
+
+    def __init__(self, db_path, sql, stats, batch_size=500, flush_interval=1.0):
+        super().__init__(name='bulk-writer', daemon=True)
+        self.db_path = db_path
+        self.sql = sql
+        self.stats = stats
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.error = None
+        self._queue = queue.Queue(maxsize=batch_size * 4)
+
+    def put(self, row):
+        """
+        Queue a row, waiting while the queue is full.
+
+        Raises:
+            WriterStoppedError: The writer thread died, so the row would never be written
+        """
+        while True:
+            if not self.is_alive():
+                raise WriterStoppedError(f"Batch writer stopped: {self.error or 'not running'}")
+            try:
+                self._queue.put(row, timeout=self.flush_interval)
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        """Flush the remaining rows and wait for the writer to exit."""
+        try:
+            self.put(self._STOP)
+        except WriterStoppedError:
+            pass
+        self.join()
+
+    def _flush(self, db, batch):
+        if not batch:
+            return
+        try:
+            with db.transaction() as conn:
+                conn.executemany(self.sql, batch)
+            self.stats.record_write(written=len(batch))
+        except Exception as e:
+            # Any error loses this batch only; the writer keeps draining the queue
+            logger.error(f"Batch insert of {len(batch)} rows failed: {e}")
+            self.stats.record_write(errors=len(batch))
+        batch.clear()
+
+    def run(self):
+        try:
+            self._drain()
+        except Exception as e:
+            self.error = e
+            logger.error(f"Batch writer stopped: {e}", exc_info=True)
+
+    def _drain(self):
+        db = get_connection_manager(self.db_path)
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                timeout = max(deadline - time.monotonic(), 0)
+                try:
+                    row = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    row = None
+                if row is self._STOP:
+                    break
+                if row is not None:
+                    batch.append(row)
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                    self._flush(db, batch)
+                    deadline = time.monotonic() + self.flush_interval
+            self._flush(db, batch)
+        finally:
+            # The writer thread ends here, so its connection goes with it
+            db.close()
+
+
+class BulkLoader:
+    """Fetches weather and tidal data for many locations concurrently."""
+
+    def __init__(self, weather_service, tidal_service, db_path=None, workers=None,
+                 per_host=None, batch_size=None, engine='threads'):
+        """
+        Initialize the bulk loader.
+
+        Args:
+            weather_service (WeatherService): Service used for weather fetches
+            tidal_service (TidalAPIService): Service used for tidal fetches
+            db_path (str, optional): Path to the SQLite database file
+            workers (int, optional): Size of the fetch thread pool
+            per_host (int, optional): Maximum concurrent requests per upstream host
+            batch_size (int, optional): Rows per write transaction
+            engine (str): 'threads' for a fetch thread pool, 'async' for AsyncWeatherService
+        """
+        self.weather_service = weather_service
+        self.tidal_service = tidal_service
+        self.db_path = db_path or config.DB_PATH
+        self.workers = workers or config.LOADER_WORKERS
+        self.batch_size = batch_size or config.LOADER_BATCH_SIZE
+        self.per_host = per_host or config.LOADER_PER_HOST_LIMIT
+        self.limiter = HostLimiter(self.per_host)
+        self.engine = engine
+
+    def _existing_location_ids(self, table, day):
+        """Return the location ids that already have a row in table for day."""
+        cursor = get_connection_manager(self.db_path).execute(
+            f"SELECT DISTINCT location_id FROM {table} WHERE date = ?",
+            (day.isoformat(),)
+        )
+        return {row[0] for row in cursor}
+
+    def _run(self, name, table, sql, host, locations, day, fetch, to_row, fetch_async=None):
+        stats = LoadStats(name)
+        existing = self._existing_location_ids(table, day)
+        pending = [location for location in locations if location.id not in existing]
+        stats.total = len(locations)
+        stats.skipped = len(locations) - len(pending)
+
+        writer = BatchWriter(self.db_path, sql, stats, batch_size=self.batch_size)
+        writer.start()
+
+        if self.engine == 'async' and fetch_async is not None:
+            try:
+                self._fetch_async(name, pending, day, fetch_async, to_row, stats, writer)
+            finally:
+                writer.close()
+                stats.finish()
+            logger.info(stats.format_summary())
+            return stats
+
+        def work(location):
+            result = None
+            start = time.perf_counter()
+            try:
+                with self.limiter.slot(host):
+                    # Latency is measured from the moment a host slot is held
+                    start = time.perf_counter()
+                    result = fetch(location)
+            except Exception as e:
+                logger.error(f"{name} fetch failed for {location.name} ({location.id}): {e}")
+            fetched = _is_real(result)
+            stats.record_fetch(time.perf_counter() - start, fetched)
+            if fetched:
+                now = format_timestamp()
+                writer.put(to_row(location, day, result, now))
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers,
+                                    thread_name_prefix=f'{name}-fetch') as pool:
+                for _ in pool.map(work, pending):
+                    pass
+        finally:
+            writer.close()
+            stats.finish()
+
+        logger.info(stats.format_summary())
+        return stats
+
+    def _fetch_async(self, name, locations, day, fetch_async, to_row, stats, writer):
+        """Fetch every location from one event loop, queueing the rows for the writer."""
+        async def fetch_all(service):
+            async def work(location):
+                result = None
+                start = time.perf_counter()
+                try:
+                    result = await fetch_async(service, location)
+                except Exception as e:
+                    logger.error(f"{name} fetch failed for {location.name} ({location.id}): {e}")
+                fetched = _is_real(result)
+                stats.record_fetch(time.perf_counter() - start, fetched)
+                if fetched:
+                    now = format_timestamp()
+                    # put blocks while the queue is full; wait for it off the event loop
+                    await asyncio.to_thread(writer.put, to_row(location, day, result, now))
+
+            await asyncio.gather(*(work(location) for location in locations))
+
+        run_async(fetch_all, weather_service=self.weather_service,
+                  concurrency=self.workers, per_host=self.per_host)
+
+    def load_weather(self, locations, day=None):
+        """
+        Fetch and store weather data for every location lacking a row for day.
+
+        Args:
+            locations (list): Location objects (id, name, latitude, longitude)
+            day (date, optional): Date of the rows to create (default: today)
+
+        Returns:
+            LoadStats: Statistics of the run
+        """
+        return self._run(
+            'weather', 'weather_data', WEATHER_INSERT_SQL, WEATHER_HOST,
+            locations, day or date.today(),
+            lambda location: self.weather_service.fetch_weather_data(location.id, fallback=False),
+            _weather_row,
+            lambda service, location: service.fetch_weather_data(location.id, fallback=False)
+        )
+
+    def load_weather_batch(self, locations, day=None, api_key=None):
+        """
+        Fetch and store weather data with grouped requests, for every location lacking a row for day.
+
+        Locations are packed into the groups of WeatherService.weather_groups (20 ids per
+        OpenWeatherMap group query, or 100 coordinates per Open-Meteo request without an
+        API key), fetched concurrently; each location records its group's latency.
+
+        Args:
+            locations (list): Location objects whose IDs are city IDs
+            day (date, optional): Date of the rows to create (default: today)
+            api_key (str, optional): OpenWeatherMap API key
+
+        Returns:
+            LoadStats: Statistics of the run
+        """
+        day = day or date.today()
+        stats = LoadStats('weather')
+        existing = self._existing_location_ids('weather_data', day)
+        pending = {location.id: location for location in locations if location.id not in existing}
+        stats.total = len(locations)
+        stats.skipped = len(locations) - len(pending)
+        host = urlparse(config.OWM_API_URL if api_key else config.OPEN_METEO_URL).hostname
+        cities = self.weather_service.get_cities_by_ids(list(pending))
+
+        writer = BatchWriter(self.db_path, WEATHER_INSERT_SQL, stats, batch_size=self.batch_size)
+        writer.start()
+
+        def work(group):
+            results = {}
+            start = time.perf_counter()
+            try:
+                with self.limiter.slot(host):
+                    start = time.perf_counter()
+                    results = self.weather_service.fetch_weather_group(
+                        [cities[city_id] for city_id in group if city_id in cities], api_key
+                    )
+            except Exception as e:
+                logger.error(f"weather fetch failed for a group of {len(group)} locations: {e}")
+            duration = time.perf_counter() - start
+            now = format_timestamp()
+            for city_id in group:
+                stats.record_fetch(duration, city_id in results)
+                if city_id in results:
+                    writer.put(_weather_row(pending[city_id], day, results[city_id], now))
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='weather-batch') as pool:
+                for _ in pool.map(work, self.weather_service.weather_groups(list(pending), api_key)):
+                    pass
+        finally:
+            writer.close()
+            stats.finish()
+
+        logger.info(stats.format_summary())
+        return stats
+
+    def load_tidal(self, locations, day=None):
+        """
+        Fetch and store tidal data for every location lacking a row for day.
+
+        Args:
+            locations (list): Location objects (id, name, latitude, longitude)
+            day (date, optional): Date of the rows to create (default: today)
+
+        Returns:
+            LoadStats: Statistics of the run
+        """
+        day = day or date.today()
+        return self._run(
+            'tidal', 'tidal_data', TIDAL_INSERT_SQL, TIDAL_HOST,
+            locations, day,
+            lambda location: self.tidal_service.get_tidal_data(
+                location.latitude, location.longitude, location.id, location.name, day=day, fallback=False
+            ),
+            _tidal_row,
+            # Both engines resolve tides the same way; only the page scrape is async
+            lambda service, location: self.tidal_service.get_tidal_data_async(
+                service, location.latitude, location.longitude, location.id, location.name, day=day,
+                fallback=False
+            )
+        )
+
+
+def _is_real(result):
+    """Whether a fetch returned data worth storing: mock data counts as a failed fetch."""
+    return bool(result) and not result.get('mock')
+
+
+def _weather_row(location, day, weather, now):
+    return (
+        location.id,
+        day.isoformat(),
+        weather.get('temperature_value') or 0,
+        weather.get('description', 'Unknown'),
+        weather.get('wind_speed', 0),
+        weather.get('sunrise', ''),
+        weather.get('sunset', ''),
+        now,
+        now,
+    )
+
+
+def _tidal_row(location, day, tidal, now):
+    return (
+        location.id,
+        day.isoformat(),
+        tidal.get('coefficient', 0),
+        tidal.get('high_tide_time', 'N/A'),
+        tidal.get('low_tide_time', 'N/A'),
+        now,
+        now,
+    )
@@ -1,56 +1,447 @@
 import time
+import json
 import logging
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
 from functools import lru_cache
 
+import config
+from database.connection import get_connection_manager
+
 logger = logging.getLogger(__name__)
 
+
+class TTLCache:
+    """
+    Bounded, thread-safe in-memory cache with LRU eviction and TTL expiry.
+
+    Entries are evicted least-recently-used first once max_entries or
+    max_bytes is exceeded, and expired entries are swept out every
+    sweep_interval seconds rather than only when the same key is read.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, default_ttl=3600, sweep_interval=60):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of entries (None for no limit)
+            max_bytes (int, optional): Maximum approximate size of the values in bytes
+            default_ttl (int): Time to live used when none is given (seconds)
+            sweep_interval (int): Minimum seconds between two sweeps of expired entries
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sweep_interval = sweep_interval
+
+        self._entries = OrderedDict()  # key -> (data, expires, size)
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _sizeof(data):
+        try:
+            return len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(data)
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+
+    def _sweep(self, now):
+        expired = [key for key, (_, expires, _) in self._entries.items() if expires <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        self._last_sweep = now
+        if expired:
+            logger.debug(f"Swept {len(expired)} expired cache entries")
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def get(self, key):
+        """
+        Get data from the cache if it exists and is not expired.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            The cached data or None if not found or expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            data, expires, _ = entry
+            if expires <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key, data, ttl=None):
+        """
+        Store data in the cache with an expiration time.
+
+        Args:
+            key (str): Cache key
+            data: Data to cache
+            ttl (int, optional): Time to live in seconds (default: default_ttl)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        size = self._sizeof(data)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                logger.debug(f"Not caching {key}: {size} bytes exceeds the cache size limit")
+                return
+            self._entries[key] = (data, now + ttl, size)
+            self._bytes += size
+            self._maybe_sweep(now)
+            self._evict()
+
+    def delete(self, key):
+        """Remove a key from the cache if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def sweep(self):
+        """Remove every expired entry now."""
+        with self._lock:
+            self._sweep(time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Size and hit/miss/eviction counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class SQLiteCache:
+    """
+    Persistent cache tier stored in SQLite and shared by every process.
+
+    Values are stored as JSON with a wall-clock expiry so gunicorn workers,
+    scripts and restarts all see the same entries. Once the size cap is
+    exceeded the entries closest to expiry are dropped first.
+    """
+
+    def __init__(self, db_path, max_entries=None, max_bytes=None, prune_every=200):
+        """
+        Initialize the persistent cache.
+
+        Args:
+            db_path (str): Path to the SQLite cache database
+            max_entries (int, optional): Maximum number of entries (None for no limit)
+            max_bytes (int, optional): Maximum total size of the stored values in bytes
+            prune_every (int): Number of writes between two pruning passes
+        """
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+
+        self._db = get_connection_manager(self.db_path)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._db.transaction() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at)')
+
+    def _connect(self):
+        return self._db.connection()
+
+    def get(self, key):
+        """
+        Get data and its expiry time from the persistent cache.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            tuple or None: (data, expires_at) or None if not found or expired
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache read failed for {key}: {e}")
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, data, ttl):
+        """
+        Store data in the persistent cache.
+
+        Args:
+            key (str): Cache key
+            data: JSON-serializable data to cache
+            ttl (int): Time to live in seconds
+        """
+        try:
+            value = json.dumps(data)
+        except (TypeError, ValueError):
+            logger.debug(f"Not persisting {key}: value is not JSON serializable")
+            return
+
+        try:
+            with self._db.transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, value, size, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, value, len(value), time.time() + ttl)
+                )
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache write failed for {key}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def delete(self, key):
+        """Remove a key from the persistent cache if present."""
+        try:
+            with self._db.transaction() as conn:
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent cache delete failed for {key}: {e}")
+
+    def clear(self):
+        """Remove every entry from the persistent cache."""
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM cache_entries")
+
+    def prune(self):
+        """Delete expired entries, then the entries closest to expiry until under the size cap."""
+        try:
+            with self._db.transaction() as conn:
+                expired = conn.execute(
+                    "DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),)
+                ).rowcount
+                evicted = 0
+                if self.max_entries is not None:
+                    evicted += conn.execute(
+                        """DELETE FROM cache_entries WHERE key IN (
+                               SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                           )""",
+                        (self.max_entries,)
+                    ).rowcount
+                if self.max_bytes is not None:
+                    evicted += conn.execute(
+                        """DELETE FROM cache_entries WHERE key IN (
+                               SELECT key FROM (
+                                   SELECT key, SUM(size) OVER (ORDER BY expires_at DESC) AS running
+                                   FROM cache_entries
+                               ) WHERE running > ?
+                           )""",
+                        (self.max_bytes,)
+                    ).rowcount
+            if expired or evicted:
+                logger.debug(f"Pruned {expired} expired and {evicted} evicted persistent cache entries")
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache prune failed: {e}")
+
+    def stats(self):
+        """
+        Get persistent cache statistics.
+
+        Returns:
+            dict: Size and hit/miss/error counters
+        """
+        try:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+        }
+
+
 # In-memory cache
-_cache = {}
+_cache = TTLCache(
+    max_entries=config.CACHE_MAX_ENTRIES,
+    max_bytes=config.CACHE_MAX_BYTES,
+    sweep_interval=config.CACHE_SWEEP_INTERVAL
+)
+
+# Persistent cache shared across workers and restarts
+_persistent_cache = None
+_persistent_cache_lock = threading.Lock()
+
+def get_persistent_cache():
+    """Get or create the persistent cache tier, or None when it is disabled."""
+    global _persistent_cache
+    if not config.CACHE_L2_ENABLED:
+        return None
+    if _persistent_cache is None:
+        with _persistent_cache_lock:
+            if _persistent_cache is None:
+                _persistent_cache = SQLiteCache(
+                    config.CACHE_DB_PATH,
+                    max_entries=config.CACHE_L2_MAX_ENTRIES,
+                    max_bytes=config.CACHE_L2_MAX_BYTES
+                )
+    return _persistent_cache
 
 def get_cached_data(key):
     """
     Get data from cache if it exists and is not expired.
-    
+
+    The in-memory cache is checked first, then the persistent cache; a
+    persistent hit is copied back into memory for its remaining lifetime.
+
     Args:
         key (str): Cache key
-        
+
     Returns:
         dict or None: Cached data or None if not found or expired
     """
-    if key in _cache:
-        entry = _cache[key]
-        if entry['expires'] > time.time():
-            return entry['data']
-        else:
-            # Remove expired entry
-            del _cache[key]
-    return None
+    data = _cache.get(key)
+    if data is not None:
+        return data
+
+    persistent = get_persistent_cache()
+    if persistent is None:
+        return None
+
+    entry = persistent.get(key)
+    if entry is None:
+        return None
+
+    data, expires_at = entry
+    _cache.set(key, data, max(expires_at - time.time(), 0))
+    return data
 
 def cache_data(key, data, ttl=3600):
     """
     Store data in cache with expiration time.
-    
+
     Args:
         key (str): Cache key
         data (dict): Data to cache
         ttl (int): Time to live in seconds (default: 1 hour)
     """
-    _cache[key] = {
-        'data': data,
-        'expires': time.time() + ttl
-    }
+    _cache.set(key, data, ttl)
+    persistent = get_persistent_cache()
+    if persistent is not None:
+        persistent.set(key, data, ttl)
     logger.debug(f"Cached data with key {key}, expires in {ttl} seconds")
 
+def get_cache_stats():
+    """
+    Get statistics of both cache tiers.
+
+    Returns:
+        dict: Size and hit/miss/eviction counters of the memory and persistent tiers
+    """
+    persistent = get_persistent_cache()
+    return {
+        'memory': _cache.stats(),
+        'persistent': persistent.stats() if persistent is not None else None
+    }
+
 @lru_cache(maxsize=512)
 def memoized_fetch(func, *args, **kwargs):
     """
     Memoize function results for expensive operations.
-    
+
     Args:
         func: Function to memoize
         *args, **kwargs: Function arguments
-        
+
     Returns:
         Result of the function call
     """
-    return func(*args, **kwargs)
\ No newline at end of file
+    return func(*args, **kwargs)
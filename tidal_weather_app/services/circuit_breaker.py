@@ -0,0 +1,258 @@
+"""
+Circuit breakers per upstream host and a negative cache of failed fetches.
+
+A breaker counts the consecutive failures of a host (connection errors,
+timeouts, 5xx and 429 answers). After CIRCUIT_FAILURE_THRESHOLD of them it
+opens, and requests to the host fail at once with CircuitOpenError instead
+of waiting for timeouts and retries. After CIRCUIT_OPEN_SECONDS it lets
+CIRCUIT_HALF_OPEN_PROBES requests through: a success closes it again, a
+failure opens it for another period.
+
+The negative cache remembers (source, key) pairs whose fetch failed, such as
+the weather page of one city, for NEGATIVE_CACHE_TTL seconds, so a page that
+errors or does not parse is not fetched again by every view in between.
+"""
+
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+import config
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+    def __init__(self, host):
+        super().__init__(f"Circuit open for {host}")
+        self.host = host
+
+
+def is_failure_status(status_code):
+    """Whether an HTTP status counts against the health of the host."""
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitBreaker:
+    """Closed/open/half-open state of one upstream host."""
+
+    def __init__(self, host, failure_threshold=None, open_seconds=None, half_open_probes=None):
+        """
+        Initialize the breaker.
+
+        Args:
+            host (str): Host name, for logging
+            failure_threshold (int, optional): Consecutive failures that open the circuit
+            open_seconds (float, optional): Seconds the circuit stays open before probing
+            half_open_probes (int, optional): Requests let through at once while half-open
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold or config.CIRCUIT_FAILURE_THRESHOLD
+        self.open_seconds = config.CIRCUIT_OPEN_SECONDS if open_seconds is None else open_seconds
+        self.half_open_probes = half_open_probes or config.CIRCUIT_HALF_OPEN_PROBES
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self):
+        """
+        Decide whether a request may be sent now.
+
+        Returns:
+            bool: False while the circuit is open or every half-open probe is in flight
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self.probes = 0
+                logger.info(f"Circuit for {self.host} half-open, probing")
+            if self.probes < self.half_open_probes:
+                self.probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def is_open(self):
+        """Whether requests are currently being rejected, without taking a probe slot."""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def record_success(self):
+        """Record a request the host answered."""
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.host} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self.probes = 0
+
+    def record_failure(self):
+        """Record a request that failed; opens the circuit at the threshold or on a failed probe."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.probes = 0
+                self.trips += 1
+                logger.warning(f"Circuit for {self.host} opened after {self.failures} consecutive failures, "
+                               f"retrying in {self.open_seconds:.0f} s")
+
+    def release(self):
+        """Give back a half-open probe slot for a request that neither succeeded nor failed."""
+        with self._lock:
+            if self.state == HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def record_status(self, status_code):
+        """Record a response by its HTTP status."""
+        if is_failure_status(status_code):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def stats(self):
+        """State and counters of the breaker."""
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'trips': self.trips,
+                'rejected': self.rejected,
+            }
+
+
+class CircuitBreakers:
+    """The breakers of every upstream host, created on first use."""
+
+    def __init__(self, enabled=None, **options):
+        """
+        Initialize the registry.
+
+        Args:
+            enabled (bool, optional): When False, every request is allowed
+            **options: CircuitBreaker arguments shared by all hosts
+        """
+        self.enabled = config.CIRCUIT_BREAKER_ENABLED if enabled is None else enabled
+        self.options = options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        """Get or create the breaker of a host."""
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(host)
+                if breaker is None:
+                    breaker = self._breakers[host] = CircuitBreaker(host, **self.options)
+        return breaker
+
+    def for_url(self, url):
+        """Get the breaker of the host of a URL, or None when breakers are disabled."""
+        if not self.enabled:
+            return None
+        return self.get(urlparse(url).hostname or '')
+
+    def is_open(self, url):
+        """Whether requests to the host of a URL are currently being rejected."""
+        breaker = self.for_url(url)
+        return breaker is not None and breaker.is_open()
+
+    def stats(self):
+        """Stats of every breaker, keyed by host."""
+        return {host: breaker.stats() for host, breaker in list(self._breakers.items())}
+
+
+class NegativeCache:
+    """(source, key) pairs whose fetch failed recently, each expiring after a TTL."""
+
+    def __init__(self, ttl=None, max_entries=None):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (float, optional): Seconds a failure is remembered
+            max_entries (int, optional): Entries kept; the oldest are dropped beyond it
+        """
+        self.ttl = config.NEGATIVE_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or config.NEGATIVE_CACHE_MAX_ENTRIES
+        self._expires = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def __contains__(self, item):
+        source, key = item
+        expires = self._expires.get((source, key))
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            with self._lock:
+                if self._expires.get((source, key)) == expires:
+                    del self._expires[(source, key)]
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, source, key, ttl=None):
+        """Remember that the fetch of a key failed."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            # Re-inserting moves the entry to the end, so the oldest failures are dropped first
+            self._expires.pop((source, key), None)
+            self._expires[(source, key)] = time.monotonic() + (self.ttl if ttl is None else ttl)
+            while len(self._expires) > self.max_entries:
+                del self._expires[next(iter(self._expires))]
+
+    def discard(self, source, key):
+        """Forget a failure, after a successful fetch."""
+        with self._lock:
+            self._expires.pop((source, key), None)
+
+    def __len__(self):
+        return len(self._expires)
+
+
+# Shared breakers and negative cache
+_breakers = None
+_negative_cache = None
+_shared_lock = threading.Lock()
+
+def get_circuit_breakers():
+    """Get or create the shared circuit breakers."""
+    global _breakers
+    if _breakers is None:
+        with _shared_lock:
+            if _breakers is None:
+                _breakers = CircuitBreakers()
+    return _breakers
+
+def get_negative_cache():
+    """Get or create the shared negative cache."""
+    global _negative_cache
+    if _negative_cache is None:
+        with _shared_lock:
+            if _negative_cache is None:
+                _negative_cache = NegativeCache()
+    return _negative_cache
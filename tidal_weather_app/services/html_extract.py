@@ -0,0 +1,439 @@
+"""
+Extraction of weather data from OpenWeatherMap city pages and of tide
+tables from WorldTides station pages.
+
+Only the weather-widget subtree is handed to the parser, and the selectors
+are compiled once at import time. The parser backend is pluggable:
+selectolax or lxml are used when installed, BeautifulSoup otherwise.
+"""
+
+import logging
+import re
+from datetime import date, datetime, timedelta
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+import config
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    from lxml import etree as lxml_etree
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+# Attribute that identifies each widget container: (tag, attribute, value)
+WIDGET_ELEMENTS = (('*', 'id', 'weather-widget'), ('div', 'class', 'current-container'),
+                   ('div', 'class', 'owm-city-current'))
+
+WIDGET_SELECTORS = ("#weather-widget > div.section-content", "div.current-container", "div.owm-city-current")
+
+FIELD_SELECTORS = {
+    'city_country': "h2",
+    'date_time': "span.orange-text",
+    'temperature': "div.current-temp span.heading",
+    'description': "div.bold",
+}
+
+ITEMS_SELECTOR = "ul.weather-items li"
+
+# Start and end tags, skipping comments and the raw text of scripts and styles
+TAG_RE = re.compile(
+    r'<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>|<(/?)([a-zA-Z][\w:-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+    re.DOTALL | re.IGNORECASE,
+)
+ATTRIBUTE_RE = re.compile(r'([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?')
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                       'source', 'track', 'wbr'))
+
+TEMPERATURE_RE = re.compile(r'(-?\d+)°C')
+WIND_SPEED_RE = re.compile(r'(\d+\.?\d*)\s*m/s')
+
+# Tide station pages: one "Tide Times for <day>" heading per day, each followed by a table
+TIDE_HEADING_TAGS = ('div', 'h2', 'h3', 'h4', 'caption')
+TIDE_HEADING_MARKER = 'Tide Times for'
+TIDE_TABLE_SELECTOR = "table.table-bordered"
+TIDE_HEIGHT_RE = re.compile(r'(-?\d+(?:\.\d+)?)\s*m\b')
+TIDE_DATE_PATTERNS = (
+    (re.compile(r'(\d{4})-(\d{2})-(\d{2})'), lambda m: date(int(m[1]), int(m[2]), int(m[3]))),
+    (re.compile(r'(\d{1,2})\s+([A-Za-z]{3,})\.?,?\s+(\d{4})'), lambda m: _month_date(m[1], m[2], m[3])),
+    (re.compile(r'([A-Za-z]{3,})\.?\s+(\d{1,2}),?\s+(\d{4})'), lambda m: _month_date(m[2], m[1], m[3])),
+)
+
+
+def _month_date(day, month, year):
+    for month_format in ('%B', '%b'):
+        try:
+            return datetime.strptime(f"{day} {month} {year}", f"%d {month_format} %Y").date()
+        except ValueError:
+            continue
+    return None
+
+
+def _is_widget(tag, attributes):
+    """Whether a start tag opens one of the widget containers."""
+    values = {}
+    for match in ATTRIBUTE_RE.finditer(attributes):
+        values.setdefault(match[1].lower(), match[2] or match[3] or match[4] or '')
+    for widget_tag, attribute, value in WIDGET_ELEMENTS:
+        if widget_tag not in ('*', tag) or attribute not in values:
+            continue
+        if value in (values[attribute].split() if attribute == 'class' else (values[attribute],)):
+            return True
+    return False
+
+
+def _widget_subtree(html_content):
+    """
+    Cut the page down to the markup of the weather widget.
+
+    The tags of the page are scanned, skipping comments, scripts and styles,
+    for the first element opening a widget container; the subtree runs to its
+    matching end tag. When that end tag is missing, the slice is bounded by
+    config.HTML_WIDGET_MAX_CHARS and the parsers close any tag left open.
+    """
+    start = None
+    for match in TAG_RE.finditer(html_content):
+        if match[3] is None:
+            # Comment, script or style
+            continue
+        tag, closing = match[3].lower(), bool(match[2])
+        if start is None:
+            if closing or not _is_widget(tag, match[4]):
+                continue
+            if tag in VOID_TAGS or match[4].rstrip().endswith('/'):
+                return match[0]
+            start, widget_tag, depth = match.start(), tag, 0
+        if match.end() - start > config.HTML_WIDGET_MAX_CHARS:
+            break
+        if tag == widget_tag:
+            depth += -1 if closing else 1
+            if depth == 0:
+                return html_content[start:match.end()]
+    if start is None:
+        return None
+    return html_content[start:start + config.HTML_WIDGET_MAX_CHARS]
+
+
+class _BeautifulSoupBackend:
+    name = 'bs4'
+
+    tide_headings = soupsieve.compile(', '.join(TIDE_HEADING_TAGS))
+    tide_tables = soupsieve.compile(TIDE_TABLE_SELECTOR)
+
+    widgets = [soupsieve.compile(selector) for selector in WIDGET_SELECTORS]
+    fields = {key: soupsieve.compile(selector) for key, selector in FIELD_SELECTORS.items()}
+    items = soupsieve.compile(ITEMS_SELECTOR)
+
+    def extract(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        widget = None
+        for selector in self.widgets:
+            widget = selector.select_one(soup)
+            if widget is not None:
+                break
+        if widget is None:
+            return None
+        values = {}
+        for key, selector in self.fields.items():
+            element = selector.select_one(widget)
+            values[key] = element.text.strip() if element is not None else "Unknown"
+        values['items'] = [item.text.strip() for item in self.items.select(widget)]
+        return values
+
+    def tide_sections(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        heading = None
+        for node in soup.find_all(lambda tag: self.tide_headings.match(tag) or self.tide_tables.match(tag)):
+            if node.name != 'table':
+                if TIDE_HEADING_MARKER in ''.join(node.find_all(string=True, recursive=False)):
+                    heading = node.get_text(' ', strip=True)
+                continue
+            rows = [[cell.get_text(strip=True) for cell in row.find_all('td', recursive=False)]
+                    for row in node.find_all('tr')]
+            yield heading, rows
+            heading = None
+
+
+class _LxmlBackend:
+    name = 'lxml'
+
+    @staticmethod
+    def _cls(name):
+        return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+    def __init__(self):
+        cls = self._cls
+        self.widgets = [
+            lxml_etree.XPath(f"//*[@id='weather-widget']/div[{cls('section-content')}]"),
+            lxml_etree.XPath(f"//div[{cls('current-container')}]"),
+            lxml_etree.XPath(f"//div[{cls('owm-city-current')}]"),
+        ]
+        self.fields = {
+            'city_country': lxml_etree.XPath(".//h2"),
+            'date_time': lxml_etree.XPath(f".//span[{cls('orange-text')}]"),
+            'temperature': lxml_etree.XPath(f".//div[{cls('current-temp')}]//span[{cls('heading')}]"),
+            'description': lxml_etree.XPath(f".//div[{cls('bold')}]"),
+        }
+        self.items = lxml_etree.XPath(f".//ul[{cls('weather-items')}]//li")
+        self.tide_nodes = lxml_etree.XPath(
+            " | ".join(f"//{tag}" for tag in TIDE_HEADING_TAGS) + f" | //table[{cls('table-bordered')}]"
+        )
+
+    def extract(self, html):
+        root = lxml_html.fromstring(html)
+        widget = None
+        for xpath in self.widgets:
+            found = xpath(root)
+            if found:
+                widget = found[0]
+                break
+        if widget is None:
+            return None
+        values = {}
+        for key, xpath in self.fields.items():
+            found = xpath(widget)
+            values[key] = found[0].text_content().strip() if found else "Unknown"
+        values['items'] = [item.text_content().strip() for item in self.items(widget)]
+        return values
+
+    def tide_sections(self, html):
+        root = lxml_html.fromstring(html)
+        heading = None
+        # XPath unions are returned in document order
+        for node in self.tide_nodes(root):
+            if node.tag != 'table':
+                if node.text and TIDE_HEADING_MARKER in node.text:
+                    heading = ' '.join(node.text_content().split())
+                continue
+            rows = [[cell.text_content().strip() for cell in row if cell.tag == 'td']
+                    for row in node.iter('tr')]
+            yield heading, rows
+            heading = None
+
+
+class _SelectolaxBackend:
+    name = 'selectolax'
+
+    def extract(self, html):
+        tree = SelectolaxParser(html)
+        widget = None
+        for selector in WIDGET_SELECTORS:
+            widget = tree.css_first(selector)
+            if widget is not None:
+                break
+        if widget is None:
+            return None
+        values = {}
+        for key, selector in FIELD_SELECTORS.items():
+            element = widget.css_first(selector)
+            values[key] = element.text(deep=True).strip() if element is not None else "Unknown"
+        values['items'] = [item.text(deep=True).strip() for item in widget.css(ITEMS_SELECTOR)]
+        return values
+
+    def tide_sections(self, html):
+        tree = SelectolaxParser(html)
+        heading = None
+        # Matches come back in document order, so each table follows its heading
+        for node in tree.css(', '.join(TIDE_HEADING_TAGS + (TIDE_TABLE_SELECTOR,))):
+            if node.tag != 'table':
+                if TIDE_HEADING_MARKER in node.text(deep=False):
+                    heading = ' '.join(node.text(deep=True).split())
+                continue
+            rows = [[cell.text(deep=True).strip() for cell in row.iter() if cell.tag == 'td']
+                    for row in node.css('tr')]
+            yield heading, rows
+            heading = None
+
+
+def available_backends():
+    """Names of the parser backends that can be used, fastest first."""
+    names = []
+    if SelectolaxParser is not None:
+        names.append('selectolax')
+    if lxml_html is not None:
+        names.append('lxml')
+    names.append('bs4')
+    return names
+
+
+_backends = {}
+
+
+def get_backend(name=None):
+    """
+    Get a parser backend by name.
+
+    Args:
+        name (str, optional): 'selectolax', 'lxml', 'bs4' or 'auto' (default: config.HTML_PARSER_BACKEND)
+
+    Returns:
+        The backend, falling back to bs4 when the requested one is not installed
+    """
+    name = name or config.HTML_PARSER_BACKEND
+    available = available_backends()
+    if name == 'auto':
+        name = available[0]
+    elif name not in available:
+        logger.warning(f"HTML parser backend {name} is not installed, using bs4")
+        name = 'bs4'
+
+    if name not in _backends:
+        factory = {'selectolax': _SelectolaxBackend, 'lxml': _LxmlBackend, 'bs4': _BeautifulSoupBackend}[name]
+        _backends[name] = factory()
+    return _backends[name]
+
+
+def extract_weather_fields(html_content, backend=None):
+    """
+    Extract the raw text fields of the weather widget.
+
+    Args:
+        html_content (str): HTML content from OpenWeatherMap website
+        backend (str, optional): Parser backend name
+
+    Returns:
+        dict: Widget texts (city_country, date_time, temperature, description, items)
+              or None if the page has no weather widget
+    """
+    subtree = _widget_subtree(html_content)
+    if subtree is None:
+        return None
+    return get_backend(backend).extract(subtree)
+
+
+def parse_weather_html(html_content, city_id, backend=None):
+    """
+    Parse weather data from HTML content.
+
+    Args:
+        html_content (str): HTML content from OpenWeatherMap website
+        city_id (int): City ID for reference
+        backend (str, optional): Parser backend name
+
+    Returns:
+        dict: Structured weather data or None if the page has no weather widget
+    """
+    fields = extract_weather_fields(html_content, backend)
+    if fields is None:
+        return None
+
+    # Initialize weather details with default values
+    weather_details = {
+        'wind': 'Unknown',
+        'pressure': 'Unknown',
+        'humidity': 'Unknown',
+        'uv': 'Unknown',
+        'dew_point': 'Unknown',
+        'visibility': 'Unknown'
+    }
+
+    # Parse each weather item
+    for item_text in fields['items']:
+        if 'm/s' in item_text:
+            weather_details['wind'] = item_text
+            # Extract wind speed value
+            wind_match = WIND_SPEED_RE.search(item_text)
+            weather_details['wind_speed'] = wind_match.group(1) if wind_match else "0"
+        elif 'hPa' in item_text:
+            weather_details['pressure'] = item_text
+        elif 'Humidity:' in item_text:
+            weather_details['humidity'] = item_text.replace('Humidity:', '').strip()
+        elif 'UV:' in item_text:
+            weather_details['uv'] = item_text.replace('UV:', '').strip()
+        elif 'Dew point:' in item_text:
+            weather_details['dew_point'] = item_text.replace('Dew point:', '').strip()
+        elif 'Visibility:' in item_text:
+            weather_details['visibility'] = item_text.replace('Visibility:', '').strip()
+
+    # Extract temperature value
+    temperature = fields['temperature']
+    temp_value = None
+    if temperature != "Unknown":
+        temp_match = TEMPERATURE_RE.search(temperature)
+        if temp_match:
+            temp_value = int(temp_match.group(1))
+
+    # Create structured weather data
+    return {
+        'city_id': city_id,
+        'city_country': fields['city_country'],
+        'date_time': fields['date_time'],
+        'temperature': temperature,
+        'temperature_value': temp_value,
+        'description': fields['description'],
+        'wind': weather_details['wind'],
+        'wind_speed': weather_details.get('wind_speed', 0),
+        'pressure': weather_details['pressure'],
+        'humidity': weather_details['humidity'],
+        'uv': weather_details['uv'],
+        'dew_point': weather_details['dew_point'],
+        'visibility': weather_details['visibility'],
+        'fetched_at': datetime.now().isoformat()
+    }
+
+
+def _heading_date(heading):
+    """Date named in a tide table heading, or None if it has no recognizable date."""
+    if not heading:
+        return None
+    for pattern, to_date in TIDE_DATE_PATTERNS:
+        match = pattern.search(heading)
+        if match:
+            day = to_date(match)
+            if day is not None:
+                return day
+    return None
+
+
+def extract_tide_table(html_content, start_day=None, backend=None):
+    """
+    Extract every tide listed on a tide station page.
+
+    The page is parsed once and its tide tables are read in document order.
+    Each table takes the date of the heading before it; a table whose date
+    cannot be read is taken to be the day after the previous one, the first
+    one being start_day.
+
+    Args:
+        html_content (str): HTML content of the station page
+        start_day (date, optional): Day of the first table when its heading has no date (default: today)
+        backend (str, optional): Parser backend name
+
+    Returns:
+        list: Tides as dicts with date, type ('high' or 'low'), time and height (meters or None),
+              in page order
+    """
+    previous_day = None
+    tides = []
+    for heading, rows in get_backend(backend).tide_sections(html_content):
+        day = _heading_date(heading)
+        if day is None:
+            day = previous_day + timedelta(days=1) if previous_day else (start_day or date.today())
+        previous_day = day
+
+        for cells in rows:
+            if len(cells) < 2:
+                continue
+            label = cells[0].lower()
+            if 'high' in label:
+                tide_type = 'high'
+            elif 'low' in label:
+                tide_type = 'low'
+            else:
+                continue
+            height_match = TIDE_HEIGHT_RE.search(cells[2]) if len(cells) > 2 else None
+            tides.append({
+                'date': day.isoformat(),
+                'type': tide_type,
+                'time': cells[1],
+                'height': float(height_match.group(1)) if height_match else None,
+            })
+    return tides
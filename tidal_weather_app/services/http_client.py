@@ -0,0 +1,146 @@
+"""
+Shared, pooled HTTP client used by all upstream-facing services.
+
+A single requests.Session is shared process-wide so TCP+TLS connections are
+kept alive and reused across cities and retries instead of being reopened
+for every request. Each request first asks the circuit breaker of its host,
+so a host that keeps failing is skipped at once instead of waiting for
+timeouts (see services.circuit_breaker).
+"""
+
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from services.circuit_breaker import CircuitOpenError, get_circuit_breakers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class HTTPClient:
+    """Keep-alive HTTP client with per-host connection pools and usage counters."""
+
+    def __init__(self, pool_maxsize=None, host_pool_limits=None, pool_block=None, timeout=None, breakers=None):
+        """
+        Initialize the HTTP client.
+
+        Args:
+            pool_maxsize (int, optional): Default connections kept per host
+            host_pool_limits (dict, optional): Per-host overrides, e.g. {'openweathermap.org': 8}
+            pool_block (bool, optional): Block instead of opening extra connections when a pool is full
+            timeout (float, optional): Default request timeout in seconds
+            breakers (CircuitBreakers, optional): Circuit breakers per host (default: the shared ones)
+        """
+        self.pool_maxsize = pool_maxsize or config.HTTP_POOL_MAXSIZE
+        self.host_pool_limits = dict(config.HTTP_HOST_POOL_LIMITS if host_pool_limits is None else host_pool_limits)
+        self.pool_block = config.HTTP_POOL_BLOCK if pool_block is None else pool_block
+        self.timeout = timeout or config.REQUEST_TIMEOUT
+        self.breakers = breakers or get_circuit_breakers()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': DEFAULT_USER_AGENT,
+            'Connection': 'keep-alive',
+        })
+
+        # Retries are handled by the services, so the adapters never retry
+        self._adapters = []
+        default_adapter = self._make_adapter(self.pool_maxsize)
+        self.session.mount('http://', default_adapter)
+        self.session.mount('https://', default_adapter)
+        for host, limit in self.host_pool_limits.items():
+            adapter = self._make_adapter(limit)
+            self.session.mount(f'http://{host}/', adapter)
+            self.session.mount(f'https://{host}/', adapter)
+
+    def _make_adapter(self, maxsize):
+        adapter = HTTPAdapter(
+            pool_connections=config.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=maxsize,
+            pool_block=self.pool_block,
+            max_retries=0
+        )
+        self._adapters.append(adapter)
+        return adapter
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the shared session, applying the default timeout.
+
+        Raises:
+            CircuitOpenError: The circuit of the host is open, nothing was sent
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        breaker = self.breakers.for_url(url)
+        if breaker is None:
+            return self.session.request(method, url, **kwargs)
+        if not breaker.allow():
+            raise CircuitOpenError(breaker.host)
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            breaker.record_failure()
+            raise
+        except Exception:
+            # A bad URL or an encoding error says nothing about the health of the host
+            breaker.release()
+            raise
+        breaker.record_status(response.status_code)
+        return response
+
+    def is_available(self, url):
+        """Whether a request to the host of a URL would be sent now rather than rejected."""
+        return not self.breakers.is_open(url)
+
+    def get(self, url, **kwargs):
+        """Send a GET request through the shared session."""
+        return self.request('GET', url, **kwargs)
+
+    def stats(self):
+        """
+        Report how many connections were opened versus reused.
+
+        Returns:
+            dict: Totals and a per-host breakdown of opened/reused connections
+        """
+        hosts = {}
+        for adapter in self._adapters:
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                entry = hosts.setdefault(pool.host, {'opened': 0, 'requests': 0, 'reused': 0})
+                entry['opened'] += pool.num_connections
+                entry['requests'] += pool.num_requests
+                entry['reused'] += max(pool.num_requests - pool.num_connections, 0)
+
+        return {
+            'opened': sum(entry['opened'] for entry in hosts.values()),
+            'reused': sum(entry['reused'] for entry in hosts.values()),
+            'requests': sum(entry['requests'] for entry in hosts.values()),
+            'hosts': hosts,
+            'circuits': self.breakers.stats(),
+        }
+
+    def close(self):
+        """Close every pooled connection."""
+        self.session.close()
+
+
+def get_http_client():
+    """Get or create the process-wide HTTP client instance."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HTTPClient()
+    return _client
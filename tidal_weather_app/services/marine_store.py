@@ -0,0 +1,303 @@
+"""
+Columnar store for hourly marine weather series.
+
+Each (location, UTC day, variable) is one row holding the 24 hourly values
+as a packed little-endian float32 BLOB (96 bytes, NaN for missing hours),
+in a WITHOUT ROWID table clustered on that key. A week of every variable
+of a location is then one range scan returning a few dozen small rows,
+decoded with a single np.frombuffer. Coarser resolutions (3-hourly,
+daily min/max/mean) are computed from the hourly arrays with NumPy when
+they are read.
+"""
+
+import logging
+import threading
+import time
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+
+import config
+from database.connection import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_DAY = 24
+SECONDS_PER_HOUR = 3600
+_VALUE_DTYPE = np.dtype('<f4')
+
+# Hourly variables requested from Open-Meteo by TidalAPIService.fetch_marine_weather_data
+MARINE_VARIABLES = (
+    'temperature_2m', 'relativehumidity_2m', 'wind_speed_10m', 'wind_direction_10m',
+    'pressure_msl', 'precipitation', 'cloudcover', 'wave_height', 'wave_direction',
+)
+
+# Directions in degrees are averaged as angles, so 350 and 10 average to 0, not 180
+CIRCULAR_VARIABLES = frozenset(('wind_direction_10m', 'wave_direction'))
+
+RESOLUTIONS = ('1h', '3h', 'daily')
+
+
+_EPOCH_DAY = date(1970, 1, 1)
+
+
+def _day_number(day):
+    """Days from 1970-01-01 to a date, the stored form of days."""
+    return (day - _EPOCH_DAY).days
+
+
+def _mean(values, variable, axis):
+    """NaN-ignoring mean along an axis, circular for direction variables; all-NaN slices give NaN."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if variable in CIRCULAR_VARIABLES:
+            # In float64: float32 sums leave errors larger than the rounding below
+            radians = np.radians(np.asarray(values, dtype=np.float64))
+            mean = np.degrees(np.arctan2(np.nanmean(np.sin(radians), axis=axis),
+                                         np.nanmean(np.cos(radians), axis=axis)))
+            # Rounded first: a mean a hair below 0 would otherwise wrap to 360.0
+            return np.mod(np.round(mean, 6), 360.0)
+        return np.nanmean(values, axis=axis)
+
+
+def downsample(hourly, variable, resolution):
+    """
+    Downsample hourly values covering whole days.
+
+    Args:
+        hourly (np.ndarray): Hourly values, a multiple of 24 long
+        variable (str): Variable name, for direction variables
+        resolution (str): '1h', '3h' (mean of each 3 hours) or 'daily'
+
+    Returns:
+        np.ndarray or dict: The values at the resolution; for 'daily', a dict of
+                            'min', 'max' and 'mean' arrays
+    """
+    if resolution == '1h':
+        return hourly
+    if resolution == '3h':
+        return _mean(hourly.reshape(-1, 3), variable, axis=1)
+    if resolution == 'daily':
+        days = hourly.reshape(-1, HOURS_PER_DAY)
+        # All-NaN days stay NaN without a RuntimeWarning per day
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return {
+                'min': np.nanmin(days, axis=1),
+                'max': np.nanmax(days, axis=1),
+                'mean': _mean(days, variable, axis=1),
+            }
+    raise ValueError(f"Unknown resolution {resolution!r}, expected one of {', '.join(RESOLUTIONS)}")
+
+
+class MarineStore:
+    """Hourly marine series per location, day and variable, packed as float32 BLOBs in SQLite."""
+
+    def __init__(self, db_path=None):
+        """
+        Initialize the store.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database file
+        """
+        self.db_path = db_path or config.MARINE_DB_PATH
+        self._db = get_connection_manager(self.db_path)
+        self._variable_ids = {}
+        self._lock = threading.Lock()
+
+        # Days are counted from 1970-01-01 and variables by ID, so a key is a few bytes
+        # next to the 96-byte series instead of two repeated strings
+        with self._db.transaction() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS marine_variables (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS marine_series (
+                location_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                variable_id INTEGER NOT NULL,
+                hourly BLOB NOT NULL,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY (location_id, day, variable_id)
+            ) WITHOUT ROWID
+            """)
+
+    def _variables(self, names=None, create=False):
+        """
+        Map variable names to their IDs.
+
+        Args:
+            names (list, optional): Names to map (default: every stored variable)
+            create (bool): Register the names that have no ID yet
+
+        Returns:
+            dict: Name -> ID of the known names
+        """
+        with self._lock:
+            if names is None or any(name not in self._variable_ids for name in names):
+                if create:
+                    with self._db.transaction() as conn:
+                        conn.executemany("INSERT OR IGNORE INTO marine_variables (name) VALUES (?)",
+                                         [(name,) for name in names])
+                self._variable_ids = {name: variable_id for variable_id, name in
+                                      self._db.execute("SELECT id, name FROM marine_variables")}
+            if names is None:
+                return dict(self._variable_ids)
+            return {name: self._variable_ids[name] for name in names if name in self._variable_ids}
+
+    def store_hourly(self, location_id, timestamps, series):
+        """
+        Store hourly values of a location.
+
+        Values are placed at their UTC hour; hours missing from the input keep their
+        stored value, so partial days can be written in several calls.
+
+        Args:
+            location_id (int): Location ID
+            timestamps (array-like): POSIX seconds of the values, on the hour
+            series (dict): Variable name -> values aligned with timestamps (None or NaN if missing)
+
+        Returns:
+            int: Number of (day, variable) rows written
+        """
+        hours = np.asarray(timestamps, dtype=np.int64) // SECONDS_PER_HOUR
+        if not len(hours) or not series:
+            return 0
+        first_day = int(hours.min()) // HOURS_PER_DAY
+        last_day = int(hours.max()) // HOURS_PER_DAY
+        slots = hours - first_day * HOURS_PER_DAY
+        days = last_day - first_day + 1
+
+        variable_ids = self._variables(list(series), create=True)
+        existing = self._read(location_id, list(variable_ids.values()), first_day, last_day)
+        now = int(time.time())
+        rows = []
+        for variable, values in series.items():
+            values = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+            grid = np.full(days * HOURS_PER_DAY, np.nan, dtype=_VALUE_DTYPE)
+            grid[slots] = values
+            grid = grid.reshape(days, HOURS_PER_DAY)
+            variable_id = variable_ids[variable]
+            for index in range(days):
+                if np.isnan(grid[index]).all():
+                    continue
+                previous = existing.get((variable_id, first_day + index))
+                if previous is not None:
+                    grid[index] = np.where(np.isnan(grid[index]), previous, grid[index])
+                rows.append((location_id, first_day + index, variable_id, grid[index].tobytes(), now))
+
+        with self._db.transaction() as conn:
+            conn.executemany(
+                """INSERT OR REPLACE INTO marine_series (location_id, day, variable_id, hourly, updated_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                rows
+            )
+        return len(rows)
+
+    def store_open_meteo(self, location_id, response):
+        """
+        Store the hourly section of an Open-Meteo forecast response.
+
+        Args:
+            location_id (int): Location ID
+            response (dict): Decoded JSON of the forecast, with times in GMT (the API default)
+
+        Returns:
+            int: Number of (day, variable) rows written
+        """
+        hourly = (response or {}).get('hourly') or {}
+        times = hourly.get('time')
+        if not times:
+            return 0
+        offset = response.get('utc_offset_seconds', 0)
+        timestamps = np.array(times, dtype='datetime64[s]').astype(np.int64) - offset
+        series = {variable: values for variable, values in hourly.items()
+                  if variable != 'time' and isinstance(values, list)}
+        return self.store_hourly(location_id, timestamps, series)
+
+    def _read(self, location_id, variable_ids, first_day, last_day):
+        """Stored hourly arrays keyed by (variable ID, day number), in one range scan."""
+        query = """SELECT variable_id, day, hourly FROM marine_series
+                   WHERE location_id = ? AND day BETWEEN ? AND ?"""
+        params = [location_id, first_day, last_day]
+        if variable_ids is not None:
+            query += f" AND variable_id IN ({', '.join('?' * len(variable_ids))})"
+            params.extend(variable_ids)
+        rows = self._db.execute(query, params).fetchall()
+        if not rows:
+            return {}
+        values = np.frombuffer(b''.join(row[2] for row in rows), dtype=_VALUE_DTYPE).reshape(-1, HOURS_PER_DAY)
+        return {(row[0], row[1]): values[index] for index, row in enumerate(rows)}
+
+    def query(self, location_id, start, end=None, variables=None, resolution='1h'):
+        """
+        Read the series of a location over whole UTC days.
+
+        Args:
+            location_id (int): Location ID
+            start (date): First day
+            end (date, optional): Last day, included (default: 6 days after start)
+            variables (list, optional): Variables to read (default: every stored variable)
+            resolution (str): '1h', '3h' or 'daily'
+
+        Returns:
+            dict: 'time' (POSIX seconds of each step, or of each day for 'daily') and one
+                  entry per variable, an array with NaN for missing values or, for
+                  'daily', a dict of 'min', 'max' and 'mean' arrays
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}, expected one of {', '.join(RESOLUTIONS)}")
+        end = end or start + timedelta(days=6)
+        days = (end - start).days + 1
+        if days < 1:
+            return {'time': np.empty(0)}
+
+        first_day = _day_number(start)
+        variable_ids = self._variables(list(variables) if variables else None)
+        stored = self._read(location_id, list(variable_ids.values()) if variables else None,
+                            first_day, first_day + days - 1)
+        names = {variable_id: name for name, variable_id in variable_ids.items()}
+        if variables:
+            hourly = {variable: np.full((days, HOURS_PER_DAY), np.nan) for variable in variables}
+        else:
+            hourly = {names[variable_id]: np.full((days, HOURS_PER_DAY), np.nan)
+                      for variable_id in sorted({variable_id for variable_id, _ in stored}, key=names.get)}
+        for (variable_id, day), values in stored.items():
+            hourly[names[variable_id]][day - first_day] = values
+        result = {variable: downsample(values.ravel(), variable, resolution) for variable, values in hourly.items()}
+
+        step = {'1h': SECONDS_PER_HOUR, '3h': 3 * SECONDS_PER_HOUR, 'daily': HOURS_PER_DAY * SECONDS_PER_HOUR}[resolution]
+        origin = first_day * HOURS_PER_DAY * SECONDS_PER_HOUR
+        result['time'] = origin + step * np.arange(days * HOURS_PER_DAY * SECONDS_PER_HOUR // step, dtype=np.float64)
+        return result
+
+    def stored_days(self, location_id, start, end):
+        """Days between start and end (included) with at least one stored series."""
+        rows = self._db.execute(
+            "SELECT DISTINCT day FROM marine_series WHERE location_id = ? AND day BETWEEN ? AND ? ORDER BY day",
+            (location_id, _day_number(start), _day_number(end))
+        )
+        return [_EPOCH_DAY + timedelta(days=row[0]) for row in rows]
+
+    def prune(self, before):
+        """Delete the days before a date; returns the number of rows deleted."""
+        with self._db.transaction() as conn:
+            return conn.execute("DELETE FROM marine_series WHERE day < ?", (_day_number(before),)).rowcount
+
+
+# Shared store
+_store = None
+_store_lock = threading.Lock()
+
+def get_marine_store():
+    """Get or create the shared marine series store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MarineStore()
+    return _store
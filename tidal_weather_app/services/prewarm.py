@@ -0,0 +1,317 @@
+"""
+Pre-warming of the next day's weather and tidal rows.
+
+Location page views are counted so the most-viewed locations are warmed
+first. A pre-warm run plans one task per (source, location) in the
+prewarm_tasks table, then works through the pending ones at a pace that
+spreads them over a time window, so an interrupted run resumes where it
+stopped and upstream hosts never see a burst.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta
+
+import config
+from database.connection import get_connection_manager
+from models.record import format_timestamp
+from services.bulk_loader import (
+    HostLimiter, TIDAL_HOST, TIDAL_INSERT_SQL, WEATHER_HOST, WEATHER_INSERT_SQL, _tidal_row, _weather_row
+)
+
+logger = logging.getLogger(__name__)
+
+PrewarmLocation = namedtuple('PrewarmLocation', 'id name latitude longitude')
+
+WEATHER_UPDATE_SQL = """UPDATE weather_data
+    SET temperature = ?, condition = ?, wind_speed = ?, sunrise = ?, sunset = ?, updated_at = ?
+    WHERE location_id = ? AND date = ?"""
+
+TIDAL_UPDATE_SQL = """UPDATE tidal_data
+    SET coefficient = ?, high_tide_time = ?, low_tide_time = ?, updated_at = ?
+    WHERE location_id = ? AND date = ?"""
+
+
+def _create_tables(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS location_views (
+        location_id INTEGER PRIMARY KEY,
+        views INTEGER NOT NULL DEFAULT 0,
+        last_viewed_at TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS prewarm_tasks (
+        run_date TEXT NOT NULL,
+        source TEXT NOT NULL,
+        location_id INTEGER NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT,
+        PRIMARY KEY (run_date, source, location_id)
+    )
+    """)
+
+
+class ViewCounter:
+    """
+    Counts location page views.
+
+    Views are accumulated in memory and added to the location_views table at
+    most every flush_interval seconds, so a page view costs no database write.
+    """
+
+    def __init__(self, db_path=None, flush_interval=None):
+        """
+        Initialize the view counter.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database file
+            flush_interval (int, optional): Minimum seconds between two flushes
+        """
+        self.db_path = db_path or config.DB_PATH
+        self.flush_interval = flush_interval or config.VIEW_COUNT_FLUSH_INTERVAL
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._ready = False
+
+    def record(self, location_id):
+        """Count one view of a location page."""
+        with self._lock:
+            self._counts[location_id] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add the views counted since the last flush to the database."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = time.monotonic()
+        if not counts:
+            return
+
+        now = format_timestamp()
+        try:
+            with get_connection_manager(self.db_path).transaction() as conn:
+                if not self._ready:
+                    _create_tables(conn)
+                    self._ready = True
+                conn.executemany(
+                    """INSERT INTO location_views (location_id, views, last_viewed_at) VALUES (?, ?, ?)
+                       ON CONFLICT (location_id) DO UPDATE
+                       SET views = views + excluded.views, last_viewed_at = excluded.last_viewed_at""",
+                    [(location_id, views, now) for location_id, views in counts.items()]
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store location views: {e}")
+
+
+class PrewarmScheduler:
+    """Warms tomorrow's tidal rows and refreshes today's weather rows for all locations."""
+
+    def __init__(self, weather_service, tidal_service, db_path=None, workers=None,
+                 per_host=None, max_attempts=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            weather_service (WeatherService): Service used for weather fetches
+            tidal_service (TidalAPIService): Service used for tidal fetches
+            db_path (str, optional): Path to the SQLite database file
+            workers (int, optional): Size of the fetch thread pool
+            per_host (int, optional): Maximum concurrent requests per upstream host
+            max_attempts (int, optional): Attempts before a failing task is given up
+        """
+        self.weather_service = weather_service
+        self.tidal_service = tidal_service
+        self.db_path = db_path or config.DB_PATH
+        self.workers = workers or config.PREWARM_WORKERS
+        self.limiter = HostLimiter(per_host or config.LOADER_PER_HOST_LIMIT)
+        self.max_attempts = max_attempts or config.PREWARM_MAX_ATTEMPTS
+        self._db = get_connection_manager(self.db_path)
+
+        with self._db.transaction() as conn:
+            _create_tables(conn)
+
+    def _connect(self):
+        return self._db.connection()
+
+    def plan(self, run_date):
+        """
+        Create the tasks of a run, keeping the status of tasks planned earlier.
+
+        Args:
+            run_date (date): Day the run prepares for its rollover
+
+        Returns:
+            int: Number of tasks added
+        """
+        with self._db.transaction() as conn:
+            before = conn.total_changes
+            for source in ('tidal', 'weather'):
+                conn.execute(
+                    """INSERT OR IGNORE INTO prewarm_tasks (run_date, source, location_id, priority)
+                       SELECT ?, ?, l.id, COALESCE(v.views, 0)
+                       FROM locations l LEFT JOIN location_views v ON v.location_id = l.id""",
+                    (run_date.isoformat(), source)
+                )
+            return conn.total_changes - before
+
+    def progress(self, run_date):
+        """
+        Get the progress of a run.
+
+        Returns:
+            dict: Number of tasks per status, and the total
+        """
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) FROM prewarm_tasks WHERE run_date = ? GROUP BY status",
+            (run_date.isoformat(),)
+        ).fetchall()
+        counts = {'pending': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(rows))
+        counts['total'] = sum(count for _, count in rows)
+        return counts
+
+    def reset(self, run_date):
+        """Forget the tasks of a run so the next one starts over."""
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM prewarm_tasks WHERE run_date = ?", (run_date.isoformat(),))
+
+    def _pending_tasks(self, run_date, limit=None):
+        """Unfinished tasks of a run, most-viewed locations first."""
+        query = """SELECT t.source, l.id, l.name, l.latitude, l.longitude
+                   FROM prewarm_tasks t JOIN locations l ON l.id = t.location_id
+                   WHERE t.run_date = ? AND t.status != 'done' AND t.attempts < ?
+                   ORDER BY t.priority DESC, l.id, t.source"""
+        params = [run_date.isoformat(), self.max_attempts]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = self._connect().execute(query, params).fetchall()
+        return [(source, PrewarmLocation(*location)) for source, *location in rows]
+
+    def _store(self, run_date, source, location, results):
+        """Upsert the rows of a task and mark the task done in one transaction."""
+        now = format_timestamp()
+        with self._db.transaction() as conn:
+            for day, result in results.items():
+                if source == 'weather':
+                    row = _weather_row(location, day, result, now)
+                    update_sql, insert_sql, values = WEATHER_UPDATE_SQL, WEATHER_INSERT_SQL, row[2:7]
+                else:
+                    row = _tidal_row(location, day, result, now)
+                    update_sql, insert_sql, values = TIDAL_UPDATE_SQL, TIDAL_INSERT_SQL, row[2:5]
+                cursor = conn.execute(update_sql, (*values, now, location.id, day.isoformat()))
+                if cursor.rowcount == 0:
+                    conn.execute(insert_sql, row)
+            self._mark(conn, run_date, source, location.id, 'done', now)
+
+    def _mark(self, conn, run_date, source, location_id, status, now):
+        conn.execute(
+            """UPDATE prewarm_tasks SET status = ?, attempts = attempts + 1, updated_at = ?
+               WHERE run_date = ? AND source = ? AND location_id = ?""",
+            (status, now, run_date.isoformat(), source, location_id)
+        )
+
+    def _fetch(self, source, location, day):
+        """
+        Fetch the data of a task, keyed by the day of each row to store.
+
+        Mock data is never returned: a fetch that fails returns nothing, so the
+        task fails, the stored rows are left alone and the next run retries it.
+        """
+        if source == 'weather':
+            with self.limiter.slot(WEATHER_HOST):
+                weather = self.weather_service.fetch_weather_data(location.id, fallback=False)
+            return {day: weather} if weather else {}
+
+        with self.limiter.slot(TIDAL_HOST):
+            week = self.tidal_service.get_tidal_week(
+                location.latitude, location.longitude, location.id, location.name, day=day
+            )
+        if day.isoformat() not in week:
+            return {}
+        # One scrape of the station page stores every day it lists
+        return {date.fromisoformat(tide_day): tides for tide_day, tides in week.items()}
+
+    def _work(self, run_date, source, location):
+        # Tides are prepared for tomorrow, weather is refreshed for today
+        day = run_date + timedelta(days=1) if source == 'tidal' else run_date
+        try:
+            results = self._fetch(source, location, day)
+            if results:
+                self._store(run_date, source, location, results)
+                return True
+            logger.warning(f"Pre-warm {source} found no data for {location.name} ({location.id}), will retry")
+        except Exception as e:
+            logger.error(f"Pre-warm {source} failed for {location.name} ({location.id}): {e}")
+
+        try:
+            with self._db.transaction() as conn:
+                self._mark(conn, run_date, source, location.id, 'failed',
+                           format_timestamp())
+        except sqlite3.Error as e:
+            logger.error(f"Could not record pre-warm failure for {location.id}: {e}")
+        return False
+
+    def run(self, run_date=None, window=None, limit=None, report_every=None, report=None):
+        """
+        Plan and run the pre-warm tasks of a day.
+
+        The pending tasks are started at a regular pace so they are spread over
+        the window, which never extends past midnight of run_date.
+
+        Args:
+            run_date (date, optional): Day to prepare the rollover of (default: today)
+            window (int, optional): Seconds to spread the run over (0 for no pacing)
+            limit (int, optional): Maximum number of tasks to run
+            report_every (int, optional): Number of finished tasks between progress reports
+            report (callable, optional): Receives each progress line (default: logger.info)
+
+        Returns:
+            dict: Progress of the run once finished
+        """
+        run_date = run_date or date.today()
+        window = config.PREWARM_WINDOW if window is None else window
+        report_every = report_every or config.PREWARM_REPORT_EVERY
+        report = report or logger.info
+
+        added = self.plan(run_date)
+        tasks = self._pending_tasks(run_date, limit)
+        midnight = datetime.combine(run_date + timedelta(days=1), dt_time.min)
+        window = max(min(window, (midnight - datetime.now()).total_seconds()), 0)
+        interval = window / len(tasks) if tasks else 0
+        report(f"Pre-warm {run_date}: {added} tasks planned, {len(tasks)} to run "
+               f"over {int(window)}s ({interval:.2f}s apart)")
+
+        finished = {'ok': 0, 'failed': 0}
+        lock = threading.Lock()
+        start = time.monotonic()
+
+        def done(future):
+            with lock:
+                finished['ok' if future.result() else 'failed'] += 1
+                count = finished['ok'] + finished['failed']
+            if count % report_every == 0 or count == len(tasks):
+                elapsed = time.monotonic() - start
+                rate = count / elapsed if elapsed > 0 else 0.0
+                eta = (len(tasks) - count) / rate if rate > 0 else 0.0
+                report(f"Pre-warm {run_date}: {count}/{len(tasks)} ({finished['failed']} failed) "
+                       f"| {rate:.2f} tasks/s | ETA {int(eta)}s")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prewarm') as pool:
+            for i, (source, location) in enumerate(tasks):
+                delay = start + i * interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._work, run_date, source, location).add_done_callback(done)
+
+        return self.progress(run_date)
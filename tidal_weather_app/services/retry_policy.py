@@ -0,0 +1,247 @@
+"""
+Deadline-aware retries of upstream requests.
+
+A RetryPolicy bounds a call three ways: a number of attempts, an overall
+deadline that also caps the timeout of each attempt, and a retry budget
+shared by the whole process. Waits between attempts use full jitter
+(uniform between 0 and the exponential backoff), so clients that failed
+together do not retry together, and a Retry-After header from a 429 or 503
+answer is honoured when it fits in the deadline.
+
+Web requests use the interactive policy (RETRY_DEADLINE_INTERACTIVE, about
+1.5 s, so a page falls back quickly), bulk loads and pre-warm runs the batch
+policy (RETRY_DEADLINE_BATCH, with more attempts).
+
+The budget is a token bucket: every call adds RETRY_BUDGET_RATIO of a token,
+every retry takes one, and RETRY_BUDGET_MIN_PER_SECOND tokens trickle in so
+quiet periods can still retry. When a host fails for everyone, retries stop
+at that ratio of the traffic instead of multiplying it.
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+import config
+from services.circuit_breaker import CircuitOpenError, get_circuit_breakers, is_failure_status
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header.
+
+    Args:
+        value (str): Delay in seconds or an HTTP date
+
+    Returns:
+        float: Seconds from now, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryBudget:
+    """Token bucket limiting the retries of a process to a share of its calls."""
+
+    def __init__(self, ratio=None, min_per_second=None, burst=None):
+        """
+        Initialize the budget.
+
+        Args:
+            ratio (float, optional): Retries allowed per call
+            min_per_second (float, optional): Retries allowed per second whatever the traffic
+            burst (float, optional): Most retries that can be saved up
+        """
+        self.ratio = config.RETRY_BUDGET_RATIO if ratio is None else ratio
+        self.min_per_second = config.RETRY_BUDGET_MIN_PER_SECOND if min_per_second is None else min_per_second
+        self.burst = burst or config.RETRY_BUDGET_BURST
+        self.tokens = 0.0
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.retries = 0
+        self.denied = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.min_per_second)
+        self._refilled = now
+
+    def record_call(self):
+        """Deposit the share of a retry earned by a call."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+            self.calls += 1
+
+    def try_retry(self):
+        """Take a retry from the budget; False when it is spent."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+    def stats(self):
+        """Calls, retries and retries denied so far."""
+        with self._lock:
+            return {'calls': self.calls, 'retries': self.retries, 'denied': self.denied}
+
+
+class RetryPolicy:
+    """Attempts, deadline, backoff and budget of the retries of one kind of call."""
+
+    def __init__(self, deadline, max_attempts=None, backoff_factor=None, max_backoff=None, budget=None,
+                 name='custom'):
+        """
+        Initialize the policy.
+
+        Args:
+            deadline (float): Seconds a call may take, attempts and waits included
+            max_attempts (int, optional): Attempts per call (default: config.MAX_RETRIES)
+            backoff_factor (float, optional): Jitter ceiling of the first wait, doubled for each
+                                              following one (default: config.BACKOFF_FACTOR)
+            max_backoff (float, optional): Largest jitter ceiling
+            budget (RetryBudget, optional): Retry budget (default: the one shared by the process)
+            name (str): Name of the policy, for logging
+        """
+        self.deadline = deadline
+        self.max_attempts = max_attempts or config.MAX_RETRIES
+        self.backoff_factor = config.BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+        self.max_backoff = max_backoff or config.RETRY_MAX_BACKOFF
+        self.budget = budget or get_retry_budget()
+        self.name = name
+
+    @classmethod
+    def interactive(cls, **options):
+        """Policy for calls made while a user waits: fail within RETRY_DEADLINE_INTERACTIVE."""
+        options.setdefault('deadline', config.RETRY_DEADLINE_INTERACTIVE)
+        return cls(name='interactive', **options)
+
+    @classmethod
+    def batch(cls, **options):
+        """Policy for bulk loads and background jobs: more attempts within RETRY_DEADLINE_BATCH."""
+        options.setdefault('deadline', config.RETRY_DEADLINE_BATCH)
+        options.setdefault('max_attempts', config.RETRY_BATCH_MAX_RETRIES)
+        return cls(name='batch', **options)
+
+    def start(self):
+        """Start a call: count it in the budget and return its deadline on the monotonic clock."""
+        self.budget.record_call()
+        return time.monotonic() + self.deadline
+
+    def attempt_timeout(self, deadline, timeout):
+        """Timeout of the next attempt, cut to the time left before the deadline."""
+        return min(timeout, max(deadline - time.monotonic(), 0.0))
+
+    def next_delay(self, attempt, deadline, retry_after=None):
+        """
+        Decide whether to retry after a failed attempt, and when.
+
+        Args:
+            attempt (int): Number of the attempt that failed, from 1
+            deadline (float): Deadline of the call, from start()
+            retry_after (float, optional): Delay asked by the server
+
+        Returns:
+            float: Seconds to wait before the next attempt, or None to give up
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        # Waiting is only worth it if an attempt still has some time after the wait
+        if time.monotonic() + delay >= deadline:
+            logger.info(f"No retry: {delay:.2f} s wait would pass the {self.name} deadline")
+            return None
+        if not self.budget.try_retry():
+            logger.warning("No retry: the retry budget is spent")
+            return None
+        return delay
+
+    def execute(self, send, url, timeout=None):
+        """
+        Run a request with retries.
+
+        Server errors (5xx), rate limiting (429), connection errors and timeouts are
+        retried; other answers are returned as they are.
+
+        Args:
+            send (callable): Sends the request given the timeout of the attempt
+                             and returns a requests.Response
+            url (str): URL requested, for logging and its circuit breaker
+            timeout (float, optional): Timeout of one attempt (default: config.REQUEST_TIMEOUT)
+
+        Returns:
+            requests.Response: Response, or None if every attempt failed
+        """
+        timeout = timeout or config.REQUEST_TIMEOUT
+        deadline = self.start()
+        for attempt in range(1, self.max_attempts + 1):
+            attempt_timeout = self.attempt_timeout(deadline, timeout)
+            if attempt_timeout <= 0:
+                break
+            retry_after = None
+            try:
+                logger.info(f"Request attempt {attempt}/{self.max_attempts} for {url}")
+                response = send(attempt_timeout)
+                if not is_failure_status(response.status_code):
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                logger.warning(f"Server error {response.status_code} on attempt {attempt} for {url}")
+            except CircuitOpenError as e:
+                logger.info(f"Skipping {url}: {e}")
+                return None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                logger.warning(f"Request failed on attempt {attempt} for {url}: {e}")
+
+            # Waiting is pointless once these failures have opened the circuit of the host
+            if get_circuit_breakers().is_open(url):
+                logger.warning(f"Circuit open for {url}, not retrying")
+                return None
+            delay = self.next_delay(attempt, deadline, retry_after)
+            if delay is None:
+                break
+            logger.info(f"Waiting {delay:.2f} seconds before retry")
+            time.sleep(delay)
+
+        logger.error(f"All retry attempts failed for {url}")
+        return None
+
+
+# Retry budget shared by every policy of the process
+_budget = None
+_budget_lock = threading.Lock()
+
+def get_retry_budget():
+    """Get or create the shared retry budget."""
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = RetryBudget()
+    return _budget
@@ -0,0 +1,151 @@
+"""
+Stale-while-revalidate support for stored weather and tidal data.
+
+Pages are rendered from the most recent stored row whatever its age, and
+rows older than their freshness window are refreshed on a small background
+pool. Refreshes go through the single-flight group, so a key is fetched at
+most once at a time however many pages asked for it.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import config
+from services.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+
+def age_seconds(updated_at, now=None):
+    """
+    Get the age of a stored row.
+
+    Args:
+        updated_at (datetime or str): Last update time of the row (naive values are UTC)
+        now (datetime, optional): Reference time (default: now)
+
+    Returns:
+        float: Age in seconds, or None if the update time is unknown
+    """
+    if not updated_at:
+        return None
+    if isinstance(updated_at, str):
+        try:
+            updated_at = datetime.fromisoformat(updated_at)
+        except ValueError:
+            return None
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max((now - updated_at).total_seconds(), 0.0)
+
+
+def format_age(seconds):
+    """Format an age in seconds for display, e.g. '5 min' or '3 h'."""
+    if seconds is None:
+        return None
+    if seconds < 60:
+        return "less than a minute"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} h"
+    return f"{int(seconds // 86400)} d"
+
+
+def is_stale(row, day, max_age):
+    """
+    Check whether a stored row should be refreshed.
+
+    Args:
+        row: Stored WeatherData or TidalData row, or None
+        day (date): Date the page is showing
+        max_age (int): Freshness window in seconds
+
+    Returns:
+        bool: True if the row is missing, for another day or older than max_age
+    """
+    if row is None or row.date != day:
+        return True
+    age = age_seconds(row.updated_at)
+    return age is None or age > max_age
+
+
+class BackgroundRefresher:
+    """Run data refreshes off the request path, at most once per key at a time."""
+
+    def __init__(self, workers=None, single_flight=None):
+        """
+        Initialize the refresher.
+
+        Args:
+            workers (int, optional): Number of background refresh threads
+            single_flight (SingleFlight, optional): Group coalescing the refreshes
+        """
+        self.single_flight = single_flight or get_single_flight()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or config.SWR_REFRESH_WORKERS,
+            thread_name_prefix='refresh'
+        )
+        self._pending = set()
+        self._lock = threading.Lock()
+
+        self.scheduled = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def schedule(self, source, location_id, day, func):
+        """
+        Schedule a background refresh unless the same one is already queued or running.
+
+        Args:
+            source (str): Data source, e.g. 'weather' or 'tidal'
+            location_id (int): Location ID
+            day (date): Date of the data
+            func (callable): Fetches and stores the fresh data
+
+        Returns:
+            bool: True if a refresh was scheduled
+        """
+        key = self.single_flight.make_key(source, location_id, day)
+        with self._lock:
+            if key in self._pending:
+                self.skipped += 1
+                return False
+            self._pending.add(key)
+            self.scheduled += 1
+
+        self._executor.submit(self._run, key, source, location_id, day, func)
+        return True
+
+    def _run(self, key, source, location_id, day, func):
+        try:
+            self.single_flight.do(source, location_id, day, func)
+            logger.info(f"Refreshed {key} in the background")
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Background refresh of {key} failed: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self):
+        """
+        Get refresh statistics.
+
+        Returns:
+            dict: Refreshes scheduled, skipped as duplicates, failed and pending
+        """
+        with self._lock:
+            return {
+                'scheduled': self.scheduled,
+                'skipped': self.skipped,
+                'failed': self.failed,
+                'pending': len(self._pending),
+            }
+
+    def shutdown(self, wait=True):
+        """Stop the background threads, optionally waiting for running refreshes."""
+        self._executor.shutdown(wait=wait)
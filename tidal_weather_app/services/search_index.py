@@ -0,0 +1,111 @@
+"""
+Full-text search index over the cities catalog.
+
+City names are indexed in an external-content FTS5 table using the trigram
+tokenizer, so substring searches no longer scan the whole cities table.
+"""
+
+import logging
+import sqlite3
+
+import config
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'cities_fts'
+
+# FTS5 trigram tokens are three characters long, shorter queries use the name index
+MIN_TRIGRAM_LENGTH = 3
+
+
+def build_search_index(conn):
+    """
+    (Re)build the FTS5 trigram index over the cities table.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the cities database
+    """
+    conn.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    conn.execute(f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name,
+        content='cities',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+    """)
+    conn.execute(f"INSERT INTO {FTS_TABLE} (rowid, name) SELECT id, name FROM cities")
+    conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def has_search_index(conn):
+    """Return True if the FTS index exists in the database."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+    return row is not None
+
+
+def _order_clause(preferred_countries):
+    """ORDER BY ranking exact > prefix > substring, then preferred countries, then shorter names."""
+    country_boost = ''
+    if preferred_countries:
+        placeholders = ', '.join('?' for _ in preferred_countries)
+        country_boost = f"CASE WHEN c.country IN ({placeholders}) THEN 0 ELSE 1 END, "
+    return (
+        " ORDER BY CASE WHEN c.name = ? COLLATE NOCASE THEN 0"
+        " WHEN c.name LIKE ? ESCAPE '\\' THEN 1 ELSE 2 END, "
+        f"{country_boost}length(c.name), c.name LIMIT ?"
+    )
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_cities(conn, name, country=None, limit=10, preferred_countries=None):
+    """
+    Search cities by name, ranked by relevance.
+
+    Exact matches come first, then prefix matches, then substring matches;
+    within a tier cities from the preferred countries and shorter names win.
+
+    Args:
+        conn (sqlite3.Connection): Connection with sqlite3.Row as row factory
+        name (str): City name (or part of it) to search for
+        country (str, optional): Two-letter country code
+        limit (int): Maximum number of results to return
+        preferred_countries (tuple, optional): Country codes boosted in the ranking
+
+    Returns:
+        list: List of matching cities as dictionaries
+    """
+    name = name.strip()
+    if not name:
+        return []
+    if preferred_countries is None:
+        preferred_countries = config.SEARCH_PREFERRED_COUNTRIES
+    preferred_countries = tuple(code.upper() for code in preferred_countries)
+
+    if len(name) < MIN_TRIGRAM_LENGTH:
+        # Too short for trigrams: a range scan on idx_city_name serves the prefix
+        prefix = name[:1].upper() + name[1:].lower()
+        query = "SELECT c.* FROM cities c WHERE c.name >= ? AND c.name < ?"
+        params = [prefix, prefix + '\U0010ffff']
+    elif has_search_index(conn):
+        query = f"SELECT c.* FROM {FTS_TABLE} f JOIN cities c ON c.id = f.rowid WHERE {FTS_TABLE} MATCH ?"
+        params = ['"' + name.replace('"', '""') + '"']
+    else:
+        logger.warning("Search index missing, falling back to a full table scan")
+        query = "SELECT c.* FROM cities c WHERE c.name LIKE ? ESCAPE '\\'"
+        params = [f"%{_escape_like(name)}%"]
+
+    if country:
+        query += " AND c.country = ?"
+        params.append(country.upper())
+
+    query += _order_clause(preferred_countries)
+    params += [name, f"{_escape_like(name)}%", *preferred_countries, int(limit)]
+
+    cursor = conn.execute(query, params)
+    return [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,202 @@
+"""
+Single-flight coalescing of upstream fetches.
+
+Concurrent callers asking for the same (source, location_id, date) share one
+in-flight call: the first caller runs it and the others wait for its result.
+Threads of a process are coalesced with an in-memory table of flights; when
+the database lock is enabled, processes are coalesced through a row in the
+fetch_locks table of the shared cache database.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import config
+from database.connection import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """A call in progress and the outcome shared with its waiters."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its result."""
+
+    def __init__(self, db_path=None, use_db_lock=None, lock_ttl=None, wait_timeout=None, poll_interval=0.1):
+        """
+        Initialize the single-flight group.
+
+        Args:
+            db_path (str, optional): SQLite database holding the cross-process locks
+            use_db_lock (bool, optional): Also coalesce across processes
+            lock_ttl (int, optional): Seconds after which a lock left by a crashed process is ignored
+            wait_timeout (int, optional): Maximum seconds a caller waits for another one's call
+            poll_interval (float): Seconds between two checks of a lock held by another process
+        """
+        self.db_path = str(db_path or config.CACHE_DB_PATH)
+        self.use_db_lock = config.SINGLE_FLIGHT_DB_LOCK if use_db_lock is None else use_db_lock
+        self.lock_ttl = lock_ttl or config.SINGLE_FLIGHT_LOCK_TTL
+        self.wait_timeout = wait_timeout or config.SINGLE_FLIGHT_WAIT_TIMEOUT
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._flights = {}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.coalesced = 0
+        self.remote_waits = 0
+
+        self._db = None
+        if self.use_db_lock:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._db = get_connection_manager(self.db_path)
+            with self._db.transaction() as conn:
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS fetch_locks (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """)
+
+    @staticmethod
+    def make_key(source, location_id, day):
+        """Build the flight key of a fetch, e.g. 'weather:42:2024-06-01'."""
+        day = day.isoformat() if hasattr(day, 'isoformat') else day
+        return f"{source}:{location_id}:{day}"
+
+    def _connect(self):
+        return self._db.connection()
+
+    def _try_db_lock(self, key):
+        """Take the database lock of a key, replacing it if its holder let it expire."""
+        now = time.time()
+        cursor = self._connect().execute(
+            """INSERT INTO fetch_locks (key, owner, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+               WHERE fetch_locks.expires_at < ?""",
+            (key, self.owner, now + self.lock_ttl, now)
+        )
+        return cursor.rowcount == 1
+
+    def _release_db_lock(self, key):
+        try:
+            self._connect().execute(
+                "DELETE FROM fetch_locks WHERE key = ? AND owner = ?", (key, self.owner)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not release fetch lock {key}: {e}")
+
+    def _run_with_db_lock(self, key, func):
+        """
+        Run func while holding the database lock of the key.
+
+        When another process holds it, wait until it is released and run func
+        afterwards, so func should first look for the result stored by that process.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while not self._try_db_lock(key):
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Timed out waiting for fetch lock {key}, fetching anyway")
+                    return func()
+                self.remote_waits += 1
+                time.sleep(self.poll_interval)
+        except sqlite3.Error as e:
+            logger.warning(f"Fetch lock unavailable for {key}: {e}")
+            return func()
+
+        try:
+            return func()
+        finally:
+            self._release_db_lock(key)
+
+    def do(self, source, location_id, day, func):
+        """
+        Run func once for all concurrent callers with the same key.
+
+        Args:
+            source (str): Data source, e.g. 'weather' or 'tidal'
+            location_id (int): Location ID
+            day (date): Date of the data
+            func (callable): Fetch to run; it should return an existing result when there is one
+
+        Returns:
+            The result of func, shared by every caller that waited on it
+        """
+        key = self.make_key(source, location_id, day)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                logger.warning(f"Timed out waiting for in-flight fetch {key}, fetching anyway")
+                return func()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            if self.use_db_lock:
+                flight.result = self._run_with_db_lock(key, func)
+            else:
+                flight.result = func()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.waiters:
+                logger.info(f"Shared fetch {key} with {flight.waiters} waiting callers")
+
+    def stats(self):
+        """
+        Get flight statistics.
+
+        Returns:
+            dict: Calls run, callers coalesced onto them, lock polls and flights in progress
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'remote_waits': self.remote_waits,
+                'in_flight': len(self._flights),
+            }
+
+
+# Shared single-flight group
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight():
+    """Get or create the shared single-flight group."""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,213 @@
+"""
+Nearest-city spatial index over the cities catalog.
+
+Cities are bucketed into a regular latitude/longitude grid held in NumPy
+arrays (sorted by cell, with per-cell offsets). A query scans rings of cells
+around the point, ranks candidates by chord distance between unit vectors
+(same order as great-circle distance, without trigonometry) until the k best
+are provably closer than anything outside the scanned area, and re-ranks
+those with the haversine formula.
+"""
+
+import logging
+import math
+import sqlite3
+import time
+
+import numpy as np
+
+import config
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km, vectorized over NumPy arrays (inputs in degrees)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _unit_vectors(latitude, longitude):
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    cos_lat = np.cos(lat)
+    return cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)
+
+
+class CitySpatialIndex:
+    """Grid index answering nearest(lat, lon, k) over all cities."""
+
+    def __init__(self, db_path=None, cell_degrees=None):
+        """
+        Initialize the spatial index.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database file
+            cell_degrees (float, optional): Size of a grid cell in degrees
+        """
+        self.db_path = db_path or config.DB_PATH
+        self.cell_degrees = cell_degrees or config.SPATIAL_CELL_DEGREES
+        self.n_lat = int(math.ceil(180.0 / self.cell_degrees))
+        self.n_lon = int(math.ceil(360.0 / self.cell_degrees))
+        self.loaded = False
+
+    def _cell_coords(self, latitude, longitude):
+        lat_idx = np.clip(((latitude + 90.0) / self.cell_degrees).astype(np.int64), 0, self.n_lat - 1)
+        lon_idx = np.clip(((longitude + 180.0) / self.cell_degrees).astype(np.int64), 0, self.n_lon - 1)
+        return lat_idx, lon_idx
+
+    def load(self):
+        """
+        Load city coordinates from the cities table and build the grid.
+
+        Returns:
+            bool: True if the index is loaded
+        """
+        start = time.perf_counter()
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                rows = conn.execute(
+                    "SELECT id, name, country, latitude, longitude FROM cities"
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not load spatial index: {e}")
+            return self.loaded
+
+        self.build(rows)
+        duration = int((time.perf_counter() - start) * 1000)
+        logger.info(f"Loaded spatial index: {len(rows)} cities in {duration} ms")
+        return True
+
+    def build(self, rows):
+        """
+        Build the grid from (id, name, country, latitude, longitude) rows.
+
+        Args:
+            rows (list): City rows
+        """
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        latitudes = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+        longitudes = np.fromiter((row[4] for row in rows), dtype=np.float64, count=len(rows))
+
+        lat_idx, lon_idx = self._cell_coords(latitudes, longitudes)
+        cells = lat_idx * self.n_lon + lon_idx
+        order = np.argsort(cells, kind='stable')
+
+        # offsets[c]:offsets[c + 1] is the slice of the sorted arrays that falls in cell c
+        counts = np.bincount(cells, minlength=self.n_lat * self.n_lon)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.ids = ids[order]
+        self.latitudes = latitudes[order]
+        self.longitudes = longitudes[order]
+        self.x, self.y, self.z = _unit_vectors(self.latitudes, self.longitudes)
+        self.names = [rows[i][1] for i in order]
+        self.countries = [rows[i][2] for i in order]
+        self.loaded = True
+
+    def _ring_candidates(self, lat_idx, lon_idx, radius):
+        """Indices of every city within radius cells of (lat_idx, lon_idx)."""
+        lat_lo = max(lat_idx - radius, 0)
+        lat_hi = min(lat_idx + radius, self.n_lat - 1)
+        if 2 * radius + 1 >= self.n_lon:
+            lon_ranges = [(0, self.n_lon - 1)]
+        else:
+            lo, hi = lon_idx - radius, lon_idx + radius
+            if lo < 0:
+                lon_ranges = [(lo + self.n_lon, self.n_lon - 1), (0, hi)]
+            elif hi >= self.n_lon:
+                lon_ranges = [(lo, self.n_lon - 1), (0, hi - self.n_lon)]
+            else:
+                lon_ranges = [(lo, hi)]
+
+        # Cells of one latitude row with consecutive longitudes are contiguous in the arrays,
+        # so each (row, longitude range) pair is a single [start, end) slice
+        bases = np.arange(lat_lo, lat_hi + 1, dtype=np.int64) * self.n_lon
+        starts = np.concatenate([self.offsets[bases + lo] for lo, _ in lon_ranges])
+        ends = np.concatenate([self.offsets[bases + hi + 1] for _, hi in lon_ranges])
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # Expand the slices without a Python loop: each run restarts at its own start offset
+        run_starts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return np.arange(total, dtype=np.int64) + run_starts
+
+    def _covered_km(self, latitude, longitude, lat_idx, lon_idx, radius):
+        """Lower bound of the distance from the point to any city outside the scanned cells."""
+        cell = self.cell_degrees
+        bounds = []
+
+        lat_lo = (lat_idx - radius) * cell - 90.0
+        lat_hi = (lat_idx + radius + 1) * cell - 90.0
+        if lat_lo > -90.0:
+            bounds.append((latitude - lat_lo) * KM_PER_DEGREE)
+        if lat_hi < 90.0:
+            bounds.append((lat_hi - latitude) * KM_PER_DEGREE)
+
+        if 2 * radius + 1 < self.n_lon:
+            lon_lo = (lon_idx - radius) * cell - 180.0
+            lon_hi = (lon_idx + radius + 1) * cell - 180.0
+            # A degree of longitude is shortest at the highest latitude covered
+            max_abs_lat = min(max(abs(lat_lo), abs(lat_hi)), 90.0)
+            lon_km = KM_PER_DEGREE * math.cos(math.radians(max_abs_lat))
+            bounds.append(min(longitude - lon_lo, lon_hi - longitude) * lon_km)
+
+        return min(bounds) if bounds else math.inf
+
+    def nearest(self, latitude, longitude, k=1):
+        """
+        Find the k cities closest to a point.
+
+        Args:
+            latitude (float): Latitude in degrees
+            longitude (float): Longitude in degrees
+            k (int): Number of cities to return
+
+        Returns:
+            list: Cities (id, name, country, latitude, longitude, distance_km), closest first
+        """
+        if not self.loaded or k <= 0 or len(self.ids) == 0:
+            return []
+        k = min(k, len(self.ids))
+
+        lat_idx, lon_idx = (int(v) for v in self._cell_coords(np.float64(latitude), np.float64(longitude)))
+        qx, qy, qz = _unit_vectors(latitude, longitude)
+        max_radius = max(self.n_lat, self.n_lon)
+        radius = 1
+        while True:
+            candidates = self._ring_candidates(lat_idx, lon_idx, radius)
+            if len(candidates) >= k:
+                # Squared chord length between unit vectors, monotonic in great-circle distance
+                chord2 = ((self.x[candidates] - qx) ** 2 + (self.y[candidates] - qy) ** 2
+                          + (self.z[candidates] - qz) ** 2)
+                best = np.argpartition(chord2, k - 1)[:k]
+                covered_km = self._covered_km(latitude, longitude, lat_idx, lon_idx, radius)
+                covered_chord = 2.0 * math.sin(min(covered_km / (2.0 * EARTH_RADIUS_KM), math.pi / 2))
+                if chord2[best].max() <= covered_chord ** 2 or radius >= max_radius:
+                    break
+            elif radius >= max_radius:
+                return []
+            # Widen quickly: the covered distance grows linearly with the radius
+            radius *= 2
+
+        rows = candidates[best]
+        distances = haversine_km(latitude, longitude, self.latitudes[rows], self.longitudes[rows])
+        ranked = np.argsort(distances)
+        return [
+            {
+                'id': int(self.ids[rows[j]]),
+                'name': self.names[rows[j]],
+                'country': self.countries[rows[j]],
+                'latitude': float(self.latitudes[rows[j]]),
+                'longitude': float(self.longitudes[rows[j]]),
+                'distance_km': round(float(distances[j]), 3),
+            }
+            for j in ranked
+        ]
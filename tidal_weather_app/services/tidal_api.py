@@ -1,10 +1,14 @@
 import os
-import requests
 import logging
 from datetime import date, datetime, timedelta
+import config
+from services import astronomy
 from services.cache import get_cached_data, cache_data
+from services.circuit_breaker import get_negative_cache
+from services.marine_store import MARINE_VARIABLES, RESOLUTIONS, get_marine_store
+from services.tide_prediction import get_tide_predictor
 from services.tidal_scraper import TidalScraperService
-import requests
+from services.http_client import get_http_client
 import math
 from datetime import datetime
 
@@ -14,11 +18,15 @@ class TidalAPIService:
     """Service for fetching tidal data from WorldTides API."""
     
 
-    def __init__(self):  
+    def __init__(self, spatial_index=None):
         logger.info("Initializing TidalAPIService with web scraping")
         self.scraper = TidalScraperService()
+        self.spatial_index = spatial_index
+        self.http = get_http_client()
+        self.failed_fetches = get_negative_cache()
+        self.predictor = get_tide_predictor() if config.TIDE_PREDICTION_ENABLED else None
 
-    def get_tidal_data(self, latitude, longitude, location_id, city_name=None):
+    def get_tidal_data(self, latitude, longitude, location_id, city_name=None, day=None, fallback=True):
         """
         Fetch tidal data for a specific location.
         
@@ -27,37 +35,151 @@ class TidalAPIService:
             longitude (float): Location longitude
             location_id (int): Location ID for caching
             city_name (str, optional): City name for scraping
+            day (date, optional): Day of the tides (default: today)
+            fallback (bool): Return mock data when no tides are found, instead of None
             
         Returns:
-            dict: Tidal data
+            dict: Tidal data, mock data (flagged 'mock') if none is found and fallback is set, or None
         """
-        cache_key = f"tidal_{location_id}_{date.today().isoformat()}"
-        cached_data = get_cached_data(cache_key)
+        day = day or date.today()
+        tidal_data = self._known_tidal_data(latitude, longitude, location_id, day)
+        if tidal_data:
+            return tidal_data
         
-        if cached_data:
-            logger.info(f"Using cached tidal data for location {location_id}")
-            return cached_data
+        city_name = self._station_city(latitude, longitude, location_id, city_name)
         
         # If city_name is provided, try to scrape data
         if city_name:
             logger.info(f"Attempting to scrape tidal data for {city_name}")
-            scraped_data = self.scraper.get_tidal_data_by_city(city_name, location_id)
+            scraped_data = self.scraper.get_tidal_data_by_city(city_name, location_id, day)
             if scraped_data:
                 return scraped_data
         
+        if not fallback:
+            logger.warning(f"Could not scrape tidal data for location {location_id}")
+            return None
         # Fall back to mock data if scraping fails or city_name not provided
         logger.warning(f"Could not scrape tidal data for location {location_id}, using mock data")
-        return self.get_mock_tidal_data()
+        return self.get_mock_tidal_data(day)
 
-    def get_mock_tidal_data(self):
+    async def get_tidal_data_async(self, service, latitude, longitude, location_id, city_name=None, day=None,
+                                   fallback=True):
+        """
+        Fetch tidal data like get_tidal_data, scraping the station page with an async service.
+        
+        Args:
+            service (AsyncWeatherService): Service scraping the station page
+            latitude (float): Location latitude
+            longitude (float): Location longitude
+            location_id (int): Location ID for caching
+            city_name (str, optional): City name for scraping
+            day (date, optional): Day of the tides (default: today)
+            fallback (bool): Return mock data when no tides are found, instead of None
+            
+        Returns:
+            dict: Tidal data, mock data (flagged 'mock') if none is found and fallback is set, or None
         """
-        Returns mock tidal data.
+        day = day or date.today()
+        tidal_data = self._known_tidal_data(latitude, longitude, location_id, day)
+        if tidal_data:
+            return tidal_data
+        
+        city_name = self._station_city(latitude, longitude, location_id, city_name)
+        if city_name:
+            logger.info(f"Attempting to scrape tidal data for {city_name}")
+            scraped_data = await service.get_tidal_data_by_city(city_name, location_id, day)
+            if scraped_data:
+                return scraped_data
+        
+        if not fallback:
+            logger.warning(f"Could not scrape tidal data for location {location_id}")
+            return None
+        logger.warning(f"Could not scrape tidal data for location {location_id}, using mock data")
+        return self.get_mock_tidal_data(day)
+
+    def _known_tidal_data(self, latitude, longitude, location_id, day):
+        """Tidal data of a day available without scraping: cached, or predicted from a nearby station."""
+        cached_data = get_cached_data(f"tidal_{location_id}_{day.isoformat()}")
+        # Mock data is cached too, and is not known tides
+        if cached_data and not cached_data.get('mock'):
+            logger.info(f"Using cached tidal data for location {location_id}")
+            return cached_data
+        
+        predicted = self.predict_days(latitude, longitude, day)
+        if predicted:
+            return predicted[day.isoformat()]
+        return None
+
+    def _station_city(self, latitude, longitude, location_id, city_name=None):
+        """Name of the city whose tide station page is scraped for a location."""
+        # Without a city name, scrape the page of the closest known city
+        if not city_name and self.spatial_index is not None and self.spatial_index.loaded:
+            nearest = self.spatial_index.nearest(latitude, longitude, 1)
+            if nearest:
+                city_name = nearest[0]['name']
+                logger.info(f"Using nearest city {city_name} ({nearest[0]['distance_km']} km) for location {location_id}")
+        return city_name
+
+    def predict_days(self, latitude, longitude, day, days=1):
+        """
+        Predict tides from the harmonic constituents of the nearest tide station.
+        
+        Args:
+            latitude (float): Location latitude
+            longitude (float): Location longitude
+            day (date): First day
+            days (int): Number of days
+            
+        Returns:
+            dict: Tidal data keyed by ISO date, or None without a station within TIDE_STATION_MAX_KM
+        """
+        if self.predictor is None:
+            return None
+        try:
+            station = self.predictor.stations.nearest(latitude, longitude, config.TIDE_STATION_MAX_KM)
+            if not station:
+                return None
+            logger.info(f"Predicting tides from station {station[0]} ({station[1]:.1f} km)")
+            return self.predictor.daily_tides(station[0], day, days)
+        except Exception as e:
+            logger.error(f"Error predicting tides at {latitude}, {longitude}: {str(e)}")
+            return None
+
+    def get_tidal_week(self, latitude, longitude, location_id, city_name=None, day=None):
+        """
+        Fetch every day of tides listed on the station page of a location.
+        
+        Args:
+            latitude (float): Location latitude
+            longitude (float): Location longitude
+            location_id (int): Location ID
+            city_name (str, optional): City name for scraping
+            day (date, optional): First day wanted (default: today)
+            
+        Returns:
+            dict: Tidal data keyed by ISO date from day on, empty if the page could not be scraped
+        """
+        day = day or date.today()
+        predicted = self.predict_days(latitude, longitude, day, 7)
+        if predicted:
+            return predicted
+        city_name = self._station_city(latitude, longitude, location_id, city_name)
+        if not city_name:
+            return {}
+        week = self.scraper.get_tide_week(city_name, day) or {}
+        return {tide_day: data for tide_day, data in sorted(week.items()) if tide_day >= day.isoformat()}
+
+    def get_mock_tidal_data(self, day=None):
+        """
+        Returns mock tidal data, with the astronomical coefficient of the day, flagged with 'mock'.
         """
         # Mock tidal data for demonstration purposes
         logger.info("Returning mock tidal data")
+        day = day or date.today()
+        coefficient = self.calculate_tidal_coefficient(day)
         tidal_data = {
             "location_id": 1,
-            "date": date.today().isoformat(),
+            "date": day.isoformat(),
             "high_tides": [
                 {"time": "06:00", "height": 2.5},
                 {"time": "18:00", "height": 2.7}
@@ -66,62 +188,78 @@ class TidalAPIService:
                 {"time": "12:00", "height": 0.5},
                 {"time": "00:00", "height": 0.3}
             ],
-            "tidal_coefficient": 80
+            "coefficient": coefficient,
+            "tidal_coefficient": coefficient,
+            "mock": True
         }
-        cache_data(f"tidal_{tidal_data['location_id']}_{date.today().isoformat()}", tidal_data)
+        cache_data(f"tidal_{tidal_data['location_id']}_{day.isoformat()}", tidal_data)
         return tidal_data
 
-    def calculate_tidal_coefficient(self, sun_distance, moon_distance):
+    def calculate_tidal_coefficient(self, day=None, longitude=None):
         """
-        Calculate the tidal coefficient based on the distances of the Sun and Moon from Earth.
-        
-        :param sun_distance: Distance from Earth to the Sun in kilometers
-        :param moon_distance: Distance from Earth to the Moon in kilometers
-        :return: Tidal coefficient
-        """
-        # Constants
-        sun_radius = 696340  # Radius of the Sun in kilometers
-        moon_radius = 1737  # Radius of the Moon in kilometers
-        earth_radius = 6371  # Radius of the Earth in kilometers
+        Calculate the tidal coefficient of a day from the positions and distances of the Sun and Moon.
         
-        # Tidal forces
-        sun_tidal_force = (sun_radius / sun_distance) ** 3
-        moon_tidal_force = (moon_radius / moon_distance) ** 3
-        
-        # Tidal coefficient
-        tidal_coefficient = (sun_tidal_force + moon_tidal_force) * 100
-        
-        return min(tidal_coefficient, 120)
-
-        # Example usage
-        sun_distance = 149.6e6  # Average distance from Earth to the Sun in kilometers
-        moon_distance = 384400  # Average distance from Earth to the Moon in kilometers
-
-        tidal_coefficient = calculate_tidal_coefficient(sun_distance, moon_distance)
-        print(f"Tidal Coefficient: {tidal_coefficient}")
+        :param day: Day of the coefficient (default: today)
+        :param longitude: Longitude of the location (default: the reference port, Brest)
+        :return: Tidal coefficient between 20 and 120
+        """
+        return astronomy.coefficient_for_day(day, longitude)
 
-    def fetch_marine_weather_data(self, latitude, longitude):
+    def fetch_marine_weather_data(self, latitude, longitude, location_id=None):
         """
         Fetch marine weather data from the Open-Meteo API.
         
         :param latitude: Latitude of the location
         :param longitude: Longitude of the location
-        :return: Weather data as a dictionary
+        :param location_id: Location whose hourly series are stored in the marine store, if given
+        :return: Weather data as a dictionary, or None if the fetch failed
         """
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&hourly=temperature_2m,relativehumidity_2m,wind_speed_10m,wind_direction_10m,pressure_msl,precipitation,cloudcover,wave_height,wave_direction"
+        url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&hourly={','.join(MARINE_VARIABLES)}"
+        if ('marine', (latitude, longitude)) in self.failed_fetches:
+            return None
         
-        response = requests.get(url)
+        try:
+            response = self.http.get(url)
+        except Exception as e:
+            logger.error(f"Error fetching marine weather data for {latitude}, {longitude}: {str(e)}")
+            self.failed_fetches.add('marine', (latitude, longitude))
+            return None
         if response.status_code == 200:
-            return response.json()
+            weather_data = response.json()
+            if location_id is not None:
+                try:
+                    stored = get_marine_store().store_open_meteo(location_id, weather_data)
+                    logger.info(f"Stored {stored} marine series days for location {location_id}")
+                except Exception as e:
+                    logger.error(f"Error storing marine data for location {location_id}: {str(e)}")
+            return weather_data
         else:
+            self.failed_fetches.add('marine', (latitude, longitude))
             return None
 
-        # Example usage
-        latitude = 48.8566  # Paris, France
-        longitude = 2.3522  # Paris, France
-
-        weather_data = fetch_marine_weather_data(latitude, longitude)
-        if weather_data:
-            return weather_data
-        else:
-            print("Failed to fetch weather data.")
+    def get_marine_series(self, location_id, start, end=None, variables=None, resolution='1h',
+                          latitude=None, longitude=None):
+        """
+        Read the stored hourly marine series of a location.
+        
+        When nothing is stored for a period reaching into the forecast window and the
+        coordinates are given, the forecast is fetched and stored first.
+        
+        :param location_id: Location ID
+        :param start: First day
+        :param end: Last day, included (default: a week from start)
+        :param variables: Variables to read (default: all stored)
+        :param resolution: '1h', '3h' or 'daily' (min/max/mean)
+        :param latitude: Latitude of the location, to fetch a missing forecast
+        :param longitude: Longitude of the location, to fetch a missing forecast
+        :return: Dict of 'time' and one array per variable, see MarineStore.query
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}, expected one of {', '.join(RESOLUTIONS)}")
+        store = get_marine_store()
+        end = end or start + timedelta(days=6)
+        today = date.today()
+        if (latitude is not None and longitude is not None and start <= today + timedelta(days=6)
+                and end >= today and not store.stored_days(location_id, start, end)):
+            self.fetch_marine_weather_data(latitude, longitude, location_id)
+        return store.query(location_id, start, end, variables, resolution)
@@ -2,14 +2,19 @@
 """
 Service for scraping tidal data from WorldTides.info website.
 This provides an alternative to the API when an API key is not available.
+
+A station page lists the tides of the coming week. The page is parsed once
+into a per-day series and the whole week is cached per station, so a single
+scrape serves every day it covers.
 """
 
-import requests
-from bs4 import BeautifulSoup
 import logging
-from datetime import datetime
-import re
+from datetime import date
+import config
+from services import astronomy, html_extract
 from services.cache import get_cached_data, cache_data
+from services.circuit_breaker import get_negative_cache
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +24,8 @@ class TidalScraperService:
     BASE_URL = "https://www.worldtides.info/tidestations/Europe/France"
     
     def __init__(self):
-        self.session = requests.Session()
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-        }
+        self.http = get_http_client()
+        self.failed_fetches = get_negative_cache()
     
     def format_city_name(self, city_name):
         """
@@ -30,7 +33,7 @@ class TidalScraperService:
         
         Args:
             city_name (str): City name
-            
+        
         Returns:
             str: Formatted city name for URL
         """
@@ -38,98 +41,171 @@ class TidalScraperService:
         formatted = city_name.replace(' ', '_').replace('-', '_').replace("'", '_')
         return formatted
     
-    def get_tidal_data_by_city(self, city_name, location_id):
+    def station_url(self, city_name):
+        """URL of the tide station page of a city."""
+        return f"{self.BASE_URL}/{self.format_city_name(city_name)}"
+    
+    def week_cache_key(self, city_name):
+        """Cache key of the tide table of a station, shared by every location using it."""
+        return f"tide_table_{self.format_city_name(city_name)}"
+    
+    def get_cached_week(self, city_name, day=None):
         """
-        Fetch tidal data for a specific city by scraping the website.
+        Get the cached tide table of a station if it covers a day.
         
         Args:
             city_name (str): City name
-            location_id (int): Location ID for caching
-            
+            day (date, optional): Day that must be covered (default: today)
+        
         Returns:
-            dict: Tidal data
+            dict: Daily tidal data keyed by ISO date, or None
+        """
+        day = day or date.today()
+        week = get_cached_data(self.week_cache_key(city_name))
+        if week and day.isoformat() in week:
+            return week
+        return None
+    
+    def store_week(self, city_name, html_content):
         """
-        cache_key = f"tidal_scrape_{location_id}_{datetime.now().strftime('%Y-%m-%d')}"
-        cached_data = get_cached_data(cache_key)
+        Parse a station page fetched now and cache its tide table.
+        
+        The page lists the tides from today on, so a first table whose heading has
+        no readable date is today's, whatever day the caller is after; dating it
+        by that day would shift the whole cached week.
         
-        if cached_data:
-            logger.info(f"Using cached tidal data for location {location_id}")
-            return cached_data
+        Args:
+            city_name (str): City name
+            html_content (str): HTML content of the station page
+        
+        Returns:
+            dict: Daily tidal data keyed by ISO date, or None if the page has no tide table
+        """
+        week = self.parse_tide_week(html_content, city_name)
+        if week:
+            cache_data(self.week_cache_key(city_name), week, config.TIDE_TABLE_CACHE_TTL)
+        return week
+    
+    def get_tide_week(self, city_name, day=None):
+        """
+        Get the tide table of a station, scraping its page unless it is cached.
+        
+        Args:
+            city_name (str): City name
+            day (date, optional): Day that must be covered (default: today)
+        
+        Returns:
+            dict: Daily tidal data keyed by ISO date, or None if failed
+        """
+        day = day or date.today()
+        week = self.get_cached_week(city_name, day)
+        if week:
+            logger.info(f"Using cached tide table for {city_name}")
+            return week
+        if ('tide_page', city_name) in self.failed_fetches:
+            logger.debug(f"Tide page of {city_name} failed recently, skipping it")
+            return None
         
         try:
-            formatted_city = self.format_city_name(city_name)
-            url = f"{self.BASE_URL}/{formatted_city}"
-            
+            url = self.station_url(city_name)
             logger.info(f"Scraping tidal data from {url}")
-            response = self.session.get(url, headers=self.headers, timeout=10)
+            response = self.http.get(url)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract date
-            date_text = soup.find('div', string=re.compile(r'Tide Times for'))
-            if not date_text:
-                logger.error(f"Could not find date information for {city_name}")
-                return None
-            
-            # Extract tide data from table
-            tide_table = soup.find('table', {'class': 'table-bordered'})
-            if not tide_table:
-                logger.error(f"Could not find tide table for {city_name}")
-                return None
-            
-            rows = soup.find_all('tr')[1:]  # Skip header row
-            
-            high_tides = []
-            low_tides = []
-            
-            for row in rows:
-                columns = soup.find_all('td')
-                if len(columns) >= 3:
-                    tide_type = columns[0].text.strip()
-                    tide_time = columns[1].text.strip()
-                    tide_height = columns[2].text.strip()
-                    
-                    if 'High Tide' in tide_type:
-                        high_tides.append((tide_time, tide_height))
-                    elif 'Low Tide' in tide_type:
-                        low_tides.append((tide_time, tide_height))
-            
-            # Calculate tidal coefficient (simplified approach)
-            # Extract heights from the tide_height strings
-            heights = []
-            for _, height_str in high_tides + low_tides:
-                # Extract numeric height in meters
-                match = re.search(r'(\d+\.\d+) m', height_str)
-                if match:
-                    heights.append(float(match.group(1)))
-            
-            if heights:
-                min_height = min(heights)
-                max_height = max(heights)
-                height_range = max_height - min_height
-                
-                # Scale to a coefficient between 20 and 120 (common tidal coefficient range)
-                coefficient = int(20 + (height_range * 100 / 10))  # Assuming max range is about 10m
-                coefficient = min(120, max(20, coefficient))
-            else:
-                coefficient = 57  # Default value
-            
-            # Get the first high and low tide of the day
-            high_tide_time = high_tides[0][0] if high_tides else 'N/A'
-            low_tide_time = low_tides[0][0] if low_tides else 'N/A'
-            
-            tidal_data = {
-                'coefficient': coefficient,
-                'high_tide_time': high_tide_time,
-                'low_tide_time': low_tide_time
-            }
-            
-            # Cache the data
-            cache_data(cache_key, tidal_data, 3600 * 6)  # Cache for 6 hours
-            
-            return tidal_data
-            
+            return self.store_week(city_name, response.text)
+        
         except Exception as e:
             logger.error(f"Error scraping tidal data for {city_name}: {str(e)}")
+            self.failed_fetches.add('tide_page', city_name)
+            return None
+    
+    def get_tidal_data_by_city(self, city_name, location_id, day=None):
+        """
+        Fetch tidal data for a specific city by scraping the website.
+        
+        Args:
+            city_name (str): City name
+            location_id (int): Location ID, for logging
+            day (date, optional): Day of the tides (default: today)
+        
+        Returns:
+            dict: Tidal data or None if the page has no tides for the day
+        """
+        day = day or date.today()
+        week = self.get_tide_week(city_name, day)
+        if not week:
             return None
+        tidal_data = week.get(day.isoformat())
+        if not tidal_data:
+            logger.warning(f"Tide table of {city_name} has no tides on {day} for location {location_id}")
+        return tidal_data
+    
+    @staticmethod
+    def summarize_day(tides, coefficient=None):
+        """
+        Summarize the tides of one day.
+        
+        Args:
+            tides (list): Tides of the day as returned by html_extract.extract_tide_table
+            coefficient (int, optional): Tidal coefficient of the day (default: computed from
+                the positions of the sun and moon on the day of the tides)
+        
+        Returns:
+            dict: Tidal coefficient, first high and low tide times, and every tide of the day
+        """
+        high_tides = [(tide['time'], tide['height']) for tide in tides if tide['type'] == 'high']
+        low_tides = [(tide['time'], tide['height']) for tide in tides if tide['type'] == 'low']
+        
+        # The page lists heights only, whose range depends on the station; the coefficient is astronomical
+        if coefficient is None:
+            coefficient = int(astronomy.daily_coefficients([tides[0]['date']])[0])
+        
+        return {
+            'coefficient': coefficient,
+            'high_tide_time': high_tides[0][0] if high_tides else 'N/A',
+            'low_tide_time': low_tides[0][0] if low_tides else 'N/A',
+            'high_tides': high_tides,
+            'low_tides': low_tides
+        }
+    
+    def parse_tide_week(self, html_content, city_name, start_day=None):
+        """
+        Extract the tides of every day listed on a tide station page.
+        
+        Args:
+            html_content (str): HTML content of the station page
+            city_name (str): City name, for logging
+            start_day (date, optional): Day of the first table when its heading has no date,
+                                        the day the page was fetched (default: today)
+        
+        Returns:
+            dict: Daily tidal data keyed by ISO date, or None if the page has no tide table
+        """
+        tides = html_extract.extract_tide_table(html_content, start_day)
+        if not tides:
+            logger.error(f"Could not find tide table for {city_name}")
+            return None
+        
+        days = {}
+        for tide in tides:
+            days.setdefault(tide['date'], []).append(tide)
+        coefficients = astronomy.daily_coefficients(list(days)).tolist()
+        return {
+            tide_day: self.summarize_day(day_tides, coefficient)
+            for (tide_day, day_tides), coefficient in zip(days.items(), coefficients)
+        }
+    
+    def parse_tide_page(self, html_content, city_name, day=None):
+        """
+        Extract the tides of one day from a tide station page.
+        
+        Args:
+            html_content (str): HTML content of the station page
+            city_name (str): City name, for logging
+            day (date, optional): Day of the tides (default: today)
+        
+        Returns:
+            dict: Tidal data or None if the page has no tides for the day
+        """
+        day = day or date.today()
+        week = self.parse_tide_week(html_content, city_name)
+        return week.get(day.isoformat()) if week else None
@@ -0,0 +1,616 @@
+"""
+Offline tide prediction from harmonic constituents.
+
+The water level at a station is the sum of its constituents,
+
+    h(t) = Z0 + sum_c f_c(t) H_c cos(V_c(t) + u_c(t) - g_c)
+
+with the amplitude H and Greenwich phase lag g of each constituent stored
+per station in SQLite. The equilibrium arguments V and the nodal
+corrections f, u only depend on time; they are computed once per time step
+for all constituents, and the heights of many stations follow from one
+matrix product, so a year of 6-minute levels for a whole region takes
+well under a second. High and low waters are the local extrema of the
+series, refined by parabolic interpolation.
+
+Stations can also store a reference series (e.g. observed or published
+levels) that predictions are validated against.
+"""
+
+import logging
+import threading
+from datetime import datetime, time as dt_time, timedelta, timezone
+
+import numpy as np
+
+import config
+from database.connection import get_connection_manager
+from services.spatial_index import haversine_km
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+# Doodson multipliers of (tau, s, h, p, N', p1), phase offset in degrees and nodal group.
+# tau is mean lunar time, s/h/p the mean longitudes of the moon, sun and lunar perigee,
+# N' the negated longitude of the lunar node and p1 the solar perigee.
+CONSTITUENTS = {
+    'M2': ((2, 0, 0, 0, 0, 0), 0, 'M2'),
+    'S2': ((2, 2, -2, 0, 0, 0), 0, None),
+    'N2': ((2, -1, 0, 1, 0, 0), 0, 'M2'),
+    'K2': ((2, 2, 0, 0, 0, 0), 0, 'K2'),
+    'K1': ((1, 1, 0, 0, 0, 0), -90, 'K1'),
+    'O1': ((1, -1, 0, 0, 0, 0), 90, 'O1'),
+    'P1': ((1, 1, -2, 0, 0, 0), 90, None),
+    'Q1': ((1, -2, 0, 1, 0, 0), 90, 'O1'),
+    '2N2': ((2, -2, 0, 2, 0, 0), 0, 'M2'),
+    'MU2': ((2, -2, 2, 0, 0, 0), 0, 'M2'),
+    'NU2': ((2, -1, 2, -1, 0, 0), 0, 'M2'),
+    'L2': ((2, 1, 0, -1, 0, 0), 180, 'M2'),
+    'T2': ((2, 2, -3, 0, 0, 1), 0, None),
+    'M4': ((4, 0, 0, 0, 0, 0), 0, 'M4'),
+    'MS4': ((4, 2, -2, 0, 0, 0), 0, 'M2'),
+    'MN4': ((4, -1, 0, 1, 0, 0), 0, 'M4'),
+    'M6': ((6, 0, 0, 0, 0, 0), 0, 'M6'),
+    'MM': ((0, 1, 0, -1, 0, 0), 0, 'MM'),
+    'MF': ((0, 2, 0, 0, 0, 0), 0, 'MF'),
+    'SA': ((0, 0, 1, 0, 0, 0), 0, None),
+    'SSA': ((0, 0, 2, 0, 0, 0), 0, None),
+}
+
+_CONSTITUENT_INDEX = {name: index for index, name in enumerate(CONSTITUENTS)}
+
+# Mean equinoctial spring semi-range over (H_M2 + H_S2), as at Brest where the French
+# coefficient is defined (U = 3.05 m for M2 + S2 = 2.80 m)
+COEFFICIENT_UNIT_FACTOR = 1.09
+
+# Stations predicted together; a year of 6-minute levels is ~0.7 MB per station
+PREDICTION_CHUNK = 64
+
+SECONDS_PER_DAY = 86400.0
+_J2000 = 946728000.0  # 2000-01-01T12:00:00Z as a POSIX timestamp
+
+
+def to_timestamps(times):
+    """Convert datetimes (naive ones being UTC) or POSIX seconds to a float64 array of POSIX seconds."""
+    values = []
+    for value in np.atleast_1d(np.asarray(times, dtype=object)):
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            value = value.timestamp()
+        values.append(float(value))
+    return np.asarray(values, dtype=np.float64)
+
+
+def astronomical_arguments(timestamps):
+    """
+    Mean astronomical arguments at each time.
+
+    Args:
+        timestamps (np.ndarray): POSIX seconds
+
+    Returns:
+        np.ndarray: Shape (6, n) of (tau, s, h, p, N', p1) in degrees
+    """
+    t = np.asarray(timestamps, dtype=np.float64)
+    centuries = (t - _J2000) / (SECONDS_PER_DAY * 36525.0)
+    s = 218.3164477 + 481267.88123421 * centuries
+    h = 280.4664567 + 36000.76982779 * centuries
+    p = 83.3532465 + 4069.0137287 * centuries
+    node = 125.0445479 - 1934.1362891 * centuries
+    p1 = 282.9373481 + 1.7195269 * centuries
+    # Mean solar time counted from lower transit, 180 degrees at midnight UT
+    solar = 180.0 + 15.0 * (np.mod(t, SECONDS_PER_DAY) / 3600.0)
+    tau = solar + h - s
+    return np.vstack((tau, s, h, p, -node, p1))
+
+
+def nodal_corrections(names, node):
+    """
+    Nodal amplitude factors f and phase corrections u of constituents.
+
+    Args:
+        names (list): Constituent names
+        node (np.ndarray): Longitude of the lunar node in degrees, per time
+
+    Returns:
+        tuple: (f, u) arrays of shape (len(names), n), u in degrees
+    """
+    n = np.radians(node)
+    cos_n, cos_2n, cos_3n = np.cos(n), np.cos(2 * n), np.cos(3 * n)
+    sin_n, sin_2n, sin_3n = np.sin(n), np.sin(2 * n), np.sin(3 * n)
+    f_m2 = 1.0004 - 0.0373 * cos_n + 0.0002 * cos_2n
+    u_m2 = -2.14 * sin_n
+    groups = {
+        None: (np.ones_like(n), np.zeros_like(n)),
+        'M2': (f_m2, u_m2),
+        'M4': (f_m2 ** 2, 2 * u_m2),
+        'M6': (f_m2 ** 3, 3 * u_m2),
+        'K1': (1.0060 + 0.1150 * cos_n - 0.0088 * cos_2n + 0.0006 * cos_3n,
+               -8.86 * sin_n + 0.68 * sin_2n - 0.07 * sin_3n),
+        'O1': (1.0089 + 0.1871 * cos_n - 0.0147 * cos_2n + 0.0014 * cos_3n,
+               10.80 * sin_n - 1.34 * sin_2n + 0.19 * sin_3n),
+        'K2': (1.0241 + 0.2863 * cos_n + 0.0083 * cos_2n - 0.0015 * cos_3n,
+               -17.74 * sin_n + 0.68 * sin_2n - 0.04 * sin_3n),
+        'MM': (1.0 - 0.1300 * cos_n, np.zeros_like(n)),
+        'MF': (1.0429 + 0.4135 * cos_n - 0.004 * cos_2n,
+               -23.74 * sin_n + 2.68 * sin_2n - 0.38 * sin_3n),
+    }
+    f = np.vstack([groups[CONSTITUENTS[name][2]][0] for name in names])
+    u = np.vstack([groups[CONSTITUENTS[name][2]][1] for name in names])
+    return f, u
+
+
+def constituent_terms(names, timestamps):
+    """
+    Time-dependent part of each constituent.
+
+    Args:
+        names (list): Constituent names
+        timestamps (np.ndarray): POSIX seconds
+
+    Returns:
+        tuple: (A, B) arrays of shape (len(names), n), f cos(V + u) and f sin(V + u)
+    """
+    arguments = astronomical_arguments(timestamps)
+    doodson = np.array([CONSTITUENTS[name][0] for name in names], dtype=np.float64)
+    offsets = np.array([CONSTITUENTS[name][1] for name in names], dtype=np.float64)
+    f, u = nodal_corrections(names, -arguments[4])
+    phase = np.radians(doodson @ arguments + offsets[:, None] + u)
+    return f * np.cos(phase), f * np.sin(phase)
+
+
+def predict_heights(names, amplitudes, phases, mean_levels, timestamps, terms=None):
+    """
+    Predict the water levels of many stations.
+
+    Args:
+        names (list): Constituent names, the columns of amplitudes and phases
+        amplitudes (np.ndarray): Shape (stations, constituents), meters
+        phases (np.ndarray): Shape (stations, constituents), Greenwich phase lags in degrees
+        mean_levels (np.ndarray): Shape (stations,), mean water level Z0 in meters
+        timestamps (np.ndarray): POSIX seconds
+        terms (tuple, optional): constituent_terms() of every constituent at these times,
+            shared by successive batches of stations
+
+    Returns:
+        np.ndarray: Shape (stations, n) of heights in meters
+    """
+    if terms is None:
+        cos_terms, sin_terms = constituent_terms(names, timestamps)
+    else:
+        rows = [_CONSTITUENT_INDEX[name] for name in names]
+        cos_terms, sin_terms = terms[0][rows], terms[1][rows]
+    g = np.radians(phases)
+    # cos(V + u - g) = cos(V + u) cos g + sin(V + u) sin g
+    return (np.asarray(mean_levels, dtype=np.float64)[:, None]
+            + (amplitudes * np.cos(g)) @ cos_terms
+            + (amplitudes * np.sin(g)) @ sin_terms)
+
+
+def find_extrema(timestamps, heights):
+    """
+    Find the high and low waters of series sampled at a regular step.
+
+    Args:
+        timestamps (np.ndarray): POSIX seconds, regularly spaced
+        heights (np.ndarray): Shape (stations, n) of heights
+
+    Returns:
+        tuple: Arrays of the station row, time, whether it is a high water and the
+               height of each extremum, ordered by station then time
+    """
+    heights = np.atleast_2d(heights)
+    step = timestamps[1] - timestamps[0]
+    # Flat steps count as falling, so a plateau is a single turning point
+    rising = heights[:, 1:] > heights[:, :-1]
+    rows, samples = np.nonzero(rising[:, 1:] != rising[:, :-1])
+    is_high = rising[rows, samples]
+    samples = samples + 1
+
+    # Parabola through the three samples around each turning point
+    before = heights[rows, samples - 1]
+    at = heights[rows, samples]
+    after = heights[rows, samples + 1]
+    curvature = before - 2 * at + after
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where(curvature != 0, 0.5 * (before - after) / curvature, 0.0)
+    offset = np.clip(offset, -0.5, 0.5)
+    return rows, timestamps[samples] + offset * step, is_high, at - 0.25 * (before - after) * offset
+
+
+def tidal_coefficients(rows, is_high, heights, units):
+    """
+    French-style tidal coefficients of high waters.
+
+    The semi-range of a high water is measured against the mean of the low waters
+    around it, then expressed in hundredths of the station unit (the mean equinoctial
+    spring semi-range) and clipped to 20-120.
+
+    Args:
+        rows, is_high, heights: Extrema as returned by find_extrema
+        units (np.ndarray): Coefficient unit of each station row, NaN if unknown
+
+    Returns:
+        np.ndarray: Coefficient of each extremum, NaN for low waters and where undefined
+    """
+    count = len(heights)
+    lows = np.zeros(count)
+    low_count = np.zeros(count)
+    for shift in (-1, 1):
+        neighbour = np.arange(count) + shift
+        valid = (neighbour >= 0) & (neighbour < count)
+        neighbour = np.clip(neighbour, 0, max(count - 1, 0))
+        valid &= (rows[neighbour] == rows) & ~is_high[neighbour]
+        lows += np.where(valid, heights[neighbour], 0.0)
+        low_count += valid
+    with np.errstate(divide='ignore', invalid='ignore'):
+        semi_range = (heights - lows / low_count) / 2.0
+        coefficients = np.clip(np.round(100.0 * semi_range / units[rows]), 20, 120)
+    return np.where(is_high & (low_count > 0), coefficients, np.nan)
+
+
+def _zone(name):
+    if ZoneInfo is None or not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown time zone {name}, using UTC")
+        return timezone.utc
+
+
+class TideStations:
+    """Tide stations, their harmonic constituents and reference series in SQLite."""
+
+    def __init__(self, db_path=None):
+        """
+        Initialize the station store.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database file
+        """
+        self.db_path = db_path or config.TIDE_DB_PATH
+        self._db = get_connection_manager(self.db_path)
+        self._positions = None
+        self._lock = threading.Lock()
+
+        with self._db.transaction() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS tide_stations (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                mean_level REAL NOT NULL DEFAULT 0,
+                timezone TEXT NOT NULL DEFAULT 'UTC',
+                coefficient_unit REAL
+            )
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS tide_constituents (
+                station_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                amplitude REAL NOT NULL,
+                phase REAL NOT NULL,
+                PRIMARY KEY (station_id, name),
+                FOREIGN KEY (station_id) REFERENCES tide_stations (id) ON DELETE CASCADE
+            )
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS tide_reference (
+                station_id INTEGER NOT NULL,
+                time REAL NOT NULL,
+                height REAL NOT NULL,
+                PRIMARY KEY (station_id, time),
+                FOREIGN KEY (station_id) REFERENCES tide_stations (id) ON DELETE CASCADE
+            )
+            """)
+
+    def save_station(self, name, latitude, longitude, constituents, mean_level=0.0,
+                     timezone_name='UTC', coefficient_unit=None, station_id=None):
+        """
+        Create or replace a station and its constituents.
+
+        Args:
+            name (str): Station name
+            latitude (float): Station latitude
+            longitude (float): Station longitude
+            constituents (dict): Constituent name -> (amplitude in meters, phase lag in degrees)
+            mean_level (float): Mean water level Z0 above chart datum, meters
+            timezone_name (str): Time zone of the published tide times
+            coefficient_unit (float, optional): Mean equinoctial spring semi-range, meters
+            station_id (int, optional): ID of the station to replace
+
+        Returns:
+            int: Station ID
+        """
+        unknown = set(constituents) - set(CONSTITUENTS)
+        if unknown:
+            raise ValueError(f"Unknown constituents: {', '.join(sorted(unknown))}")
+
+        with self._db.transaction() as conn:
+            cursor = conn.execute(
+                """INSERT OR REPLACE INTO tide_stations
+                   (id, name, latitude, longitude, mean_level, timezone, coefficient_unit)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (station_id, name, latitude, longitude, mean_level, timezone_name, coefficient_unit)
+            )
+            station_id = cursor.lastrowid if station_id is None else station_id
+            conn.execute("DELETE FROM tide_constituents WHERE station_id = ?", (station_id,))
+            conn.executemany(
+                "INSERT INTO tide_constituents (station_id, name, amplitude, phase) VALUES (?, ?, ?, ?)",
+                [(station_id, constituent, amplitude, phase)
+                 for constituent, (amplitude, phase) in constituents.items()]
+            )
+        self._positions = None
+        return station_id
+
+    def save_reference(self, station_id, timestamps, heights):
+        """Store (or replace) reference levels of a station, at POSIX timestamps."""
+        with self._db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO tide_reference (station_id, time, height) VALUES (?, ?, ?)",
+                zip([station_id] * len(heights), to_timestamps(timestamps).tolist(),
+                    np.asarray(heights, dtype=np.float64).tolist())
+            )
+
+    def reference_series(self, station_id, start=None, end=None):
+        """
+        Get the reference levels of a station.
+
+        Returns:
+            tuple: (timestamps, heights) arrays
+        """
+        query = "SELECT time, height FROM tide_reference WHERE station_id = ?"
+        params = [station_id]
+        if start is not None:
+            query += " AND time >= ?"
+            params.append(float(to_timestamps(start)[0]))
+        if end is not None:
+            query += " AND time < ?"
+            params.append(float(to_timestamps(end)[0]))
+        rows = self._db.execute(query + " ORDER BY time", params).fetchall()
+        series = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        return series[:, 0], series[:, 1]
+
+    def station_ids(self):
+        return [row[0] for row in self._db.execute("SELECT id FROM tide_stations ORDER BY id")]
+
+    def load(self, station_ids=None):
+        """
+        Load stations with their constituents as arrays.
+
+        Args:
+            station_ids (list, optional): Stations to load (default: all)
+
+        Returns:
+            dict: ids, names, timezones, mean_levels, units, the constituent names and the
+                  amplitude and phase matrices of shape (stations, constituents)
+        """
+        station_ids = list(station_ids) if station_ids is not None else self.station_ids()
+        placeholders = ', '.join('?' * len(station_ids))
+        stations = {
+            row['id']: row for row in self._db.execute(
+                f"SELECT * FROM tide_stations WHERE id IN ({placeholders})", station_ids
+            )
+        } if station_ids else {}
+        missing = [station_id for station_id in station_ids if station_id not in stations]
+        if missing:
+            raise KeyError(f"Unknown tide stations: {missing}")
+
+        rows = self._db.execute(
+            f"SELECT station_id, name, amplitude, phase FROM tide_constituents WHERE station_id IN ({placeholders})",
+            station_ids
+        ).fetchall() if station_ids else []
+        names = sorted({row['name'] for row in rows}, key=list(CONSTITUENTS).index)
+        column = {name: index for index, name in enumerate(names)}
+        position = {station_id: index for index, station_id in enumerate(station_ids)}
+        amplitudes = np.zeros((len(station_ids), len(names)))
+        phases = np.zeros((len(station_ids), len(names)))
+        for row in rows:
+            amplitudes[position[row['station_id']], column[row['name']]] = row['amplitude']
+            phases[position[row['station_id']], column[row['name']]] = row['phase']
+
+        units = []
+        for station_id in station_ids:
+            unit = stations[station_id]['coefficient_unit']
+            if not unit:
+                semi_diurnal = sum(amplitudes[position[station_id], column[name]]
+                                   for name in ('M2', 'S2') if name in column)
+                unit = COEFFICIENT_UNIT_FACTOR * semi_diurnal or None
+            units.append(unit)
+
+        return {
+            'ids': station_ids,
+            'names': [stations[station_id]['name'] for station_id in station_ids],
+            'timezones': [stations[station_id]['timezone'] for station_id in station_ids],
+            'mean_levels': np.array([stations[station_id]['mean_level'] for station_id in station_ids]),
+            'units': units,
+            'constituents': names,
+            'amplitudes': amplitudes,
+            'phases': phases,
+        }
+
+    def nearest(self, latitude, longitude, max_km=None):
+        """
+        Find the station closest to a point.
+
+        Returns:
+            tuple: (station_id, distance_km), or None if no station is within max_km
+        """
+        with self._lock:
+            if self._positions is None:
+                rows = self._db.execute("SELECT id, latitude, longitude FROM tide_stations").fetchall()
+                self._positions = np.array([tuple(row) for row in rows], dtype=np.float64).reshape(-1, 3)
+            positions = self._positions
+        if not len(positions):
+            return None
+        distances = haversine_km(latitude, longitude, positions[:, 1], positions[:, 2])
+        best = int(np.argmin(distances))
+        if max_km is not None and distances[best] > max_km:
+            return None
+        return int(positions[best, 0]), float(distances[best])
+
+
+class TidePredictor:
+    """Tide levels, high and low waters and coefficients predicted from stored constituents."""
+
+    def __init__(self, stations=None, step=None):
+        """
+        Initialize the predictor.
+
+        Args:
+            stations (TideStations, optional): Station store
+            step (int, optional): Sampling step of the predicted series in seconds
+        """
+        self.stations = stations or TideStations()
+        self.step = step or config.TIDE_PREDICTION_STEP
+
+    def predict(self, station_ids, start, end, step=None, terms=None):
+        """
+        Predict the levels of stations over a period.
+
+        Args:
+            station_ids (list): Station IDs
+            start (datetime): Start of the period (naive values are UTC)
+            end (datetime): End of the period, excluded
+            step (int, optional): Sampling step in seconds
+            terms (tuple, optional): constituent_terms() of every constituent at the sampled times
+
+        Returns:
+            tuple: (timestamps, heights of shape (stations, n), loaded stations)
+        """
+        stations = self.stations.load(station_ids)
+        start_ts, end_ts = to_timestamps([start, end])
+        timestamps = np.arange(start_ts, end_ts, step or self.step, dtype=np.float64)
+        heights = predict_heights(
+            stations['constituents'], stations['amplitudes'], stations['phases'],
+            stations['mean_levels'], timestamps, terms
+        )
+        return timestamps, heights, stations
+
+    def tide_tables(self, station_ids, start, end):
+        """
+        Compute the high and low waters of stations over a period.
+
+        Stations are predicted PREDICTION_CHUNK at a time, which bounds the memory
+        of the height matrix for large regions.
+
+        Args:
+            station_ids (list): Station IDs
+            start (datetime): Start of the period (naive values are UTC)
+            end (datetime): End of the period, excluded
+
+        Returns:
+            dict: Per station ID, a list of tides (UTC datetime, type, height in meters, and
+                  the coefficient of high waters) in time order
+        """
+        # Extrema near the edges need the samples just outside the period
+        start_ts, end_ts = to_timestamps([start, end])
+        margin = 3 * 3600
+        station_ids = list(station_ids)
+        # The time terms are the same for every batch of stations
+        terms = constituent_terms(
+            list(CONSTITUENTS), np.arange(start_ts - margin, end_ts + margin, self.step, dtype=np.float64)
+        )
+        tables = {}
+        for first in range(0, len(station_ids), PREDICTION_CHUNK):
+            timestamps, heights, stations = self.predict(
+                station_ids[first:first + PREDICTION_CHUNK], start_ts - margin, end_ts + margin, terms=terms
+            )
+            rows, times, is_high, levels = find_extrema(timestamps, heights)
+            units = np.array([unit or np.nan for unit in stations['units']], dtype=np.float64)
+            coefficients = tidal_coefficients(rows, is_high, levels, units)
+
+            inside = (times >= start_ts) & (times < end_ts)
+            for station_id in stations['ids']:
+                tables[station_id] = []
+            ids = stations['ids']
+            for row, when, high, level, coefficient in zip(
+                rows[inside].tolist(), times[inside].tolist(), is_high[inside].tolist(),
+                np.round(levels[inside], 3).tolist(), coefficients[inside].tolist()
+            ):
+                tide = {'time': datetime.fromtimestamp(when, timezone.utc),
+                        'type': 'high' if high else 'low', 'height': level}
+                if high:
+                    tide['coefficient'] = None if coefficient != coefficient else int(coefficient)
+                tables[ids[row]].append(tide)
+        return tables
+
+    def daily_tides(self, station_id, first_day, days=1):
+        """
+        Summarize the predicted tides of a station per local day.
+
+        Args:
+            station_id (int): Station ID
+            first_day (date): First day, in the station time zone
+            days (int): Number of days
+
+        Returns:
+            dict: Per ISO date, the coefficient, first high and low tide times and every tide,
+                  in the format of the tide scraper
+        """
+        zone = _zone(self.stations.load([station_id])['timezones'][0])
+        start = datetime.combine(first_day, dt_time(), zone)
+        end = datetime.combine(first_day + timedelta(days=days), dt_time(), zone)
+        summaries = {
+            (first_day + timedelta(days=offset)).isoformat(): {'high_tides': [], 'low_tides': [], 'coefficients': []}
+            for offset in range(days)
+        }
+        for tide in self.tide_tables([station_id], start, end)[station_id]:
+            local = tide['time'].astimezone(zone)
+            summary = summaries[local.date().isoformat()]
+            summary[f"{tide['type']}_tides"].append((local.strftime('%H:%M'), tide['height']))
+            if tide.get('coefficient') is not None:
+                summary['coefficients'].append(tide['coefficient'])
+
+        for summary in summaries.values():
+            coefficients = summary.pop('coefficients')
+            summary['coefficient'] = max(coefficients) if coefficients else None
+            summary['high_tide_time'] = summary['high_tides'][0][0] if summary['high_tides'] else 'N/A'
+            summary['low_tide_time'] = summary['low_tides'][0][0] if summary['low_tides'] else 'N/A'
+            summary['source'] = 'prediction'
+        return summaries
+
+    def validate(self, station_id, start=None, end=None):
+        """
+        Compare predictions with the stored reference series of a station.
+
+        Returns:
+            dict: Number of points, RMSE, maximum absolute error and bias in meters,
+                  or None if the station has no reference series
+        """
+        timestamps, reference = self.stations.reference_series(station_id, start, end)
+        if not len(timestamps):
+            return None
+        stations = self.stations.load([station_id])
+        predicted = predict_heights(
+            stations['constituents'], stations['amplitudes'], stations['phases'],
+            stations['mean_levels'], timestamps
+        )[0]
+        errors = predicted - reference
+        return {
+            'points': int(len(errors)),
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'max_error': float(np.max(np.abs(errors))),
+            'bias': float(np.mean(errors)),
+        }
+
+
+# Shared predictor
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_tide_predictor():
+    """Get or create the shared tide predictor."""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = TidePredictor()
+    return _predictor
@@ -4,8 +4,6 @@ Service for searching cities and fetching detailed weather data from OpenWeather
 
 import sqlite3
 import requests
-from bs4 import BeautifulSoup
-import re
 from datetime import datetime
 from pathlib import Path
 import logging
@@ -13,9 +11,37 @@ import sys
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 import config
 import time
+from concurrent.futures import ThreadPoolExecutor
+from services.circuit_breaker import get_negative_cache
+from services.http_client import get_http_client
+from services.retry_policy import RetryPolicy
+from database.connection import get_connection_manager
+from models.record import format_timestamp
+from services import search_index
+from services import html_extract
 
 logger = logging.getLogger(__name__)
 
+# Open-Meteo current conditions requested by batched fetches
+OPEN_METEO_CURRENT = 'temperature_2m,relative_humidity_2m,dew_point_2m,weather_code,pressure_msl,wind_speed_10m,visibility'
+
+# WMO weather interpretation codes returned by Open-Meteo, worded like OpenWeatherMap descriptions
+WMO_DESCRIPTIONS = {
+    0: 'clear sky', 1: 'mainly clear', 2: 'partly cloudy', 3: 'overcast clouds',
+    45: 'fog', 48: 'depositing rime fog',
+    51: 'light drizzle', 53: 'drizzle', 55: 'heavy drizzle',
+    56: 'freezing drizzle', 57: 'heavy freezing drizzle',
+    61: 'light rain', 63: 'moderate rain', 65: 'heavy rain',
+    66: 'freezing rain', 67: 'heavy freezing rain',
+    71: 'light snow', 73: 'snow', 75: 'heavy snow', 77: 'snow grains',
+    80: 'light rain showers', 81: 'rain showers', 82: 'heavy rain showers',
+    85: 'snow showers', 86: 'heavy snow showers',
+    95: 'thunderstorm', 96: 'thunderstorm with hail', 99: 'thunderstorm with heavy hail',
+}
+
+# City ids bound per query when loading many cities
+CITY_LOOKUP_CHUNK = 512
+
 class WeatherService:
     """Service for searching cities and fetching detailed weather data."""
     
@@ -39,12 +65,14 @@ class WeatherService:
         logger.info(msg)
     
     # Update the constructor
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, retry_policy=None):
         """
         Initialize the weather service.
         
         Args:
             db_path (str, optional): Path to the SQLite database file
+            retry_policy (RetryPolicy, optional): Retries of upstream requests
+                (default: the interactive policy, failing fast for web requests)
         """
         base_dir = Path(__file__).resolve().parent.parent
         self.db_path = db_path or config.DB_PATH
@@ -52,20 +80,25 @@ class WeatherService:
         self.max_retries = config.MAX_RETRIES
         self.backoff_factor = config.BACKOFF_FACTOR
         self.request_timeout = config.REQUEST_TIMEOUT
+        self.retry_policy = retry_policy or RetryPolicy.interactive()
+        self.http = get_http_client()
+        self.failed_fetches = get_negative_cache()
         
         self.request_count = 0
         self.error_count = 0
         self.last_request_time = 0
-        self.conn =  
-        
-      
-
 
+    def get_db_connection(self):
+        """Get this thread's long-lived connection to the cities database (named column access)."""
+        return get_connection_manager(self.db_path).connection()
     
     def search_cities(self, name, country=None, limit=10):
         """
         Search for cities by name in the SQLite database.
         
+        Uses the FTS5 trigram index built by create_cities_db.py, ranking
+        exact matches before prefix matches before substring matches.
+        
         Args:
             name (str): City name to search for
             country (str, optional): Two-letter country code
@@ -75,26 +108,8 @@ class WeatherService:
             list: List of matching cities
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # This enables column access by name
-            cursor = conn.cursor()
-            
-            # Build the query based on whether country is provided
-            query = "SELECT * FROM cities WHERE name LIKE ?"
-            params = [f"%{name}%"]
-            
-            if country:
-                query += " AND country = ?"
-                params.append(country.upper())
-            
-            query += " ORDER BY name LIMIT ?"
-            params.append(str(limit))
-            
-            cursor.execute(query, params)
-            cities = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
-            return cities
+            conn = self.get_db_connection()
+            return search_index.search_cities(conn, name, country, limit)
         except sqlite3.Error as e:
             logger.error(f"Database error: {e}")
             return []
@@ -110,14 +125,8 @@ class WeatherService:
             dict: City information or None if not found
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT * FROM cities WHERE id = ?", (city_id,))
-            city = cursor.fetchone()
-            
-            conn.close()
+            conn = self.get_db_connection()
+            city = conn.execute("SELECT * FROM cities WHERE id = ?", (city_id,)).fetchone()
             
             if city:
                 return dict(city)
@@ -126,27 +135,57 @@ class WeatherService:
             logger.error(f"Database error: {e}")
             return None
     
-    def fetch_weather_data(self, city_id):
+    def get_cities_by_ids(self, city_ids):
+        """
+        Get many cities by ID, one query per CITY_LOOKUP_CHUNK ids.
+        
+        Args:
+            city_ids (list): OpenWeatherMap city IDs
+            
+        Returns:
+            dict: City information keyed by ID, for the IDs found
+        """
+        city_ids = list(dict.fromkeys(city_ids))
+        cities = {}
+        try:
+            conn = self.get_db_connection()
+            for start in range(0, len(city_ids), CITY_LOOKUP_CHUNK):
+                chunk = city_ids[start:start + CITY_LOOKUP_CHUNK]
+                rows = conn.execute(
+                    f"SELECT * FROM cities WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                cities.update((row['id'], dict(row)) for row in rows)
+        except sqlite3.Error as e:
+            logger.error(f"Database error: {e}")
+        return cities
+    
+    def fetch_weather_data(self, city_id, policy=None, fallback=True):
         """
         Fetch weather data from OpenWeatherMap website with retry logic.
         
         Args:
             city_id (int): OpenWeatherMap city ID
+            policy (RetryPolicy, optional): Retry policy of the fetch (default: the service's)
+            fallback (bool): Return mock data when the fetch fails, instead of None
             
         Returns:
-            dict: Weather data or None if failed
+            dict: Weather data, mock data (flagged 'mock') if failed and fallback is set, or None
         """
         url = f"https://openweathermap.org/city/{city_id}"
+        if ('weather_page', city_id) in self.failed_fetches:
+            logger.debug(f"Weather page of city ID {city_id} failed recently")
+            return self._fallback_weather_data(city_id, fallback)
         start_time = time.time()
         
         try:
             logger.info(f"Fetching weather data for city ID {city_id}")
             
-            response = self.fetch_with_retry(url)
+            response = self.fetch_with_retry(url, policy=policy)
             
             if not response:
                 logger.error(f"All retry attempts failed for city ID {city_id}")
-                return self._get_mock_weather_data(city_id)
+                self.failed_fetches.add('weather_page', city_id)
+                return self._fallback_weather_data(city_id, fallback)
                 
             duration = int((time.time() - start_time) * 1000)
             self.log_request_details(url, status_code=response.status_code, duration=duration)
@@ -154,216 +193,155 @@ class WeatherService:
             # Check if response contains actual content
             if not response.text or len(response.text) < 100:
                 logger.error(f"Empty or too short response received for city ID {city_id}")
-                return self._get_mock_weather_data(city_id)
+                self.failed_fetches.add('weather_page', city_id)
+                return self._fallback_weather_data(city_id, fallback)
                 
-            weather_data = self._parse_weather_html(response.text, city_id)
+            weather_data = self._parse_weather_html(response.text, city_id, fallback=False)
             
             if weather_data:
                 logger.info(f"Successfully parsed weather data for {city_id}: {weather_data['city_country']}, {weather_data['temperature']}")
             else:
                 logger.warning(f"Failed to parse weather data for city ID {city_id}")
+                self.failed_fetches.add('weather_page', city_id)
+                return self._fallback_weather_data(city_id, fallback)
                 
             return weather_data
         except Exception as e:
             duration = int((time.time() - start_time) * 1000)
             self.log_request_details(url, error=e, duration=duration)
             logger.error(f"Unexpected error fetching weather data for city {city_id}: {e}", exc_info=True)
-            return self._get_mock_weather_data(city_id)
+            self.failed_fetches.add('weather_page', city_id)
+            return self._fallback_weather_data(city_id, fallback)
     
-    def _parse_weather_html(self, html_content, city_id):
+    def _parse_weather_html(self, html_content, city_id, fallback=True):
         """
         Parse weather data from HTML content.
         
         Args:
             html_content (str): HTML content from OpenWeatherMap website
             city_id (int): City ID for reference
+            fallback (bool): Return mock data when the page has no weather widget, instead of None
             
         Returns:
             dict: Structured weather data
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Find the weather widget section - try multiple selectors
-        weather_widget = soup.select_one("#weather-widget > div.section-content")
+        weather_data = html_extract.parse_weather_html(html_content, city_id)
         
-        # If the first selector fails, try alternative selectors
-        if not weather_widget:
-            weather_widget = soup.select_one("div.current-container")
-        
-        if not weather_widget:
-            weather_widget = soup.select_one("div.owm-city-current")
-            
-        if not weather_widget:
+        if not weather_data:
             logger.error("Could not find weather widget in HTML content")
             # Return mock data instead of None to prevent application errors
-            return self._get_mock_weather_data(city_id)
-        
-        # Extract city name and country
-        city_heading = weather_widget.select_one("h2")
-        city_country = city_heading.text.strip() if city_heading else "Unknown"
-        
-        # Extract current date and time
-        date_time_elem = weather_widget.select_one("span.orange-text")
-        date_time = date_time_elem.text.strip() if date_time_elem else "Unknown"
-        
-        # Extract temperature
-        temp_elem = weather_widget.select_one("div.current-temp span.heading")
-        temperature = temp_elem.text.strip() if temp_elem else "Unknown"
-        
-        # Extract weather description
-        weather_desc_elem = weather_widget.select_one("div.bold")
-        weather_desc = weather_desc_elem.text.strip() if weather_desc_elem else "Unknown"
-        
-        # Extract additional weather details
-        weather_items = weather_widget.select("ul.weather-items li")
-        
-        # Initialize weather details with default values
-        weather_details = {
-            'wind': 'Unknown',
-            'pressure': 'Unknown',
-            'humidity': 'Unknown',
-            'uv': 'Unknown',
-            'dew_point': 'Unknown',
-            'visibility': 'Unknown'
-        }
-        
-        # Parse each weather item
-        for item in weather_items:
-            item_text = item.text.strip()
-            
-            if 'm/s' in item_text:
-                weather_details['wind'] = item_text.strip()
-                # Extract wind speed value
-                wind_match = re.search(r'(\d+\.?\d*)\s*m/s', item_text)
-                if wind_match:
-                    weather_details['wind_speed'] = wind_match.group(1)
-                else:
-                    weather_details['wind_speed'] = "0"
-            elif 'hPa' in item_text:
-                weather_details['pressure'] = item_text.strip()
-            elif 'Humidity:' in item_text:
-                weather_details['humidity'] = item_text.replace('Humidity:', '').strip()
-            elif 'UV:' in item_text:
-                weather_details['uv'] = item_text.replace('UV:', '').strip()
-            elif 'Dew point:' in item_text:
-                weather_details['dew_point'] = item_text.replace('Dew point:', '').strip()
-            elif 'Visibility:' in item_text:
-                weather_details['visibility'] = item_text.replace('Visibility:', '').strip()
-        
-        # Extract temperature value
-        temp_value = None
-        if temperature != "Unknown":
-            temp_match = re.search(r'(-?\d+)°C', temperature)
-            if temp_match:
-                temp_value = int(temp_match.group(1))
-        
-        # Create structured weather data
-        weather_data = {
-            'city_id': city_id,
-            'city_country': city_country,
-            'date_time': date_time,
-            'temperature': temperature,
-            'temperature_value': temp_value,
-            'description': weather_desc,
-            'wind': weather_details['wind'],
-            'wind_speed': weather_details.get('wind_speed', 0),
-            'pressure': weather_details['pressure'],
-            'humidity': weather_details['humidity'],
-            'uv': weather_details['uv'],
-            'dew_point': weather_details['dew_point'],
-            'visibility': weather_details['visibility'],
-            'fetched_at': datetime.now().isoformat()
-        }
+            return self._fallback_weather_data(city_id, fallback)
         
         return weather_data
 
+    # Copies cities rows into locations in one statement; rows already present are left untouched
+    _IMPORT_SQL = """INSERT INTO locations 
+                     (id, name, latitude, longitude, description, timezone, created_at, updated_at) 
+                     SELECT id, name, latitude, longitude,
+                            CASE WHEN state IS NOT NULL AND state != '' THEN state || ', ' || country
+                                 ELSE country END,
+                            'UTC', ?, ?
+                     FROM cities WHERE {where}
+                     ON CONFLICT (id) DO NOTHING"""
+
+    def _import_from_cities(self, cursor, where, params):
+        """
+        Insert the cities matching a WHERE clause into the locations table.
+        
+        Returns:
+            int: Number of locations actually inserted
+        """
+        now = format_timestamp()
+        cursor.execute(self._IMPORT_SQL.format(where=where), (now, now, *params))
+        return cursor.rowcount
+
     def import_city_to_locations(self, city_id):
         """Import a city from cities table to locations table."""
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if city exists in cities table
-        cursor.execute(
-            "SELECT id, name, state, country, latitude, longitude FROM cities WHERE id = ?",
-            (city_id,)
-        )
-        
-        city = cursor.fetchone()
-        
-        if not city:
-            conn.close()
-            return False
-        
-        # Check if city already exists in locations table
-        cursor.execute("SELECT id FROM locations WHERE id = ?", (city_id,))
-        if cursor.fetchone():
-            conn.close()
-            return True  # Already imported
-        
-        # Create description from state and country
-        description = f"{city['state']}, {city['country']}" if city['state'] else city['country']
-        
-        # Insert into locations table
-        now = datetime.now().isoformat()
-        cursor.execute(
-            """INSERT INTO locations 
-               (id, name, latitude, longitude, description, timezone, created_at, updated_at) 
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (city['id'], city['name'], city['latitude'], city['longitude'], 
-             description, 'UTC', now, now)
-        )
-        
-        conn.commit()
-        conn.close()
+        with get_connection_manager(self.db_path).transaction() as conn:
+            cursor = conn.cursor()
+            
+            # Check if city exists in cities table
+            cursor.execute("SELECT 1 FROM cities WHERE id = ?", (city_id,))
+            if not cursor.fetchone():
+                return False
+            
+            # Already imported cities are skipped by the conflict clause
+            self._import_from_cities(cursor, "id = ?", (city_id,))
         
         return True
 
-    def import_cities_by_country(self, country_code, limit=10):
-        """Import cities from a specific country to locations table."""
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+    def import_cities_by_country(self, country_codes, limit=10, chunk_size=None):
+        """
+        Import cities from one or more countries to locations table.
         
-        query = """SELECT id, name, state, country, latitude, longitude 
-                   FROM cities WHERE country = ?"""
-        params = [country_code]
+        The import runs as set-based INSERT ... SELECT statements over chunks
+        of city ids, committing after each chunk so very large countries do
+        not hold the write lock for the whole import.
         
-        if limit is not None and limit > 0:
-            query += " LIMIT ?"
-            params.append(limit)
+        Args:
+            country_codes (str or list): Two-letter country code(s)
+            limit (int, optional): Maximum number of cities considered (None for all)
+            chunk_size (int, optional): Number of cities per committed chunk
+            
+        Returns:
+            dict: Number of cities imported and skipped (already in locations)
+        """
+        if isinstance(country_codes, str):
+            country_codes = [country_codes]
+        country_codes = [code.upper() for code in country_codes]
+        chunk_size = chunk_size or config.IMPORT_CHUNK_SIZE
+        remaining = limit if limit is not None and limit > 0 else None
         
-        cursor.execute(query, tuple(params))
+        placeholders = ', '.join('?' for _ in country_codes)
+        country_filter = f"country IN ({placeholders})"
         
-        cities = cursor.fetchall()
-        imported_count = 0
+        manager = get_connection_manager(self.db_path)
+        imported = skipped = 0
+        last_id = -1
         
-        for city in cities:
-            # Check if city already exists in locations table
-            cursor.execute("SELECT id FROM locations WHERE id = ?", (city['id'],))
-            if cursor.fetchone():
-                continue  # Skip if already imported
-            
-            # Create description from state and country
-            description = f"{city['state']}, {city['country']}" if city['state'] else city['country']
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
             
-            # Insert into locations table
-            now = datetime.now().isoformat()
-            cursor.execute(
-                """INSERT INTO locations 
-                   (id, name, latitude, longitude, description, timezone, created_at, updated_at) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (city['id'], city['name'], city['latitude'], city['longitude'], 
-                 description, 'UTC', now, now)
-            )
-            
-            imported_count += 1
-        
-        conn.commit()
-        conn.close()
-        
-        return imported_count
+            # Each chunk is its own transaction
+            with manager.transaction() as conn:
+                cursor = conn.cursor()
+                
+                # Bounds of the next chunk of city ids, walked in id order
+                cursor.execute(
+                    f"""SELECT COUNT(*), MAX(id) FROM (
+                            SELECT id FROM cities WHERE {country_filter} AND id > ?
+                            ORDER BY id LIMIT ?
+                        )""",
+                    (*country_codes, last_id, size)
+                )
+                count, chunk_last_id = cursor.fetchone()
+                if not count:
+                    break
+                
+                inserted = self._import_from_cities(
+                    cursor,
+                    f"{country_filter} AND id > ? AND id <= ?",
+                    (*country_codes, last_id, chunk_last_id)
+                )
+            
+            imported += inserted
+            skipped += count - inserted
+            last_id = chunk_last_id
+            if remaining is not None:
+                remaining -= count
+        
+        logger.info(f"Imported {imported} cities from {', '.join(country_codes)} ({skipped} already present)")
+        return {'imported': imported, 'skipped': skipped}
+
+    def _fallback_weather_data(self, city_id, fallback):
+        """Mock weather data of a failed fetch when fallback is set, None otherwise."""
+        if not fallback:
+            return None
+        logger.info(f"Using mock weather data for city ID {city_id}")
+        return self._get_mock_weather_data(city_id)
 
     def _get_mock_weather_data(self, city_id):
-        """Return mock weather data when parsing fails."""
+        """Return mock weather data when parsing fails, flagged with 'mock'."""
         city = self.get_city_by_id(city_id)
         city_name = f"{city['name']}, {city['country']}" if city else "Unknown Location"
         
@@ -381,7 +359,8 @@ class WeatherService:
             'uv': "2",
             'dew_point': "10°C",
             'visibility': "10.0 km",
-            'fetched_at': datetime.now().isoformat()
+            'fetched_at': datetime.now().isoformat(),
+            'mock': True
         }
 
     def fetch_weather_data_api(self, city_id, api_key=None):
@@ -398,13 +377,15 @@ class WeatherService:
         if not api_key:
             logger.warning("No API key provided for OpenWeatherMap API")
             return self.fetch_weather_data(city_id)  # Fall back to web scraping
+        if ('weather_api', city_id) in self.failed_fetches:
+            return self.fetch_weather_data(city_id)
             
         city = self.get_city_by_id(city_id)
         if not city:
             logger.error(f"City with ID {city_id} not found in database")
             return None
             
-        url = "https://api.openweathermap.org/data/2.5/weather"
+        url = f"{config.OWM_API_URL}/weather"
         start_time = time.time()
         
         try:
@@ -415,7 +396,7 @@ class WeatherService:
             }
             
             logger.info(f"Fetching weather data from API for city ID {city_id}")
-            response = requests.get(url, params=params, timeout=10)
+            response = self.http.get(url, params=params, timeout=self.request_timeout)
             duration = int((time.time() - start_time) * 1000)
             
             self.log_request_details(url, status_code=response.status_code, duration=duration)
@@ -423,23 +404,7 @@ class WeatherService:
             
             data = response.json()
             
-            # Convert API response to our standard format
-            weather_data = {
-                'city_id': city_id,
-                'city_country': f"{city['name']}, {city['country']}",
-                'date_time': datetime.now().strftime("%Y-%m-%d %H:%M"),
-                'temperature': f"{data['main']['temp']}°C",
-                'temperature_value': data['main']['temp'],
-                'description': data['weather'][0]['description'],
-                'wind': f"Wind: {data['wind']['speed']} m/s",
-                'wind_speed': data['wind']['speed'],
-                'pressure': f"Pressure: {data['main']['pressure']} hPa",
-                'humidity': f"{data['main']['humidity']}%",
-                'uv': "N/A",  # Not available in basic API
-                'dew_point': "N/A",  # Not available in basic API
-                'visibility': f"{data.get('visibility', 0) / 1000} km",
-                'fetched_at': datetime.now().isoformat()
-            }
+            weather_data = self.format_api_weather(city_id, city, data)
             
             logger.info(f"Successfully fetched API weather data for {city_id}")
             return weather_data
@@ -448,51 +413,210 @@ class WeatherService:
             duration = int((time.time() - start_time) * 1000)
             self.log_request_details(url, error=e, duration=duration)
             logger.error(f"Error fetching API weather data for city {city_id}: {e}")
+            self.failed_fetches.add('weather_api', city_id)
             
             # Fall back to web scraping if API fails
             logger.info(f"Falling back to web scraping for city {city_id}")
             return self.fetch_weather_data(city_id)
 
-    def fetch_with_retry(self, url, params=None, headers=None, max_retries=3, backoff_factor=1.5):
+    def format_api_weather(self, city_id, city, data):
         """
-        Fetch data with retry logic.
+        Convert an OpenWeatherMap API response to our standard weather format.
         
         Args:
-            url (str): URL to fetch
-            params (dict, optional): Query parameters
-            headers (dict, optional): Request headers
-            max_retries (int): Maximum number of retry attempts
-            backoff_factor (float): Factor to increase wait time between retries
+            city_id (int): OpenWeatherMap city ID
+            city (dict): City row from the cities table
+            data (dict): Decoded API response
             
         Returns:
-            requests.Response: Response object or None if all retries failed
+            dict: Weather data
         """
-        headers = headers or {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        return {
+            'city_id': city_id,
+            'city_country': f"{city['name']}, {city['country']}",
+            'date_time': datetime.now().strftime("%Y-%m-%d %H:%M"),
+            'temperature': f"{data['main']['temp']}°C",
+            'temperature_value': data['main']['temp'],
+            'description': data['weather'][0]['description'],
+            'wind': f"Wind: {data['wind']['speed']} m/s",
+            'wind_speed': data['wind']['speed'],
+            'pressure': f"Pressure: {data['main']['pressure']} hPa",
+            'humidity': f"{data['main']['humidity']}%",
+            'uv': "N/A",  # Not available in basic API
+            'dew_point': "N/A",  # Not available in basic API
+            'visibility': f"{data.get('visibility', 0) / 1000} km",
+            'fetched_at': datetime.now().isoformat()
         }
+
+    def format_open_meteo_weather(self, city_id, city, current):
+        """
+        Convert the current conditions of an Open-Meteo response to our standard weather format.
         
-        for attempt in range(1, max_retries + 1):
-            try:
-                logger.info(f"Request attempt {attempt}/{max_retries} for {url}")
-                response = requests.get(url, params=params, headers=headers, timeout=10)
-                
-                # If successful or client error (4xx), don't retry
-                if response.status_code < 500:
-                    return response
-                    
-                logger.warning(f"Server error {response.status_code} on attempt {attempt}, retrying...")
-                
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-                if attempt == max_retries:
-                    logger.error(f"All retry attempts failed for {url}: {e}")
-                    return None
-                    
-                logger.warning(f"Request failed on attempt {attempt}: {e}, retrying...")
+        Args:
+            city_id (int): OpenWeatherMap city ID
+            city (dict): City row from the cities table
+            current (dict): The 'current' section of the response, wind speeds in m/s
             
-            # Calculate backoff time with exponential backoff
-            backoff_time = backoff_factor * (2 ** (attempt - 1))
-            logger.info(f"Waiting {backoff_time:.1f} seconds before retry")
-            time.sleep(backoff_time)
+        Returns:
+            dict: Weather data
+        """
+        visibility = current.get('visibility')
+        return {
+            'city_id': city_id,
+            'city_country': f"{city['name']}, {city['country']}",
+            'date_time': datetime.now().strftime("%Y-%m-%d %H:%M"),
+            'temperature': f"{current['temperature_2m']}°C",
+            'temperature_value': current['temperature_2m'],
+            'description': WMO_DESCRIPTIONS.get(current.get('weather_code'), 'Unknown'),
+            'wind': f"Wind: {current['wind_speed_10m']} m/s",
+            'wind_speed': current['wind_speed_10m'],
+            'pressure': f"Pressure: {current.get('pressure_msl')} hPa",
+            'humidity': f"{current.get('relative_humidity_2m')}%",
+            'uv': "N/A",  # Not requested
+            'dew_point': f"{current['dew_point_2m']}°C" if current.get('dew_point_2m') is not None else "N/A",
+            'visibility': f"{visibility / 1000} km" if visibility is not None else "N/A",
+            'fetched_at': datetime.now().isoformat()
+        }
+
+    def weather_groups(self, city_ids, api_key=None):
+        """
+        Split city IDs into the largest groups one upstream request can serve.
         
-        return None
+        Args:
+            city_ids (list): OpenWeatherMap city IDs
+            api_key (str, optional): OpenWeatherMap API key; without one, groups are sized for Open-Meteo
+            
+        Returns:
+            list: Lists of city IDs
+        """
+        city_ids = list(dict.fromkeys(city_ids))
+        size = config.OWM_GROUP_SIZE if api_key else config.OPEN_METEO_BATCH_SIZE
+        return [city_ids[start:start + size] for start in range(0, len(city_ids), size)]
 
+    def fetch_weather_group(self, cities, api_key=None, policy=None):
+        """
+        Fetch the current weather of a group of cities with a single request.
+        
+        With an API key this is an OpenWeatherMap group query by city ID; without one,
+        an Open-Meteo query with comma-separated coordinates.
+        
+        Args:
+            cities (list): City rows (id, name, country, latitude, longitude)
+            api_key (str, optional): OpenWeatherMap API key
+            policy (RetryPolicy, optional): Retry policy of the request (default: a batch policy)
+            
+        Returns:
+            dict: Weather data keyed by city ID, for the cities in the response
+        """
+        if not cities:
+            return {}
+        if api_key:
+            url = f"{config.OWM_API_URL}/group"
+            params = {
+                'id': ','.join(str(city['id']) for city in cities),
+                'appid': api_key,
+                'units': 'metric'
+            }
+        else:
+            url = config.OPEN_METEO_URL
+            params = {
+                'latitude': ','.join(f"{city['latitude']:.4f}" for city in cities),
+                'longitude': ','.join(f"{city['longitude']:.4f}" for city in cities),
+                'current': OPEN_METEO_CURRENT,
+                'wind_speed_unit': 'ms'
+            }
+        
+        start_time = time.time()
+        response = self.fetch_with_retry(url, params=params, policy=policy or RetryPolicy.batch())
+        duration = int((time.time() - start_time) * 1000)
+        if response is None:
+            self.log_request_details(url, error="all retry attempts failed", duration=duration)
+            return {}
+        self.log_request_details(url, status_code=response.status_code, duration=duration)
+        response.raise_for_status()
+        data = response.json()
+        
+        if api_key:
+            by_id = {city['id']: city for city in cities}
+            return {
+                item['id']: self.format_api_weather(item['id'], by_id[item['id']], item)
+                for item in data.get('list', []) if item.get('id') in by_id
+            }
+        # One location answers with an object, several with a list in request order
+        # whose items carry their index in the request as location_id
+        results = data if isinstance(data, list) else [data]
+        if len(results) != len(cities) and not all('location_id' in result for result in results):
+            logger.error(f"Open-Meteo answered {len(results)} locations for {len(cities)} requested")
+            return {}
+        weather = {}
+        for index, result in enumerate(results):
+            position = result.get('location_id', index)
+            if not isinstance(position, int) or not 0 <= position < len(cities) or not result.get('current'):
+                continue
+            city = cities[position]
+            weather[city['id']] = self.format_open_meteo_weather(city['id'], city, result['current'])
+        return weather
+
+    def fetch_weather_batch(self, city_ids, api_key=None, workers=None):
+        """
+        Fetch the current weather of many cities with as few requests as possible.
+        
+        City IDs are packed into the largest groups the upstream API accepts and the
+        groups are fetched concurrently. A group that fails leaves its cities out of
+        the result, so callers can fall back to per-city fetches for them.
+        
+        Args:
+            city_ids (list): OpenWeatherMap city IDs
+            api_key (str, optional): OpenWeatherMap API key (default: Open-Meteo, which needs none)
+            workers (int, optional): Groups fetched concurrently
+            
+        Returns:
+            dict: Weather data in the fetch_weather_data_api format, keyed by city ID
+        """
+        cities = self.get_cities_by_ids(city_ids)
+        missing = len(set(city_ids)) - len(cities)
+        if missing:
+            logger.warning(f"{missing} of {len(set(city_ids))} cities not found in database")
+        groups = self.weather_groups([city_id for city_id in city_ids if city_id in cities], api_key)
+        if not groups:
+            return {}
+        
+        policy = RetryPolicy.batch()
+        
+        def fetch(group):
+            try:
+                return self.fetch_weather_group([cities[city_id] for city_id in group], api_key, policy)
+            except Exception as e:
+                logger.error(f"Error fetching weather for a group of {len(group)} cities: {e}")
+                return {}
+        
+        results = {}
+        workers = min(workers or config.WEATHER_BATCH_WORKERS, len(groups))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather-batch') as pool:
+            for group_results in pool.map(fetch, groups):
+                results.update(group_results)
+        logger.info(f"Fetched weather for {len(results)} of {len(cities)} cities in {len(groups)} requests")
+        return results
+
+    def fetch_with_retry(self, url, params=None, headers=None, policy=None):
+        """
+        Fetch data with retry logic.
+        
+        Attempts, waits and the overall deadline come from the retry policy; see
+        services.retry_policy.
+        
+        Args:
+            url (str): URL to fetch
+            params (dict, optional): Query parameters
+            headers (dict, optional): Request headers
+            policy (RetryPolicy, optional): Policy of this call (default: the service's)
+            
+        Returns:
+            requests.Response: Response object or None if all retries failed
+        """
+        policy = policy or self.retry_policy
+        return policy.execute(
+            lambda timeout: self.http.get(url, params=params, headers=headers, timeout=timeout),
+            url,
+            timeout=self.request_timeout
+        )
@@ -24,6 +24,10 @@ function initializeApp() {
 
 function changeLocation(locationId) {
     if (!locationId) return;
+    if (locationId === 'more') {
+        loadMoreLocations();
+        return;
+    }
     
     // Show loading state
     showLoadingState();
@@ -38,6 +42,45 @@ function handleLocationChange(event) {
     changeLocation(event.target.value);
 }
 
+let loadingLocations = false;
+
+async function loadMoreLocations() {
+    // Appends the next page of locations to the selector (keyset pagination)
+    const select = document.getElementById('locationSelect');
+    const moreOption = select?.querySelector('option[value="more"]');
+    const after = select?.dataset.nextAfter;
+    if (!select || !moreOption || !after || loadingLocations) return;
+    
+    loadingLocations = true;
+    const selected = select.querySelector('option[selected]');
+    try {
+        const response = await fetch(`/api/locations?after=${encodeURIComponent(after)}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const page = await response.json();
+        
+        page.locations.forEach(location => {
+            if (select.querySelector(`option[value="${location.id}"]`)) return;
+            const option = document.createElement('option');
+            option.value = location.id;
+            option.textContent = location.name;
+            select.insertBefore(option, moreOption);
+        });
+        
+        if (page.next_after === null) {
+            moreOption.remove();
+            select.dataset.nextAfter = '';
+        } else {
+            select.dataset.nextAfter = page.next_after;
+        }
+    } catch (error) {
+        console.error('Could not load more locations:', error);
+    } finally {
+        loadingLocations = false;
+        // Keep the current location selected rather than the "more" entry
+        if (selected) selected.selected = true;
+    }
+}
+
 function showLoadingState() {
     const weatherCards = document.querySelectorAll('.weather-card');
     weatherCards.forEach(card => {
@@ -179,4 +222,5 @@ function throttle(func, limit) {
 
 // Export functions for global access
 window.changeLocation = changeLocation;
+window.loadMoreLocations = loadMoreLocations;
 window.refreshWeatherData = refreshWeatherData;
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Shared fixtures of the test suite."""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = BASE_DIR / 'data' / 'fixtures'
+sys.path.insert(0, str(BASE_DIR))
+
+import config
+from services import cache, circuit_breaker
+
+
+@pytest.fixture(autouse=True)
+def data_paths(tmp_path, monkeypatch):
+    """Keep the databases and shared caches of every test to itself."""
+    monkeypatch.setattr(config, 'DB_PATH', tmp_path / 'cities.db')
+    monkeypatch.setattr(config, 'CACHE_DB_PATH', tmp_path / 'cache.db')
+    monkeypatch.setattr(config, 'MARINE_DB_PATH', tmp_path / 'marine.db')
+    monkeypatch.setattr(config, 'TIDE_DB_PATH', tmp_path / 'tides.db')
+    cache._cache.clear()
+    monkeypatch.setattr(cache, '_persistent_cache', None)
+    monkeypatch.setattr(circuit_breaker, '_breakers', None)
+    monkeypatch.setattr(circuit_breaker, '_negative_cache', None)
+    return tmp_path
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers with whatever the server's answer callable returns for (path, query)."""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.requests.append((url.path, query))
+        status, body = self.server.answer(url.path, query)
+        if isinstance(body, str):
+            payload, content_type = body.encode(), 'text/html; charset=utf-8'
+        else:
+            payload, content_type = json.dumps(body).encode(), 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Local HTTP server; set its answer to a callable (path, query) -> (status, JSON or HTML)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.requests = []
+    server.answer = lambda path, query: (404, {})
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,123 @@
+"""Bulk loads with upstream fetches that fail or fall back to mock data."""
+
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+
+import pytest
+
+from services.bulk_loader import BatchWriter, BulkLoader
+
+Location = namedtuple('Location', 'id name latitude longitude')
+
+LOCATIONS = [Location(1, 'Brest', 48.39, -4.49), Location(2, 'Lisbon', 38.72, -9.13), Location(3, 'Paris', 48.85, 2.35)]
+
+
+class WeatherStandIn:
+    """Answers for location 1 only; the others fail like WeatherService, mock data unless fallback=False."""
+
+    def fetch_weather_data(self, city_id, policy=None, fallback=True):
+        if city_id == 1:
+            return {'temperature_value': 14, 'description': 'clear sky', 'wind_speed': 3.0}
+        return {'temperature_value': 15, 'description': 'Cloudy', 'wind_speed': 5.0, 'mock': True} if fallback else None
+
+
+class MockOnlyWeather:
+    """Ignores fallback and always returns mock data."""
+
+    def fetch_weather_data(self, city_id, policy=None, fallback=True):
+        return {'temperature_value': 15, 'description': 'Cloudy', 'wind_speed': 5.0, 'mock': True}
+
+
+class TidalStandIn:
+    """Tides for location 1 only, synchronously and asynchronously, mock data for the others unless fallback=False."""
+
+    def _tides(self, location_id, fallback):
+        if location_id == 1:
+            return {'coefficient': 95, 'high_tide_time': '07:54', 'low_tide_time': '01:49'}
+        return {'coefficient': 70, 'high_tide_time': '06:00', 'low_tide_time': '12:00', 'mock': True} if fallback else None
+
+    def get_tidal_data(self, latitude, longitude, location_id, city_name=None, day=None, fallback=True):
+        return self._tides(location_id, fallback)
+
+    async def get_tidal_data_async(self, service, latitude, longitude, location_id, city_name=None, day=None,
+                                   fallback=True):
+        return self._tides(location_id, fallback)
+
+
+@pytest.fixture
+def db_path(data_paths):
+    db_path = data_paths / 'cities.db'
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""CREATE TABLE weather_data (id INTEGER PRIMARY KEY AUTOINCREMENT, location_id INTEGER NOT NULL,
+                        date TEXT NOT NULL, temperature REAL NOT NULL, condition TEXT NOT NULL, wind_speed REAL,
+                        sunrise TEXT, sunset TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)""")
+        conn.execute("""CREATE TABLE tidal_data (id INTEGER PRIMARY KEY AUTOINCREMENT, location_id INTEGER NOT NULL,
+                        date TEXT NOT NULL, coefficient REAL, high_tide_time TEXT, low_tide_time TEXT,
+                        created_at TIMESTAMP, updated_at TIMESTAMP)""")
+    return db_path
+
+
+def _stored(db_path, table):
+    with sqlite3.connect(db_path) as conn:
+        return [row[0] for row in conn.execute(f"SELECT location_id FROM {table} ORDER BY location_id")]
+
+
+def test_failed_weather_fetches_are_not_stored(db_path):
+    loader = BulkLoader(WeatherStandIn(), None, db_path=db_path, workers=2)
+
+    stats = loader.load_weather(LOCATIONS, date(2026, 10, 18))
+
+    assert (stats.fetched, stats.failed, stats.written) == (1, 2, 1)
+    assert _stored(db_path, 'weather_data') == [1]
+    # The failed locations are tried again by the next run
+    stats = loader.load_weather(LOCATIONS, date(2026, 10, 18))
+    assert (stats.skipped, stats.failed) == (1, 2)
+
+
+def test_mock_results_count_as_failed(db_path):
+    loader = BulkLoader(MockOnlyWeather(), None, db_path=db_path, workers=2)
+
+    stats = loader.load_weather(LOCATIONS, date(2026, 10, 18))
+
+    assert (stats.fetched, stats.failed, stats.written) == (0, 3, 0)
+    assert _stored(db_path, 'weather_data') == []
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_failed_tidal_fetches_are_not_stored(db_path, engine):
+    loader = BulkLoader(None, TidalStandIn(), db_path=db_path, workers=2, engine=engine)
+
+    stats = loader.load_tidal(LOCATIONS, date(2026, 10, 19))
+
+    assert (stats.fetched, stats.failed, stats.written) == (1, 2, 1)
+    assert _stored(db_path, 'tidal_data') == [1]
+
+
+def test_async_engine_queues_rows_off_the_event_loop(db_path, monkeypatch):
+    # A writer that falls behind must not stall the fetches still in flight
+    loop_threads = []
+    put = BatchWriter.put
+
+    def slow_put(writer, row):
+        if row is not BatchWriter._STOP:
+            loop_threads.append(threading.current_thread() is threading.main_thread())
+            time.sleep(0.2)
+        put(writer, row)
+    monkeypatch.setattr(BatchWriter, 'put', slow_put)
+
+    class AllTides(TidalStandIn):
+        async def get_tidal_data_async(self, service, latitude, longitude, location_id, city_name=None, day=None,
+                                       fallback=True):
+            return self._tides(1, fallback)
+
+    loader = BulkLoader(None, AllTides(), db_path=db_path, workers=3, engine='async')
+    start = time.perf_counter()
+    stats = loader.load_tidal(LOCATIONS, date(2026, 10, 19))
+
+    assert stats.written == 3
+    assert loop_threads == [False, False, False]
+    # The three slow puts overlap instead of running one after the other on the loop
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,142 @@
+"""Memory cache eviction and expiry, and the persistent tier behind it."""
+
+import pytest
+
+from services import cache
+from services.cache import SQLiteCache, TTLCache
+
+
+class Clock:
+    """Stands in for the time module of services.cache, moved by hand."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    return clock
+
+
+def test_least_recently_used_entry_is_evicted_first(clock):
+    memory = TTLCache(max_entries=2)
+    memory.set('a', 1)
+    memory.set('b', 2)
+    assert memory.get('a') == 1
+
+    memory.set('c', 3)
+
+    assert memory.get('b') is None
+    assert memory.get('a') == 1
+    assert memory.get('c') == 3
+    assert memory.stats()['evictions'] == 1
+
+
+def test_byte_limit_evicts_and_skips_oversized_values(clock):
+    memory = TTLCache(max_bytes=200)
+    memory.set('small', 'x' * 50)
+    memory.set('other', 'y' * 50)
+    memory.set('large', 'z' * 120)
+
+    assert memory.get('small') is None
+    assert memory.get('other') == 'y' * 50
+    assert memory.stats()['bytes'] <= 200
+
+    memory.set('huge', 'h' * 500)
+    assert memory.get('huge') is None
+    assert len(memory) == 2
+
+
+def test_entries_expire_after_their_ttl(clock):
+    memory = TTLCache(default_ttl=60)
+    memory.set('default', 1)
+    memory.set('short', 2, ttl=10)
+
+    clock.advance(10)
+    assert memory.get('short') is None
+    assert memory.get('default') == 1
+
+    clock.advance(50)
+    assert memory.get('default') is None
+    assert memory.stats()['expirations'] == 2
+
+
+def test_sweep_drops_expired_entries_that_are_never_read(clock):
+    memory = TTLCache(sweep_interval=30)
+    memory.set('stale', 1, ttl=5)
+    memory.set('fresh', 2, ttl=300)
+
+    clock.advance(30)
+    memory.set('trigger', 3)
+
+    assert len(memory) == 2
+    assert memory.stats()['expirations'] == 1
+
+
+def test_overwriting_a_key_keeps_the_byte_count(clock):
+    memory = TTLCache()
+    memory.set('key', 'a' * 100)
+    size = memory.stats()['bytes']
+    memory.set('key', 'b' * 100)
+
+    assert memory.stats()['bytes'] == size
+    assert memory.get('key') == 'b' * 100
+
+
+@pytest.fixture
+def persistent(data_paths, clock):
+    return SQLiteCache(data_paths / 'cache.db', prune_every=1000)
+
+
+def test_persistent_entries_outlive_the_instance(data_paths, persistent, clock):
+    persistent.set('weather:1', {'temp': 12.5}, ttl=60)
+
+    assert SQLiteCache(data_paths / 'cache.db').get('weather:1') == ({'temp': 12.5}, clock.now + 60)
+
+    clock.advance(60)
+    assert persistent.get('weather:1') is None
+
+
+def test_prune_drops_expired_then_closest_to_expiry(data_paths, clock):
+    persistent = SQLiteCache(data_paths / 'cache.db', max_entries=2)
+    persistent.set('expired', 0, ttl=5)
+    persistent.set('soon', 1, ttl=100)
+    persistent.set('later', 2, ttl=200)
+    persistent.set('latest', 3, ttl=300)
+    clock.advance(10)
+
+    persistent.prune()
+
+    assert persistent.get('soon') is None
+    assert persistent.get('later') == (2, clock.now + 190)
+    assert persistent.stats()['entries'] == 2
+
+
+def test_values_that_are_not_json_are_not_persisted(persistent):
+    persistent.set('bad', {1, 2}, ttl=60)
+    assert persistent.get('bad') is None
+    assert persistent.stats()['errors'] == 0
+
+
+def test_persistent_hit_refills_memory_for_the_remaining_ttl(clock, monkeypatch):
+    monkeypatch.setattr(cache.config, 'CACHE_L2_ENABLED', True)
+    cache.cache_data('tides:1', {'high': '07:11'}, ttl=100)
+    cache._cache.clear()
+    clock.advance(40)
+
+    assert cache.get_cached_data('tides:1') == {'high': '07:11'}
+    assert cache._cache.get('tides:1') == {'high': '07:11'}
+
+    clock.advance(60)
+    assert cache._cache.get('tides:1') is None
@@ -0,0 +1,145 @@
+"""Circuit breaker states of an upstream host, and the negative cache of failed fetches."""
+
+import pytest
+
+from services import circuit_breaker
+from services.circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers,
+                                      CircuitOpenError, NegativeCache)
+from services.http_client import HTTPClient
+
+
+class Clock:
+    """Stands in for the time module of services.circuit_breaker, moved by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('api.example.org', failure_threshold=3, open_seconds=30, half_open_probes=1)
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures_only(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert breaker.stats() == {'state': OPEN, 'failures': 3, 'trips': 1, 'rejected': 1}
+
+
+def test_half_open_probe_success_closes(breaker, clock):
+    _trip(breaker)
+    clock.advance(30)
+
+    assert not breaker.is_open()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # The single probe slot is taken until the probe finishes
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_probe_failure_reopens_for_another_period(breaker, clock):
+    _trip(breaker)
+    clock.advance(30)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()['trips'] == 2
+
+    clock.advance(29)
+    assert not breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+
+
+def test_released_probe_frees_its_slot(breaker, clock):
+    _trip(breaker)
+    clock.advance(30)
+    assert breaker.allow()
+
+    breaker.release()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+def test_status_codes_that_count_as_failures(breaker):
+    for status in (500, 503, 429):
+        breaker.record_status(status)
+    assert breaker.state == OPEN
+
+    breaker.record_status(404)
+    assert breaker.state == CLOSED
+
+
+def test_disabled_breakers_allow_everything():
+    breakers = CircuitBreakers(enabled=False)
+    assert breakers.for_url('https://api.example.org/data') is None
+    assert not breakers.is_open('https://api.example.org/data')
+
+
+def test_open_circuit_stops_requests_before_they_are_sent(stub_server, clock):
+    stub_server.answer = lambda path, query: (503, {'error': 'unavailable'})
+    breakers = CircuitBreakers(failure_threshold=2, open_seconds=30)
+    client = HTTPClient(breakers=breakers)
+
+    for _ in range(2):
+        assert client.get(f"{stub_server.url}/weather").status_code == 503
+    assert not client.is_available(stub_server.url)
+    with pytest.raises(CircuitOpenError):
+        client.get(f"{stub_server.url}/weather")
+    assert len(stub_server.requests) == 2
+
+    stub_server.answer = lambda path, query: (200, {'ok': True})
+    clock.advance(30)
+    assert client.get(f"{stub_server.url}/weather").status_code == 200
+    assert breakers.stats()['127.0.0.1']['state'] == CLOSED
+    client.close()
+
+
+def test_negative_cache_forgets_failures_after_their_ttl(clock):
+    failures = NegativeCache(ttl=60, max_entries=2)
+    failures.add('weather', 1)
+    failures.add('weather', 2, ttl=10)
+
+    clock.advance(10)
+    assert ('weather', 1) in failures
+    assert ('weather', 2) not in failures
+
+    failures.add('tidal', 1)
+    failures.add('tidal', 2)
+    assert ('weather', 1) not in failures
+    assert len(failures) == 2
+
+    failures.discard('tidal', 1)
+    assert ('tidal', 1) not in failures
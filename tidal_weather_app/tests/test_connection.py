@@ -0,0 +1,76 @@
+"""Per-thread connections, nested transactions and reopening a replaced database file."""
+
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from database.connection import ConnectionManager
+
+
+@pytest.fixture
+def db(data_paths):
+    manager = ConnectionManager(data_paths / 'app.db')
+    manager.execute('CREATE TABLE items (name TEXT PRIMARY KEY)')
+    yield manager
+    manager.close_all()
+
+
+def _names(db):
+    return [row['name'] for row in db.execute('SELECT name FROM items ORDER BY name')]
+
+
+def test_nested_block_failure_only_rolls_back_its_savepoint(db):
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO items VALUES ('outer')")
+        with pytest.raises(ValueError):
+            with db.transaction() as inner:
+                inner.execute("INSERT INTO items VALUES ('inner')")
+                raise ValueError("inner block failed")
+        with db.transaction() as inner:
+            inner.execute("INSERT INTO items VALUES ('second')")
+
+    assert _names(db) == ['outer', 'second']
+
+
+def test_outer_failure_rolls_back_released_savepoints(db):
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction() as conn:
+            with db.transaction() as inner:
+                inner.execute("INSERT INTO items VALUES ('nested')")
+            conn.execute("INSERT INTO items VALUES ('nested')")
+
+    assert _names(db) == []
+    assert not db.connection().in_transaction
+
+
+def test_threads_get_their_own_connection(db):
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(db.connection()))
+    thread.start()
+    thread.join(5)
+
+    assert seen[0] is not db.connection()
+    assert db.connection() is db.connection()
+    assert db.stats() == {'opened': 2, 'open': 2}
+
+
+def test_reopen_switches_to_the_replaced_file_after_the_transaction(db, data_paths):
+    db.execute("INSERT INTO items VALUES ('old')")
+    # A WAL left next to the file would be replayed onto its replacement
+    db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    replacement = data_paths / 'app.db.new'
+    with sqlite3.connect(replacement) as conn:
+        conn.execute('CREATE TABLE items (name TEXT PRIMARY KEY)')
+        conn.execute("INSERT INTO items VALUES ('new')")
+    conn.close()
+
+    with db.transaction():
+        os.replace(replacement, db.db_path)
+        db.reopen()
+        # A transaction in progress keeps its connection to the end
+        assert _names(db) == ['old']
+
+    assert _names(db) == ['new']
+    assert db.stats()['opened'] == 2
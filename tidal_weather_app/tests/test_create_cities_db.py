@@ -0,0 +1,57 @@
+"""Catalog rebuilds replace the cities tables in place and keep the app tables."""
+
+import json
+import sqlite3
+
+import pytest
+
+from scripts.create_cities_db import create_database
+
+
+def _write_catalog(path, cities):
+    path.write_text(json.dumps([
+        {'id': city_id, 'name': name, 'country': country, 'coord': {'lat': 0.0, 'lon': 0.0}}
+        for city_id, name, country in cities
+    ]), encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def catalog(data_paths):
+    return _write_catalog(data_paths / 'city.list.json', [(1, 'Brest', 'FR'), (2, 'Bristol', 'GB')])
+
+
+def test_rebuild_keeps_app_tables_and_unflushed_writes(data_paths, catalog):
+    db_file = data_paths / 'cities.db'
+    create_database(catalog, db_file)
+
+    # An app connection with writes still in the WAL while the catalog is rebuilt
+    app = sqlite3.connect(db_file)
+    app.execute('PRAGMA journal_mode=WAL')
+    app.execute('PRAGMA wal_autocheckpoint=0')
+    app.execute('CREATE TABLE prewarm_tasks (id INTEGER PRIMARY KEY, city_id INTEGER)')
+    app.execute('INSERT INTO prewarm_tasks (city_id) VALUES (2)')
+    app.commit()
+
+    _write_catalog(catalog, [(1, 'Brest', 'FR'), (3, 'Bordeaux', 'FR')])
+    stats = create_database(catalog, db_file)
+
+    assert stats['inserted'] == 2
+    assert app.execute('SELECT city_id FROM prewarm_tasks').fetchall() == [(2,)]
+    assert app.execute('SELECT id FROM cities ORDER BY id').fetchall() == [(1,), (3,)]
+    assert app.execute("SELECT rowid FROM cities_fts WHERE name MATCH 'rde'").fetchall() == [(3,)]
+    assert not (data_paths / 'cities.db.tmp').exists()
+    app.close()
+
+
+def test_failed_import_leaves_catalog_untouched(data_paths, catalog):
+    db_file = data_paths / 'cities.db'
+    create_database(catalog, db_file)
+    catalog.write_text('{"not": "an array"}', encoding='utf-8')
+
+    with pytest.raises(SystemExit):
+        create_database(catalog, db_file)
+
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute('SELECT id FROM cities ORDER BY id').fetchall() == [(1,), (2,)]
+    assert not (data_paths / 'cities.db.tmp').exists()
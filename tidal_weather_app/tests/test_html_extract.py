@@ -0,0 +1,52 @@
+"""Weather widget extraction over the saved city pages, with every installed backend."""
+
+import pytest
+
+import config
+from conftest import FIXTURES_DIR
+from services import html_extract
+
+PAGES = sorted((FIXTURES_DIR / 'weather').glob('*.html'))
+
+
+def _parse(path, backend):
+    result = html_extract.parse_weather_html(path.read_text(encoding='utf-8'), 0, backend)
+    if result is not None:
+        result.pop('fetched_at')
+    return result
+
+
+@pytest.mark.parametrize('backend', html_extract.available_backends())
+@pytest.mark.parametrize('path', PAGES, ids=[path.stem for path in PAGES])
+def test_backends_agree(path, backend):
+    assert _parse(path, backend) == _parse(path, 'bs4')
+
+
+def test_widget_found_past_decoys():
+    # The page names the widget in a style, a script and a comment before the element itself
+    result = _parse(FIXTURES_DIR / 'weather' / '2988507.html', 'bs4')
+    assert result['city_country'] == 'Paris, FR'
+    assert result['temperature_value'] == 14
+    assert result['visibility'] == '10.0km'
+
+
+def test_widget_by_class():
+    result = _parse(FIXTURES_DIR / 'weather' / '3031582.html', 'bs4')
+    assert result['city_country'] == 'Brest, FR'
+    assert result['temperature_value'] == -2
+    assert result['wind_speed'] == '11.3'
+
+
+def test_page_without_widget():
+    assert _parse(FIXTURES_DIR / 'weather' / 'no_widget.html', 'bs4') is None
+
+
+def test_subtree_ends_at_the_widget():
+    html = '<body><div class="current-container"><div><h2>A</h2></div></div><h2>B</h2></body>'
+    assert html_extract._widget_subtree(html) == '<div class="current-container"><div><h2>A</h2></div></div>'
+
+
+def test_subtree_bounded_without_end_tag(monkeypatch):
+    monkeypatch.setattr(config, 'HTML_WIDGET_MAX_CHARS', 40)
+    html = '<div id="weather-widget"><h2>A</h2>' + 'x' * 100
+    assert html_extract._widget_subtree(html) == html[:40]
@@ -0,0 +1,28 @@
+"""Downsampling of hourly marine series."""
+
+import numpy as np
+
+from services.marine_store import downsample
+
+
+def test_circular_mean_around_north_is_zero():
+    hourly = np.array([350.0, 10.0] * 12, dtype=np.float32)
+    assert downsample(hourly, 'wave_direction', 'daily')['mean'][0] == 0.0
+
+    hourly = np.array([350.0, 0.0, 10.0] * 8, dtype=np.float32)
+    assert np.all(downsample(hourly, 'wind_direction_10m', '3h') == 0.0)
+
+
+def test_circular_mean_stays_in_range():
+    hourly = np.array([340.0, 350.0, 355.0] * 8, dtype=np.float32)
+    means = downsample(hourly, 'wave_direction', '3h')
+    assert np.allclose(means, 348.33, atol=0.01)
+    assert np.all((means >= 0.0) & (means < 360.0))
+
+
+def test_linear_mean_and_all_nan_day():
+    hourly = np.concatenate([np.array([350.0, 10.0] * 12), np.full(24, np.nan)])
+    daily = downsample(hourly, 'wave_height', 'daily')
+    assert daily['mean'][0] == 180.0
+    assert daily['min'][0] == 10.0 and daily['max'][0] == 350.0
+    assert np.isnan(daily['mean'][1])
@@ -0,0 +1,80 @@
+"""Pre-warm tidal tasks against a stub tide station page."""
+
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import config
+from conftest import FIXTURES_DIR
+from services.prewarm import PrewarmLocation, PrewarmScheduler
+from services.tidal_api import TidalAPIService
+
+# Tables headed "Today", "Tomorrow" and "Day after tomorrow", with no dates
+UNDATED_PAGE = (FIXTURES_DIR / 'tides' / 'Brest.html').read_text(encoding='utf-8')
+
+BREST = PrewarmLocation(3031582, 'Brest', 48.3903, -4.4863)
+
+
+@pytest.fixture
+def scheduler(data_paths, stub_server, monkeypatch):
+    db_path = data_paths / 'cities.db'
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""CREATE TABLE locations (id INTEGER PRIMARY KEY, name TEXT NOT NULL, latitude REAL NOT NULL,
+                        longitude REAL NOT NULL, description TEXT, timezone TEXT DEFAULT 'UTC',
+                        created_at TIMESTAMP, updated_at TIMESTAMP)""")
+        conn.execute("""CREATE TABLE tidal_data (id INTEGER PRIMARY KEY AUTOINCREMENT, location_id INTEGER NOT NULL,
+                        date TEXT NOT NULL, coefficient REAL, high_tide_time TEXT, low_tide_time TEXT,
+                        created_at TIMESTAMP, updated_at TIMESTAMP)""")
+        conn.execute("INSERT INTO locations (id, name, latitude, longitude) VALUES (?, ?, ?, ?)", BREST)
+
+    # Tides come from the station page, not from harmonic constants
+    monkeypatch.setattr(config, 'TIDE_PREDICTION_ENABLED', False)
+    tidal_service = TidalAPIService()
+    tidal_service.scraper.BASE_URL = f"{stub_server.url}/tidestations/Europe/France"
+    return PrewarmScheduler(None, tidal_service, db_path=db_path, max_attempts=2)
+
+
+def _tidal_rows(scheduler):
+    rows = scheduler._connect().execute(
+        "SELECT date, high_tide_time, low_tide_time FROM tidal_data WHERE location_id = ? ORDER BY date", (BREST.id,)
+    ).fetchall()
+    return [tuple(row) for row in rows]
+
+
+def _task(scheduler, run_date):
+    row = scheduler._connect().execute(
+        "SELECT status, attempts FROM prewarm_tasks WHERE run_date = ? AND source = 'tidal'", (run_date.isoformat(),)
+    ).fetchone()
+    return tuple(row)
+
+
+def test_tidal_task_stores_tomorrows_tides(scheduler, stub_server):
+    stub_server.answer = lambda path, query: (200, UNDATED_PAGE)
+    today = date.today()
+    tomorrow = today + timedelta(days=1)
+    scheduler.plan(today)
+
+    assert scheduler._work(today, 'tidal', BREST)
+
+    assert _tidal_rows(scheduler) == [
+        (tomorrow.isoformat(), '07:54', '01:49'),
+        ((today + timedelta(days=2)).isoformat(), '08:35', '02:31'),
+    ]
+    assert _task(scheduler, today) == ('done', 1)
+    # The week cached for the other locations of the station is dated from today
+    week = scheduler.tidal_service.scraper.get_cached_week('Brest', tomorrow)
+    assert week[today.isoformat()]['high_tide_time'] == '07:11'
+    assert week[tomorrow.isoformat()]['high_tide_time'] == '07:54'
+
+
+def test_failed_tidal_task_stores_nothing_and_is_retried(scheduler, stub_server):
+    stub_server.answer = lambda path, query: (503, '<html>Service unavailable</html>')
+    today = date.today()
+    scheduler.plan(today)
+
+    assert not scheduler._work(today, 'tidal', BREST)
+
+    assert _tidal_rows(scheduler) == []
+    assert _task(scheduler, today) == ('failed', 1)
+    assert ('tidal', BREST) in scheduler._pending_tasks(today)
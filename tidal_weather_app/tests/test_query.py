@@ -0,0 +1,66 @@
+"""IN lists padded to shared statement shapes, and batch fetches split into chunks."""
+
+import pytest
+
+from database.connection import get_db_connection
+from models import query as query_module
+from models.location import Location, LocationQuery
+from models.query import _padded
+
+
+@pytest.fixture
+def locations(data_paths):
+    conn = get_db_connection()
+    conn.execute("""CREATE TABLE locations (id INTEGER PRIMARY KEY, name TEXT NOT NULL, latitude REAL NOT NULL,
+                    longitude REAL NOT NULL, description TEXT, timezone TEXT DEFAULT 'UTC',
+                    created_at TIMESTAMP, updated_at TIMESTAMP)""")
+    conn.executemany("INSERT INTO locations (id, name, latitude, longitude) VALUES (?, ?, 0, 0)",
+                     [(location_id, f"Port {location_id}") for location_id in range(1, 11)])
+    yield conn
+    conn.execute("DROP TABLE locations")
+
+
+@pytest.fixture
+def statements(locations):
+    """SELECT statements run on the connection, in order and with their values bound."""
+    seen = []
+    locations.set_trace_callback(lambda sql: seen.append(sql) if sql.startswith('SELECT') else None)
+    yield seen
+    locations.set_trace_callback(None)
+
+
+def test_padding_repeats_the_last_value_to_a_power_of_two():
+    assert _padded([1]) == [1]
+    assert _padded([1, 2, 3]) == [1, 2, 3, 3]
+    assert _padded([1, 2, 3, 4, 5]) == [1, 2, 3, 4, 5, 5, 5, 5]
+
+
+def test_in_lists_of_nearby_lengths_share_one_statement(locations):
+    five = LocationQuery(Location).filter_in('id', [1, 2, 3, 4, 5])
+    seven = LocationQuery(Location).filter_in('id', [4, 5, 6, 7, 8, 9, 10])
+
+    assert five._sql(None) == seven._sql(None)
+    assert five._sql(None).count('?') == 8
+    assert sorted(location.id for location in five.all()) == [1, 2, 3, 4, 5]
+    assert sorted(location.id for location in seven.all()) == [4, 5, 6, 7, 8, 9, 10]
+
+
+def test_empty_in_list_matches_nothing(locations):
+    assert LocationQuery(Location).filter_in('id', []).all() == []
+
+
+def test_all_by_runs_one_query_per_chunk(locations, statements, monkeypatch):
+    monkeypatch.setattr(query_module, 'IN_CHUNK_SIZE', 4)
+
+    found = Location.get_many([3, 1, 2, 3, 9, 10, 7, 8, 42, 5])
+
+    assert sorted(found) == [1, 2, 3, 5, 7, 8, 9, 10]
+    assert found[7].name == 'Port 7'
+    # Nine distinct IDs: chunks of 4, 4 and 1
+    assert len(statements) == 3
+    assert [sql[sql.index(' IN ('):].count(',') + 1 for sql in statements] == [4, 4, 1]
+
+
+def test_all_by_keeps_the_other_filters(locations):
+    found = Location.query().filter("name != ?", 'Port 2').all_by('id', [1, 2, 3])
+    assert sorted(found) == [1, 3]
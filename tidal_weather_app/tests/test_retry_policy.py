@@ -0,0 +1,160 @@
+"""Retries bounded by attempts, deadline and budget, and the waits asked by Retry-After."""
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from services import retry_policy
+from services.retry_policy import RetryBudget, RetryPolicy, parse_retry_after
+
+URL = 'https://api.example.org/data'
+
+
+class Clock:
+    """Stands in for the time module of services.retry_policy; sleeping moves it forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class MaxJitter:
+    """Always waits the full backoff, so the waits can be checked."""
+
+    @staticmethod
+    def uniform(low, high):
+        return high
+
+
+class Response:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {'Retry-After': retry_after} if retry_after is not None else {}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(retry_policy, 'time', clock)
+    monkeypatch.setattr(retry_policy, 'random', MaxJitter)
+    return clock
+
+
+@pytest.fixture
+def budget(clock):
+    """A full budget that earns nothing more, so only the policy limits retries."""
+    budget = RetryBudget(ratio=0, min_per_second=0, burst=10)
+    budget.tokens = budget.burst
+    return budget
+
+
+def _sender(clock, *outcomes):
+    """Send stand-in playing outcomes in order, recording the timeout of each attempt."""
+    timeouts = []
+    outcomes = list(outcomes)
+
+    def send(timeout):
+        timeouts.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            clock.now += timeout
+            raise outcome
+        return outcome
+
+    return send, timeouts
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after('-3') == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=120), usegmt=True)
+    assert 115 <= parse_retry_after(later) <= 120
+
+
+def test_retry_after_is_waited_when_it_fits_in_the_deadline(clock, budget):
+    policy = RetryPolicy(deadline=10, max_attempts=3, backoff_factor=0.1, budget=budget)
+    send, timeouts = _sender(clock, Response(503, retry_after='2'), Response(200))
+
+    assert policy.execute(send, URL, timeout=5).status_code == 200
+    assert clock.sleeps == [2.0]
+    assert len(timeouts) == 2
+
+
+def test_retry_after_past_the_deadline_gives_up_at_once(clock, budget):
+    policy = RetryPolicy(deadline=1.5, max_attempts=3, backoff_factor=0.1, budget=budget)
+    send, timeouts = _sender(clock, Response(429, retry_after='5'), Response(200))
+
+    assert policy.execute(send, URL, timeout=1) is None
+    assert clock.sleeps == []
+    assert len(timeouts) == 1
+    assert budget.stats()['retries'] == 0
+
+
+def test_attempt_timeouts_are_cut_to_the_deadline(clock, budget):
+    policy = RetryPolicy(deadline=3, max_attempts=5, backoff_factor=0.5, budget=budget)
+    timeout = requests.exceptions.Timeout("read timed out")
+    send, timeouts = _sender(clock, timeout, timeout, timeout)
+
+    assert policy.execute(send, URL, timeout=2) is None
+    # 2 s attempt, 0.5 s wait, then only 0.5 s left; a 1 s wait would pass the deadline
+    assert timeouts == [2, 0.5]
+    assert clock.sleeps == [0.5]
+
+
+def test_connection_errors_are_retried_up_to_max_attempts(clock, budget):
+    policy = RetryPolicy(deadline=60, max_attempts=3, backoff_factor=0.1, budget=budget)
+    error = requests.exceptions.ConnectionError("refused")
+    send, timeouts = _sender(clock, error, error, error)
+
+    assert policy.execute(send, URL, timeout=1) is None
+    assert len(timeouts) == 3
+    assert clock.sleeps == [0.1, 0.2]
+
+
+def test_client_errors_are_not_retried(clock, budget):
+    policy = RetryPolicy(deadline=60, max_attempts=3, budget=budget)
+    send, timeouts = _sender(clock, Response(404))
+
+    assert policy.execute(send, URL, timeout=1).status_code == 404
+    assert len(timeouts) == 1
+
+
+def test_spent_budget_stops_retries(clock):
+    budget = RetryBudget(ratio=0.5, min_per_second=0, burst=10)
+    policy = RetryPolicy(deadline=60, max_attempts=3, backoff_factor=0.1, budget=budget)
+
+    send, timeouts = _sender(clock, Response(503), Response(503))
+    assert policy.execute(send, URL, timeout=1) is None
+    assert len(timeouts) == 1
+
+    # The second call brings the budget to a whole retry
+    send, timeouts = _sender(clock, Response(503), Response(200))
+    assert policy.execute(send, URL, timeout=1).status_code == 200
+    assert budget.stats() == {'calls': 2, 'retries': 1, 'denied': 1}
+
+
+def test_budget_refills_over_time(clock):
+    budget = RetryBudget(ratio=0, min_per_second=1, burst=2)
+    assert not budget.try_retry()
+
+    clock.now += 5
+    assert budget.try_retry()
+    assert budget.try_retry()
+    assert not budget.try_retry()
+
+
+def test_batch_policy_reads_its_attempts_at_call_time(monkeypatch, budget):
+    monkeypatch.setattr(retry_policy.config, 'RETRY_BATCH_MAX_RETRIES', 7)
+    assert RetryPolicy.batch(budget=budget).max_attempts == 7
+    assert RetryPolicy.interactive(budget=budget).deadline == retry_policy.config.RETRY_DEADLINE_INTERACTIVE
@@ -0,0 +1,119 @@
+"""Concurrent fetches of the same key share one call, in a process and across processes."""
+
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+DAY = date(2024, 6, 1)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.005)
+
+
+def _run_callers(count, call):
+    results = [None] * count
+
+    def run(index):
+        try:
+            results[index] = call()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight(use_db_lock=False)
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'temp': 12.5}
+
+    threads, results = _run_callers(5, lambda: flights.do('weather', 42, DAY, fetch))
+    _wait_for(lambda: flights.stats()['coalesced'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{'temp': 12.5}] * 5
+    assert flights.stats() == {'calls': 1, 'coalesced': 4, 'remote_waits': 0, 'in_flight': 0}
+
+
+def test_waiters_get_the_error_of_the_shared_call():
+    flights = SingleFlight(use_db_lock=False)
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    threads, results = _run_callers(3, lambda: flights.do('tidal', 7, DAY, fetch))
+    _wait_for(lambda: flights.stats()['coalesced'] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.do('tidal', 7, DAY, lambda: 'retried') == 'retried'
+
+
+def test_other_keys_are_not_coalesced():
+    flights = SingleFlight(use_db_lock=False)
+    assert flights.do('weather', 1, DAY, lambda: 'a') == 'a'
+    assert flights.do('weather', 2, DAY, lambda: 'b') == 'b'
+    assert flights.do('tidal', 1, DAY, lambda: 'c') == 'c'
+    assert flights.stats()['calls'] == 3
+
+
+@pytest.fixture
+def processes(data_paths):
+    """Two groups sharing the lock table, standing in for two worker processes."""
+    return [SingleFlight(data_paths / 'cache.db', use_db_lock=True, poll_interval=0.01) for _ in range(2)]
+
+
+def test_database_lock_makes_other_process_wait(processes):
+    first, second = processes
+    holding = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def slow_fetch():
+        holding.set()
+        release.wait(5)
+        order.append('first')
+        return 'stored'
+
+    threads, results = _run_callers(1, lambda: first.do('weather', 42, DAY, slow_fetch))
+    assert holding.wait(5)
+    waiting, _ = _run_callers(1, lambda: second.do('weather', 42, DAY, lambda: order.append('second')))
+    _wait_for(lambda: second.stats()['remote_waits'] > 0)
+    release.set()
+    for thread in threads + waiting:
+        thread.join(5)
+
+    assert results == ['stored']
+    assert order == ['first', 'second']
+
+
+def test_expired_lock_of_a_crashed_process_is_taken_over(processes):
+    crashed, alive = processes
+    crashed.lock_ttl = -1
+    assert crashed._try_db_lock('weather:42:2024-06-01')
+
+    assert alive.do('weather', 42, DAY, lambda: 'fetched') == 'fetched'
+    assert alive.stats()['remote_waits'] == 0
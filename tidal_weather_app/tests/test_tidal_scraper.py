@@ -0,0 +1,48 @@
+"""Tide station pages scraped from a local stub, and the week cached per station."""
+
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from services.tidal_scraper import TidalScraperService
+
+# Its tables are headed "Today", "Tomorrow" and "Day after tomorrow", with no dates
+UNDATED_PAGE = (FIXTURES_DIR / 'tides' / 'Brest.html').read_text(encoding='utf-8')
+
+
+@pytest.fixture
+def scraper(stub_server):
+    stub_server.answer = lambda path, query: (200, UNDATED_PAGE)
+    scraper = TidalScraperService()
+    scraper.BASE_URL = f"{stub_server.url}/tidestations/Europe/France"
+    return scraper
+
+
+def test_undated_page_starts_today_whatever_day_is_asked(scraper, stub_server):
+    today = date.today()
+    tomorrow = today + timedelta(days=1)
+
+    week = scraper.get_tide_week('Brest', tomorrow)
+
+    assert stub_server.requests[0][0] == '/tidestations/Europe/France/Brest'
+    assert list(week) == [(today + timedelta(days=offset)).isoformat() for offset in range(3)]
+    assert week[today.isoformat()]['high_tide_time'] == '07:11'
+    assert week[tomorrow.isoformat()]['high_tide_time'] == '07:54'
+    assert week[tomorrow.isoformat()]['low_tide_time'] == '01:49'
+
+
+def test_cached_week_serves_every_day_it_lists(scraper, stub_server):
+    today = date.today()
+    scraper.get_tide_week('Brest', today + timedelta(days=2))
+
+    assert scraper.get_tidal_data_by_city('Brest', 1, today)['high_tide_time'] == '07:11'
+    assert scraper.get_tidal_data_by_city('Brest', 2, today + timedelta(days=1))['high_tide_time'] == '07:54'
+    assert scraper.get_cached_week('Brest', today + timedelta(days=3)) is None
+    assert len(stub_server.requests) == 1
+
+
+def test_parse_tide_page_looks_up_the_day(scraper):
+    tomorrow = date.today() + timedelta(days=1)
+    tides = scraper.parse_tide_page(UNDATED_PAGE, 'Brest', tomorrow)
+    assert tides['high_tides'] == [('07:54', 6.55), ('20:15', 6.62)]
@@ -0,0 +1,149 @@
+"""Harmonic tide prediction, high and low waters, and tidal coefficients."""
+
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from services import astronomy
+from services.tide_prediction import (TidePredictor, TideStations, constituent_terms, find_extrema,
+                                      tidal_coefficients)
+
+# Speeds in degrees per hour, from the standard tables
+SPEEDS = {'M2': 28.9841042, 'S2': 30.0, 'N2': 28.4397295, 'K1': 15.0410686, 'O1': 13.9430356}
+
+# Brest-like constituents: amplitude in meters, Greenwich phase lag in degrees
+BREST = {'M2': (2.05, 110.0), 'S2': (0.75, 150.0), 'N2': (0.41, 92.0), 'K1': (0.06, 70.0), 'O1': (0.07, 330.0)}
+
+M2_PERIOD = 360.0 / SPEEDS['M2'] * 3600
+
+
+@pytest.fixture
+def stations(data_paths):
+    return TideStations(data_paths / 'tides.db')
+
+
+@pytest.fixture
+def predictor(stations):
+    return TidePredictor(stations, step=360)
+
+
+def _reference_series(start, hours):
+    """
+    Levels of the BREST constituents at constant speed from start.
+
+    The phase of S2 is read off the clock (its argument is twice the mean solar time);
+    the others start from the equilibrium argument and nodal corrections at start,
+    which drift by a small fraction of a degree over a month.
+    """
+    timestamps = start + np.arange(hours) * 3600.0
+    hours_since = (timestamps - start) / 3600.0
+    names = [name for name in BREST if name != 'S2']
+    cos_terms, sin_terms = constituent_terms(names, np.array([start]))
+    heights = np.zeros(hours)
+    for index, name in enumerate(names):
+        amplitude, phase = BREST[name]
+        f = np.hypot(cos_terms[index, 0], sin_terms[index, 0])
+        argument = np.degrees(np.arctan2(sin_terms[index, 0], cos_terms[index, 0]))
+        heights += f * amplitude * np.cos(np.radians(argument + SPEEDS[name] * hours_since - phase))
+    ut_hours = np.mod(timestamps, 86400.0) / 3600.0
+    amplitude, phase = BREST['S2']
+    heights += amplitude * np.cos(np.radians(SPEEDS['S2'] * ut_hours - phase))
+    return timestamps, 4.0 + heights
+
+
+def test_validate_against_reference(stations, predictor):
+    station_id = stations.save_station('Brest', 48.383, -4.495, BREST, mean_level=4.0)
+    start = datetime(2024, 4, 1, tzinfo=timezone.utc).timestamp()
+    timestamps, heights = _reference_series(start, 30 * 24)
+    stations.save_reference(station_id, timestamps, heights)
+
+    result = predictor.validate(station_id)
+    assert result['points'] == 30 * 24
+    assert result['rmse'] < 0.01
+    assert result['max_error'] < 0.02
+
+
+def test_validate_reports_offset(stations, predictor):
+    station_id = stations.save_station('Brest', 48.383, -4.495, BREST, mean_level=4.0)
+    start = datetime(2024, 4, 1, tzinfo=timezone.utc).timestamp()
+    timestamps, heights = _reference_series(start, 48)
+    stations.save_reference(station_id, timestamps, heights + 0.1)
+
+    result = predictor.validate(station_id)
+    assert result['bias'] == pytest.approx(-0.1, abs=0.01)
+    assert result['rmse'] == pytest.approx(0.1, abs=0.01)
+
+
+def test_validate_without_reference(stations, predictor):
+    station_id = stations.save_station('Brest', 48.383, -4.495, BREST)
+    assert predictor.validate(station_id) is None
+
+
+def test_find_extrema_pure_m2():
+    omega = 2 * np.pi / M2_PERIOD
+    timestamps = np.arange(0.0, 3 * 86400.0, 360.0)
+    heights = 1.5 + 2.0 * np.cos(omega * timestamps - 1.0)
+
+    rows, times, is_high, levels = find_extrema(timestamps, heights)
+
+    # High waters where the phase is a whole turn, low waters half a turn later
+    turns = np.arange(0, 6)
+    expected_highs = (1.0 + 2 * np.pi * turns) / omega
+    expected_lows = (1.0 + np.pi + 2 * np.pi * turns) / omega
+    assert np.all(rows == 0)
+    assert np.all(is_high[::2]) and not np.any(is_high[1::2])
+    assert np.allclose(times[is_high], expected_highs, atol=1.0)
+    assert np.allclose(times[~is_high], expected_lows, atol=1.0)
+    assert np.allclose(levels[is_high], 3.5, atol=1e-6)
+    assert np.allclose(levels[~is_high], -0.5, atol=1e-6)
+
+
+def test_daily_tides_across_dst(stations, predictor):
+    # Paris switches from UTC+1 to UTC+2 at 01:00 UTC on 31 March 2024
+    station_id = stations.save_station('Pure M2', 48.383, -4.495, {'M2': (2.0, 110.0)},
+                                       mean_level=3.0, timezone_name='Europe/Paris')
+    first_day = date(2024, 3, 30)
+    summaries = predictor.daily_tides(station_id, first_day, days=3)
+    assert list(summaries) == ['2024-03-30', '2024-03-31', '2024-04-01']
+
+    switch = datetime(2024, 3, 31, 1, tzinfo=timezone.utc)
+    start = datetime(2024, 3, 29, 23, tzinfo=timezone.utc)
+    end = datetime(2024, 4, 1, 22, tzinfo=timezone.utc)
+    expected = {day: {'high': [], 'low': []} for day in summaries}
+    for tide in predictor.tide_tables([station_id], start, end)[station_id]:
+        local = tide['time'] + timedelta(hours=1 if tide['time'] < switch else 2)
+        expected[local.date().isoformat()][tide['type']].append(local.strftime('%H:%M'))
+
+    for day, summary in summaries.items():
+        assert [time for time, _ in summary['high_tides']] == expected[day]['high']
+        assert [time for time, _ in summary['low_tides']] == expected[day]['low']
+    # The 23-hour day still gets every tide, none is counted twice
+    tide_count = sum(len(summary['high_tides']) + len(summary['low_tides']) for summary in summaries.values())
+    assert tide_count == sum(len(tides['high']) + len(tides['low']) for tides in expected.values())
+
+
+def test_harmonic_coefficients_spring_and_neap():
+    # M2 + S2: spring semi-range 2.75 m, neap 1.25 m, in units of 2.75 * 1.09
+    omega_m2 = 2 * np.pi / M2_PERIOD
+    omega_s2 = 2 * np.pi / (12 * 3600)
+    timestamps = np.arange(0.0, 30 * 86400.0, 360.0)
+    heights = 2.0 * np.cos(omega_m2 * timestamps) + 0.75 * np.cos(omega_s2 * timestamps)
+
+    rows, times, is_high, levels = find_extrema(timestamps, heights)
+    coefficients = tidal_coefficients(rows, is_high, levels, np.array([2.75 * 1.09]))
+
+    assert np.all(np.isnan(coefficients[~is_high]))
+    assert np.nanmax(coefficients) == pytest.approx(92, abs=1)
+    assert np.nanmin(coefficients) == pytest.approx(42, abs=1)
+
+
+def test_astronomical_coefficients_spring_and_neap():
+    # New moon on 8 April 2024 near perigee, first quarter on 15 April
+    spring = datetime(2024, 4, 9, 12, tzinfo=timezone.utc).timestamp()
+    neap = datetime(2024, 4, 17, 12, tzinfo=timezone.utc).timestamp()
+    coefficients = astronomy.tidal_coefficients(np.array([spring, neap]))
+    assert coefficients[0] > 100
+    assert coefficients[1] < 45
+    assert astronomy.coefficient_for_day(date(2024, 4, 9)) > 100
+    assert astronomy.coefficient_for_day(date(2024, 4, 17)) < 45
@@ -0,0 +1,146 @@
+"""Grouped weather fetches against a local stub of OpenWeatherMap and Open-Meteo."""
+
+import sqlite3
+
+import pytest
+
+import config
+from services.circuit_breaker import CircuitBreakers
+from services.http_client import HTTPClient
+from services.weather_service import WeatherService
+
+CITIES = [
+    (2988507, 'Paris', 'FR', 48.8534, 2.3488),
+    (2267057, 'Lisbon', 'PT', 38.7167, -9.1333),
+    (3031582, 'Brest', 'FR', 48.3903, -4.4863),
+    (2643743, 'London', 'GB', 51.5085, -0.1257),
+]
+TEMPERATURES = {city_id: 10.0 + index for index, (city_id, *_) in enumerate(CITIES)}
+TEMPERATURES_BY_LATITUDE = {f"{latitude:.4f}": TEMPERATURES[city_id] for city_id, _, _, latitude, _ in CITIES}
+
+
+def _owm_item(city_id):
+    return {'id': city_id, 'main': {'temp': TEMPERATURES[city_id], 'pressure': 1013, 'humidity': 80},
+            'weather': [{'description': 'clear sky'}], 'wind': {'speed': 3.0}, 'visibility': 10000}
+
+
+def _open_meteo_item(latitude):
+    return {'latitude': float(latitude), 'current': {
+        'temperature_2m': TEMPERATURES_BY_LATITUDE[latitude], 'wind_speed_10m': 3.0, 'weather_code': 0,
+        'pressure_msl': 1013.0, 'relative_humidity_2m': 80, 'dew_point_2m': 5.0, 'visibility': 10000.0}}
+
+
+@pytest.fixture
+def stub(stub_server, monkeypatch):
+    monkeypatch.setattr(config, 'OWM_API_URL', f"{stub_server.url}/data/2.5")
+    monkeypatch.setattr(config, 'OPEN_METEO_URL', f"{stub_server.url}/v1/forecast")
+    # A failed group is not retried, so the tests do not wait for backoffs
+    monkeypatch.setattr(config, 'RETRY_BATCH_MAX_RETRIES', 1)
+    return stub_server
+
+
+@pytest.fixture
+def service(data_paths):
+    db_path = data_paths / 'cities.db'
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""CREATE TABLE cities (id INTEGER PRIMARY KEY, name TEXT NOT NULL, state TEXT,
+                        country TEXT NOT NULL, latitude REAL NOT NULL, longitude REAL NOT NULL)""")
+        conn.executemany("INSERT INTO cities (id, name, country, latitude, longitude) VALUES (?, ?, ?, ?, ?)",
+                         CITIES)
+    service = WeatherService(db_path)
+    # Breakers of its own, so failures answered by the stub do not leak into other tests
+    service.http = HTTPClient(breakers=CircuitBreakers())
+    return service
+
+
+def _cities(service, city_ids):
+    cities = service.get_cities_by_ids(city_ids)
+    return [cities[city_id] for city_id in city_ids]
+
+
+def _temperatures(results):
+    return {city_id: weather['temperature_value'] for city_id, weather in results.items()}
+
+
+def test_owm_group_reordered_and_dropped(stub, service):
+    # Answered in reverse, without London, and with a city that was not asked for
+    def answer(path, query):
+        ids = [int(city_id) for city_id in query['id'].split(',')]
+        return 200, {'cnt': 3, 'list': [_owm_item(city_id) for city_id in reversed(ids) if city_id != 2643743]
+                     + [dict(_owm_item(2988507), id=1)]}
+    stub.answer = answer
+
+    city_ids = [city_id for city_id, *_ in CITIES]
+    results = service.fetch_weather_group(_cities(service, city_ids), api_key='key')
+
+    assert stub.requests[0][0] == '/data/2.5/group'
+    assert stub.requests[0][1]['id'] == ','.join(map(str, city_ids))
+    assert _temperatures(results) == {city_id: TEMPERATURES[city_id] for city_id in city_ids[:3]}
+    assert results[3031582]['city_country'] == 'Brest, FR'
+
+
+def test_open_meteo_list_reordered_and_dropped(stub, service):
+    # Items carry their index in the request as location_id; London's is missing
+    def answer(path, query):
+        latitudes = query['latitude'].split(',')
+        items = [dict(_open_meteo_item(latitude), location_id=index) for index, latitude in enumerate(latitudes)]
+        return 200, [item for item in reversed(items) if item['location_id'] != 3]
+    stub.answer = answer
+
+    city_ids = [city_id for city_id, *_ in CITIES]
+    results = service.fetch_weather_group(_cities(service, city_ids))
+
+    assert stub.requests[0][0] == '/v1/forecast'
+    assert _temperatures(results) == {city_id: TEMPERATURES[city_id] for city_id in city_ids[:3]}
+    assert results[2267057]['city_country'] == 'Lisbon, PT'
+
+
+def test_open_meteo_list_in_request_order(stub, service):
+    stub.answer = lambda path, query: (200, [_open_meteo_item(latitude) for latitude in query['latitude'].split(',')])
+
+    city_ids = [city_id for city_id, *_ in CITIES]
+    results = service.fetch_weather_group(_cities(service, city_ids))
+
+    assert _temperatures(results) == TEMPERATURES
+
+
+def test_open_meteo_short_list_without_ids_is_dropped(stub, service):
+    # Without location_id there is no telling which city is missing
+    stub.answer = lambda path, query: (200, [_open_meteo_item(latitude) for latitude in query['latitude'].split(',')[1:]])
+
+    assert service.fetch_weather_group(_cities(service, [city_id for city_id, *_ in CITIES])) == {}
+
+
+def test_open_meteo_single_object(stub, service):
+    stub.answer = lambda path, query: (200, _open_meteo_item(query['latitude']))
+
+    results = service.fetch_weather_group(_cities(service, [3031582]))
+
+    assert _temperatures(results) == {3031582: TEMPERATURES[3031582]}
+    assert results[3031582]['description'] == 'clear sky'
+
+
+def test_failing_group_keeps_other_groups(stub, service, monkeypatch):
+    monkeypatch.setattr(config, 'OPEN_METEO_BATCH_SIZE', 2)
+    # The group holding Lisbon fails, the other one answers
+    def answer(path, query):
+        latitudes = query['latitude'].split(',')
+        if f"{CITIES[1][3]:.4f}" in latitudes:
+            return 500, {'error': True, 'reason': 'upstream down'}
+        return 200, [_open_meteo_item(latitude) for latitude in latitudes]
+    stub.answer = answer
+
+    results = service.fetch_weather_batch([city_id for city_id, *_ in CITIES], workers=2)
+
+    assert len(stub.requests) == 2
+    assert _temperatures(results) == {city_id: TEMPERATURES[city_id] for city_id in (3031582, 2643743)}
+
+
+def test_groups_use_the_batch_policy(service, monkeypatch):
+    policies = []
+    monkeypatch.setattr(service, 'fetch_with_retry',
+                        lambda url, params=None, headers=None, policy=None: policies.append(policy))
+
+    service.fetch_weather_group(_cities(service, [2988507]))
+
+    assert policies[0].name == 'batch'